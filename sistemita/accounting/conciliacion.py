@@ -0,0 +1,175 @@
+"""Conciliación automática de los movimientos de un extracto bancario con facturas pendientes."""
+
+# Utils
+from collections import defaultdict
+from datetime import timedelta
+
+# Django
+from django.db.models import Q
+
+# Sistemita
+from sistemita.core.models.cliente import Cliente, Factura
+from sistemita.core.models.proveedor import FacturaProveedor, Proveedor
+from sistemita.utils.extractos import get_cbus, get_cuits
+
+DIAS_VENTANA = 180
+MAX_FACTURAS_SUBCONJUNTO = 30
+MAX_SUMAS_SUBCONJUNTO = 20000
+
+
+def get_centavos(monto):
+    """Monto en centavos, para comparar importes sin errores de redondeo."""
+    return int(round(monto * 100))
+
+
+def buscar_subconjunto(facturas, objetivo):
+    """
+    Facturas cuyo total suma exactamente `objetivo` centavos, o None si no hay.
+    Recorre las sumas alcanzables sin superar el objetivo, a lo sumo MAX_SUMAS_SUBCONJUNTO.
+    """
+    alcanzables = {0: ()}
+    facturas = [factura for factura in facturas if factura['centavos'] <= objetivo]
+    for factura in facturas[:MAX_FACTURAS_SUBCONJUNTO]:
+        nuevas = {}
+        for suma, elegidas in alcanzables.items():
+            total = suma + factura['centavos']
+            if total == objetivo:
+                return list(elegidas) + [factura]
+            if total < objetivo and total not in alcanzables:
+                nuevas.setdefault(total, elegidas + (factura,))
+        alcanzables.update(nuevas)
+        if len(alcanzables) > MAX_SUMAS_SUBCONJUNTO:
+            break
+    return None
+
+
+class Lado:
+    """
+    Facturas pendientes de un lado de la conciliación, los clientes para los créditos y los proveedores
+    para los débitos, con los índices por importe y por entidad para buscar cada movimiento sin consultas.
+    """
+
+    def __init__(self, tipo, entidad_model, factura_model, entidades):
+        self.tipo = tipo
+        self.entidad = entidad_model._meta.model_name
+        self.por_monto = defaultdict(list)
+        self.por_entidad = defaultdict(list)
+        self.entidades = entidades
+        self.factura_model = factura_model
+        self.usadas = set()
+
+    def cargar(self, desde, hasta):
+        """Indexa las facturas pendientes de la ventana de fechas, sin las notas de crédito."""
+        facturas = (
+            self.factura_model.objects.filter(cobrado=False, fecha__range=(desde, hasta))
+            .exclude(tipo__startswith='NC')
+            .order_by('fecha', 'pk')
+            .values('pk', 'numero', 'fecha', 'moneda', 'total', self.entidad)
+        )
+        for factura in facturas:
+            factura['centavos'] = get_centavos(factura['total'])
+            self.por_monto[(factura['moneda'], factura['centavos'])].append(factura)
+            self.por_entidad[(factura[self.entidad], factura['moneda'])].append(factura)
+
+    def disponibles(self, facturas, movimiento, dias):
+        """Facturas sin asignar emitidas hasta `dias` antes del movimiento, la más cercana primero."""
+        desde = movimiento.fecha - timedelta(days=dias)
+        return [
+            factura
+            for factura in reversed(facturas)
+            if factura['pk'] not in self.usadas and desde <= factura['fecha'] <= movimiento.fecha
+        ]
+
+    def proponer(self, movimiento, entidades, dias):
+        """
+        Facturas que cancela el movimiento y el criterio con el que se encontraron: `entidad` es la de
+        igual importe de una entidad identificada, `importe` la única de igual importe si no se identificó
+        ninguna entidad y `suma` varias de una entidad identificada que suman el importe, como en una
+        transferencia que paga más de una factura.
+        """
+        centavos = get_centavos(abs(movimiento.importe))
+        candidatas = self.disponibles(self.por_monto[(movimiento.moneda, centavos)], movimiento, dias)
+
+        propias = [factura for factura in candidatas if factura[self.entidad] in entidades]
+        if propias:
+            return [propias[0]], 'entidad'
+        if len(candidatas) == 1 and not entidades:
+            return candidatas, 'importe'
+        for entidad in entidades:
+            pendientes = self.disponibles(self.por_entidad[(entidad, movimiento.moneda)], movimiento, dias)
+            facturas = buscar_subconjunto(pendientes, centavos)
+            if facturas:
+                return facturas, 'suma'
+        return None, None
+
+    def asignar(self, facturas):
+        """Marca las facturas como asignadas a un movimiento."""
+        self.usadas.update(factura['pk'] for factura in facturas)
+
+
+class Conciliacion:
+    """
+    Propone las cobranzas de los créditos y los pagos de los débitos de un extracto bancario.
+
+    Las entidades se identifican por los CUIT de la referencia y el concepto, y los proveedores también
+    por el CBU destino de la transferencia. Las facturas pendientes de la ventana de fechas de todos los
+    movimientos se buscan una vez por lado y cada movimiento se resuelve con los índices en memoria,
+    así la cantidad de consultas no depende de la cantidad de movimientos ni de facturas.
+    """
+
+    def __init__(self, movimientos, dias=DIAS_VENTANA):
+        self.movimientos = list(movimientos)
+        self.dias = dias
+
+    def get_lados(self):
+        """Lados de cobranzas y pagos con las entidades de los CUIT y CBU del extracto."""
+        cuits, cbus = set(), set()
+        for movimiento in self.movimientos:
+            cuits.update(get_cuits(movimiento))
+            cbus.update(get_cbus(movimiento))
+
+        clientes = {cuit: pk for pk, cuit in Cliente.objects.filter(cuit__in=cuits).values_list('pk', 'cuit')}
+        proveedores = defaultdict(set)
+        for pk, cuit, cbu in Proveedor.objects.filter(Q(cuit__in=cuits) | Q(cbu__in=cbus)).values_list(
+            'pk', 'cuit', 'cbu'
+        ):
+            proveedores[cuit].add(pk)
+            if cbu:
+                proveedores[cbu].add(pk)
+
+        cobranzas = Lado('cobranza', Cliente, Factura, {cuit: {pk} for cuit, pk in clientes.items()})
+        pagos = Lado('pago', Proveedor, FacturaProveedor, proveedores)
+        if self.movimientos:
+            fechas = [movimiento.fecha for movimiento in self.movimientos]
+            desde = min(fechas) - timedelta(days=self.dias)
+            hasta = max(fechas)
+            cobranzas.cargar(desde, hasta)
+            pagos.cargar(desde, hasta)
+        return cobranzas, pagos
+
+    def proponer(self):
+        """
+        Retorna cada movimiento del extracto, en su orden, con su propuesta de cobranza o pago, None si no
+        se encontró. Los movimientos se resuelven del más antiguo al más reciente, así cada factura se
+        asigna al primer movimiento que la cancela.
+        """
+        cobranzas, pagos = self.get_lados()
+        propuestas = [None] * len(self.movimientos)
+        orden = sorted(range(len(self.movimientos)), key=lambda i: self.movimientos[i].fecha)
+        for i in orden:
+            movimiento = self.movimientos[i]
+            if not movimiento.importe:
+                continue
+            lado = cobranzas if movimiento.importe > 0 else pagos
+            claves = get_cuits(movimiento) | (get_cbus(movimiento) if lado is pagos else set())
+            entidades = sorted(set().union(*(lado.entidades.get(clave, set()) for clave in claves)))
+            facturas, criterio = lado.proponer(movimiento, entidades, self.dias)
+            if facturas:
+                lado.asignar(facturas)
+                propuestas[i] = {
+                    'tipo': lado.tipo,
+                    lado.entidad: facturas[0][lado.entidad],
+                    'facturas': [factura['pk'] for factura in facturas],
+                    'criterio': criterio,
+                }
+        return list(zip(self.movimientos, propuestas))
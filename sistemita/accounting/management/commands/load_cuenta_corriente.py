@@ -0,0 +1,36 @@
+"""Comando para cargar la cuenta corriente de clientes y proveedores."""
+
+# Django
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+# Sistemita
+from sistemita.accounting.models.cuentacorriente import (
+    MovimientoCliente,
+    MovimientoProveedor,
+)
+from sistemita.core.models.cliente import Factura
+from sistemita.core.models.proveedor import FacturaProveedor
+
+CHUNK_SIZE = 1000
+
+
+class Command(BaseCommand):
+    """
+    Registra en la cuenta corriente el saldo de las facturas existentes.
+    Solo agrega las diferencias, puede ejecutarse más de una vez para corregir desvíos.
+    """
+
+    def handle(self, *args, **options):
+        """Controlador."""
+        for model, movimiento in ((Factura, MovimientoCliente), (FacturaProveedor, MovimientoProveedor)):
+            pks = list(model.objects.order_by('pk').values_list('pk', flat=True))
+            count = 0
+            for start in range(0, len(pks), CHUNK_SIZE):
+                end = start + CHUNK_SIZE
+                with transaction.atomic():
+                    facturas = model.objects.filter(pk__in=pks[start:end])
+                    count += len(movimiento.objects.registrar(facturas, concepto='ajuste'))
+            self.stdout.write(f'{model._meta.verbose_name_plural}: {count} movimientos')
+
+        self.stdout.write(self.style.SUCCESS('Done'))
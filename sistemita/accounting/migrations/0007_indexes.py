@@ -0,0 +1,29 @@
+# Generated by Django 3.2 on 2026-10-18 03:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounting', '0006_cobranzafactura_suss'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cobranza',
+            index=models.Index(fields=['-creado'], name='cobranza_creado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cobranza',
+            index=models.Index(fields=['fecha'], name='cobranza_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pago',
+            index=models.Index(fields=['-creado'], name='pago_creado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pago',
+            index=models.Index(fields=['fecha'], name='pago_fecha_idx'),
+        ),
+    ]
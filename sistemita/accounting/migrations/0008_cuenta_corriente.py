@@ -0,0 +1,73 @@
+# Generated by Django 3.2 on 2026-10-18 11:20
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0028_trigram_indexes'),
+        ('accounting', '0007_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MovimientoProveedor',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('creado', models.DateTimeField(auto_now_add=True, verbose_name='creado')),
+                ('modificado', models.DateTimeField(auto_now=True, verbose_name='modificado')),
+                ('fecha', models.DateField()),
+                ('concepto', models.CharField(choices=[('factura', 'Factura'), ('ajuste', 'Ajuste'), ('anulacion', 'Anulación'), ('imputacion', 'Imputación'), ('cobranza', 'Cobranza'), ('pago', 'Pago')], max_length=10)),
+                ('moneda', models.CharField(choices=[('P', '$'), ('D', 'USD')], default='P', max_length=1)),
+                ('monto', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('saldo', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('factura', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='core.facturaproveedor')),
+                ('pago', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='accounting.pago')),
+                ('proveedor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='movimientos', to='core.proveedor')),
+            ],
+            options={
+                'verbose_name': 'movimiento de proveedor',
+                'verbose_name_plural': 'movimientos de proveedores',
+                'db_table': 'accounting_proveedor_cuenta_corriente',
+            },
+        ),
+        migrations.CreateModel(
+            name='MovimientoCliente',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('creado', models.DateTimeField(auto_now_add=True, verbose_name='creado')),
+                ('modificado', models.DateTimeField(auto_now=True, verbose_name='modificado')),
+                ('fecha', models.DateField()),
+                ('concepto', models.CharField(choices=[('factura', 'Factura'), ('ajuste', 'Ajuste'), ('anulacion', 'Anulación'), ('imputacion', 'Imputación'), ('cobranza', 'Cobranza'), ('pago', 'Pago')], max_length=10)),
+                ('moneda', models.CharField(choices=[('P', '$'), ('D', 'USD')], default='P', max_length=1)),
+                ('monto', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('saldo', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('cliente', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='movimientos', to='core.cliente')),
+                ('cobranza', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='accounting.cobranza')),
+                ('factura', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='core.factura')),
+            ],
+            options={
+                'verbose_name': 'movimiento de cliente',
+                'verbose_name_plural': 'movimientos de clientes',
+                'db_table': 'accounting_cliente_cuenta_corriente',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='movimientoproveedor',
+            index=models.Index(fields=['proveedor', 'moneda', '-id'], name='cc_proveedor_saldo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movimientoproveedor',
+            index=models.Index(fields=['proveedor', 'moneda', 'fecha'], name='cc_proveedor_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movimientocliente',
+            index=models.Index(fields=['cliente', 'moneda', '-id'], name='cc_cliente_saldo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movimientocliente',
+            index=models.Index(fields=['cliente', 'moneda', 'fecha'], name='cc_cliente_fecha_idx'),
+        ),
+    ]
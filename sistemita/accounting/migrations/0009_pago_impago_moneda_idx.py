@@ -0,0 +1,17 @@
+# Generated by Django 3.2 on 2026-10-18 14:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounting', '0008_cuenta_corriente'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='pago',
+            index=models.Index(condition=models.Q(('pagado', False)), fields=['moneda'], name='pago_impago_moneda_idx'),
+        ),
+    ]
@@ -1,2 +1,3 @@
 from .cobranza import *  # noqa
+from .cuentacorriente import *  # noqa
 from .pago import *  # noqa
@@ -23,6 +23,10 @@ class Cobranza(TimeStampedModel, models.Model):
 
         db_table = 'accounting_cliente_cobranza'
         ordering = ('creado',)
+        indexes = [
+            models.Index(fields=['-creado'], name='cobranza_creado_idx'),
+            models.Index(fields=['fecha'], name='cobranza_fecha_idx'),
+        ]
         verbose_name = 'cobranza'
         verbose_name_plural = 'cobranzas'
 
@@ -0,0 +1,237 @@
+"""Modelos de cuenta corriente de clientes y proveedores."""
+
+# Utilities
+from collections import defaultdict
+from decimal import Decimal
+
+# Django
+from django.db import models, transaction
+from django.db.models import Max, Sum
+from django.utils import timezone
+
+# Sistemita
+from sistemita.accounting.models.cobranza import Cobranza
+from sistemita.accounting.models.pago import Pago
+from sistemita.core.constants import (
+    CONCEPTOS_CUENTA_CORRIENTE,
+    MONEDAS,
+    TRAMOS_ANTIGUEDAD,
+    ZERO_DECIMAL,
+)
+from sistemita.core.models.cliente import Cliente, Factura
+from sistemita.core.models.proveedor import FacturaProveedor, Proveedor
+from sistemita.core.models.utils import TimeStampedModel
+
+
+def get_saldo_factura(factura):
+    """
+    Retorna lo que aporta la factura al saldo de la cuenta corriente.
+    Las facturas no cobradas suman su total y las notas de crédito sin imputar lo restan.
+    """
+    if factura.cobrado:
+        return ZERO_DECIMAL
+    total = Decimal(factura.total)
+    return -total if factura.tipo.startswith('NC') else total
+
+
+class MovimientoQuerySet(models.QuerySet):
+    """QuerySet de movimientos de cuenta corriente."""
+
+    def registrar(self, facturas, concepto, fecha=None, anular=False, por_factura=None, **referencias):
+        """
+        Registra los movimientos que llevan el saldo de cada factura a su valor actual.
+
+        Compara lo que aporta cada factura al saldo con la suma de sus movimientos y agrega la
+        diferencia, así cualquier alta, cobro, imputación o edición queda asentada sin modificar
+        movimientos anteriores. Con `anular` las facturas dejan de aportar saldo (antes de eliminarlas).
+        `por_factura` asocia referencias propias a cada pk de factura, por ejemplo el pago de cada una
+        o su propia fecha.
+        Se debe llamar dentro de la transacción que modifica las facturas.
+        """
+        entidad = self.model.ENTIDAD
+        facturas = list(facturas)
+        if not facturas:
+            return []
+
+        with transaction.atomic():
+            actual = {}
+            rows = (
+                self.model.objects.filter(factura__in=[factura.pk for factura in facturas])
+                .values_list('factura', entidad, 'moneda')
+                .annotate(monto=Sum('monto'))
+                .order_by()
+            )
+            for factura_id, entidad_id, moneda, monto in rows:
+                actual[(factura_id, entidad_id, moneda)] = monto
+
+            esperado = {}
+            if not anular:
+                for factura in facturas:
+                    key = (factura.pk, getattr(factura, f'{entidad}_id'), factura.moneda)
+                    esperado[key] = get_saldo_factura(factura)
+
+            diferencias = []
+            for key in list(actual) + [key for key in esperado if key not in actual]:
+                monto = esperado.get(key, ZERO_DECIMAL) - actual.get(key, ZERO_DECIMAL)
+                if monto:
+                    diferencias.append((key, monto))
+            if not diferencias:
+                return []
+
+            # Bloquea las entidades para que los saldos corridos no se pisen entre transacciones
+            entidades = sorted({entidad_id for (_, entidad_id, _), _ in diferencias})
+            entidad_model = self.model._meta.get_field(entidad).related_model
+            list(entidad_model.objects.select_for_update().filter(pk__in=entidades).order_by('pk').values_list('pk'))
+
+            saldos = self.ultimos_saldos({(entidad_id, moneda) for (_, entidad_id, moneda), _ in diferencias})
+            movimientos = []
+            for (factura_id, entidad_id, moneda), monto in diferencias:
+                saldos[(entidad_id, moneda)] += monto
+                valores = {
+                    'fecha': fecha or timezone.localdate(),
+                    **referencias,
+                    **(por_factura or {}).get(factura_id, {}),
+                }
+                movimientos.append(
+                    self.model(
+                        concepto=concepto,
+                        moneda=moneda,
+                        monto=monto,
+                        saldo=saldos[(entidad_id, moneda)],
+                        factura_id=factura_id,
+                        **{f'{entidad}_id': entidad_id},
+                        **valores,
+                    )
+                )
+            return self.model.objects.bulk_create(movimientos)
+
+    def saldo(self, entidad, moneda):
+        """Retorna el saldo actual de la entidad en la moneda, es el saldo del último movimiento."""
+        saldo = (
+            self.model.objects.filter(**{self.model.ENTIDAD: entidad}, moneda=moneda)
+            .order_by('-pk')
+            .values_list('saldo', flat=True)
+            .first()
+        )
+        return saldo if saldo is not None else ZERO_DECIMAL
+
+    def ultimos_saldos(self, claves):
+        """Retorna el saldo actual de cada par (entidad, moneda) de `claves` en una sola consulta."""
+        entidad = self.model.ENTIDAD
+        ultimos = (
+            self.model.objects.filter(**{f'{entidad}__in': {entidad_id for entidad_id, _ in claves}})
+            .order_by()
+            .values(entidad, 'moneda')
+            .annotate(ultimo=Max('pk'))
+            .values('ultimo')
+        )
+        saldos = {clave: ZERO_DECIMAL for clave in claves}
+        rows = self.model.objects.filter(pk__in=ultimos).values_list(entidad, 'moneda', 'saldo')
+        for entidad_id, moneda, saldo in rows:
+            if (entidad_id, moneda) in saldos:
+                saldos[(entidad_id, moneda)] = saldo
+        return saldos
+
+    def saldos(self, entidad):
+        """Retorna el saldo actual de la entidad en cada moneda."""
+        return {moneda: self.saldo(entidad, moneda) for moneda, _ in MONEDAS}
+
+    def estado_de_cuenta(self, entidad, moneda, desde=None, hasta=None):
+        """Movimientos de la entidad en la moneda, en el orden en que se registraron."""
+        queryset = self.model.objects.filter(**{self.model.ENTIDAD: entidad}, moneda=moneda)
+        if desde:
+            queryset = queryset.filter(fecha__gte=desde)
+        if hasta:
+            queryset = queryset.filter(fecha__lte=hasta)
+        return queryset.select_related('factura').order_by('pk')
+
+    def antiguedad(self, entidad, moneda, fecha=None):
+        """
+        Retorna la deuda pendiente de la entidad agrupada por la antigüedad de las facturas.
+        Las claves son los tramos de días de `TRAMOS_ANTIGUEDAD`.
+        """
+        fecha = fecha or timezone.localdate()
+        tramos = defaultdict(lambda: ZERO_DECIMAL)
+        rows = (
+            self.model.objects.filter(**{self.model.ENTIDAD: entidad}, moneda=moneda, factura__isnull=False)
+            .values_list('factura__fecha')
+            .annotate(pendiente=Sum('monto'))
+            .order_by()
+        )
+        for fecha_factura, pendiente in rows:
+            if not pendiente:
+                continue
+            dias = (fecha - fecha_factura).days
+            for desde, hasta in TRAMOS_ANTIGUEDAD:
+                if hasta is None or dias <= hasta:
+                    tramos[(desde, hasta)] += pendiente
+                    break
+        return {tramo: tramos[tramo] for tramo in TRAMOS_ANTIGUEDAD}
+
+
+class MovimientoCuentaCorriente(TimeStampedModel, models.Model):
+    """
+    Clase abstracta de movimientos de cuenta corriente.
+
+    Los movimientos no se modifican ni eliminan, cada uno guarda el saldo de la entidad en la
+    moneda luego de registrarlo.
+    """
+
+    fecha = models.DateField(blank=False)
+    concepto = models.CharField(blank=False, max_length=10, choices=CONCEPTOS_CUENTA_CORRIENTE)
+    moneda = models.CharField(blank=False, max_length=1, choices=MONEDAS, default='P')
+    monto = models.DecimalField(blank=False, decimal_places=2, max_digits=12)
+    saldo = models.DecimalField(blank=False, decimal_places=2, max_digits=14)
+
+    objects = MovimientoQuerySet.as_manager()
+
+    class Meta:
+        """Configuraciones del modelo."""
+
+        abstract = True
+
+    def __str__(self):
+        """Representación legible del modelo."""
+        return f'{self.fecha} - {self.get_concepto_display()} - {self.moneda} {self.monto}'
+
+
+class MovimientoCliente(MovimientoCuentaCorriente):
+    """Modelo de movimiento de la cuenta corriente de un cliente."""
+
+    ENTIDAD = 'cliente'
+
+    cliente = models.ForeignKey(Cliente, blank=False, on_delete=models.CASCADE, related_name='movimientos')
+    factura = models.ForeignKey(Factura, blank=True, null=True, on_delete=models.SET_NULL)
+    cobranza = models.ForeignKey(Cobranza, blank=True, null=True, on_delete=models.SET_NULL)
+
+    class Meta:
+        """Configuraciones del modelo."""
+
+        db_table = 'accounting_cliente_cuenta_corriente'
+        indexes = [
+            models.Index(fields=['cliente', 'moneda', '-id'], name='cc_cliente_saldo_idx'),
+            models.Index(fields=['cliente', 'moneda', 'fecha'], name='cc_cliente_fecha_idx'),
+        ]
+        verbose_name = 'movimiento de cliente'
+        verbose_name_plural = 'movimientos de clientes'
+
+
+class MovimientoProveedor(MovimientoCuentaCorriente):
+    """Modelo de movimiento de la cuenta corriente de un proveedor."""
+
+    ENTIDAD = 'proveedor'
+
+    proveedor = models.ForeignKey(Proveedor, blank=False, on_delete=models.CASCADE, related_name='movimientos')
+    factura = models.ForeignKey(FacturaProveedor, blank=True, null=True, on_delete=models.SET_NULL)
+    pago = models.ForeignKey(Pago, blank=True, null=True, on_delete=models.SET_NULL)
+
+    class Meta:
+        """Configuraciones del modelo."""
+
+        db_table = 'accounting_proveedor_cuenta_corriente'
+        indexes = [
+            models.Index(fields=['proveedor', 'moneda', '-id'], name='cc_proveedor_saldo_idx'),
+            models.Index(fields=['proveedor', 'moneda', 'fecha'], name='cc_proveedor_fecha_idx'),
+        ]
+        verbose_name = 'movimiento de proveedor'
+        verbose_name_plural = 'movimientos de proveedores'
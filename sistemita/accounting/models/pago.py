@@ -24,6 +24,11 @@ class Pago(TimeStampedModel, models.Model):
 
         db_table = 'accounting_proveedor_pago'
         ordering = ('creado',)
+        indexes = [
+            models.Index(fields=['moneda'], condition=models.Q(pagado=False), name='pago_impago_moneda_idx'),
+            models.Index(fields=['-creado'], name='pago_creado_idx'),
+            models.Index(fields=['fecha'], name='pago_fecha_idx'),
+        ]
         verbose_name = 'pago'
         verbose_name_plural = 'pagos'
 
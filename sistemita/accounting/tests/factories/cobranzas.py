@@ -91,10 +91,10 @@ class CobranzaFactoryData:
         }
         return data
 
-    def update(self):
+    def update(self, limit=None):
         """Construye un diccionario con una cobranza existente."""
         cobranza = self.instance.create()
-        limit = rand_range(1, 3)
+        limit = limit or rand_range(1, 3)
         for _ in range(0, limit):
             cobranza_factura = CobranzaFacturaFactory.create(cobranza=cobranza)
             CobranzaFacturaPagoFactory.create(cobranza_factura=cobranza_factura)
@@ -84,10 +84,10 @@ class PagoFactoryData:
         }
         return data
 
-    def update(self):
+    def update(self, limit=None):
         """Construye un diccionario con un existente."""
         pago = self.instance.create()
-        limit = rand_range(1, 3)
+        limit = limit or rand_range(1, 3)
         for _ in range(0, limit):
             pago_factura = PagoFacturaFactory.create(pago=pago)
             PagoFacturaPagoFactory.create(pago_factura=pago_factura)
@@ -0,0 +1,205 @@
+"""Test de la conciliación de extractos bancarios."""
+
+# Utils
+from datetime import date
+from decimal import Decimal
+
+# Django
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+# Sistemita
+from sistemita.accounting.conciliacion import Conciliacion
+from sistemita.core.tests.factories import (
+    ClienteFactory,
+    FacturaClienteFactory,
+    FacturaProveedorFactory,
+    ProveedorFactory,
+)
+from sistemita.utils.extractos import MovimientoBancario, leer_extracto
+from sistemita.utils.tests import BaseTestCase, prevent_request_warnings
+
+TEST_DATA_DIR = settings.ROOT_DIR / 'test-data'
+
+
+def setUpModule():
+    """Agrega permisos a utilizar por los test."""
+    call_command('add_permissions', verbosity=0)
+
+
+def get_movimiento(importe, concepto='', fecha=date(2022, 6, 10), moneda='P'):
+    """Movimiento de un extracto."""
+    return MovimientoBancario(
+        cuenta='762-003113/6',
+        moneda=moneda,
+        fecha=fecha,
+        sucursal='0762',
+        codigo='1968',
+        referencia='000000001',
+        concepto=concepto,
+        importe=Decimal(importe),
+        saldo=Decimal('0.00'),
+    )
+
+
+class ExtractoTest(BaseTestCase):
+    """Test sobre la lectura de extractos bancarios."""
+
+    def test_leer_extracto(self):
+        """Verifica que se lean los movimientos de todas las tablas del extracto."""
+        with open(TEST_DATA_DIR / 'movimientos.csv', 'rb') as file:
+            movimientos = list(leer_extracto(file))
+        self.assertEqual(len(movimientos), 207)
+        self.assertEqual({movimiento.moneda for movimiento in movimientos}, {'P'})
+        self.assertEqual(movimientos[1].fecha, date(2019, 8, 7))
+        self.assertEqual(movimientos[1].importe, Decimal('506774.00'))
+        self.assertEqual(movimientos[1].referencia, '036374332')
+
+    def test_leer_extracto_minimo(self):
+        """Verifica los importes negativos, los saldos y los acentos del extracto."""
+        with open(TEST_DATA_DIR / 'movimientos-minimos.csv', 'rb') as file:
+            movimientos = list(leer_extracto(file))
+        self.assertEqual(
+            [(movimiento.fecha, movimiento.importe, movimiento.saldo) for movimiento in movimientos],
+            [
+                (date(2019, 8, 7), Decimal('-142994.20'), Decimal('0.00')),
+                (date(2019, 8, 6), Decimal('-1452.49'), Decimal('791997.54')),
+            ],
+        )
+        self.assertEqual(movimientos[1].concepto, 'Imp Ley 25413 Deb 0,6%')
+
+
+class ConciliacionTest(BaseTestCase):
+    """Test sobre las propuestas de cobranzas y pagos de los movimientos."""
+
+    def setUp(self):
+        """Genera facturas pendientes de un cliente y un proveedor."""
+        super().setUp()
+        self.cliente = ClienteFactory.create(cuit='30711111112')
+        self.proveedor = ProveedorFactory.create(cuit='20222222223', cbu='0070009220000015163004')
+        self.factura = FacturaClienteFactory.create(
+            cliente=self.cliente,
+            fecha=date(2022, 6, 1),
+            tipo='A',
+            moneda='P',
+            total=Decimal('1500.00'),
+            cobrado=False,
+        )
+        self.facturas_proveedor = [
+            FacturaProveedorFactory.create(
+                proveedor=self.proveedor,
+                fecha=date(2022, 5, dia),
+                tipo='A',
+                moneda='P',
+                total=Decimal(total),
+                cobrado=False,
+            )
+            for dia, total in ((2, '100.00'), (3, '250.50'), (4, '400.00'))
+        ]
+
+    def proponer(self, *movimientos):
+        """Propuestas de los movimientos."""
+        return [propuesta for _, propuesta in Conciliacion(movimientos).proponer()]
+
+    def test_cobranza_por_cuit(self):
+        """Verifica que el crédito con el CUIT del cliente proponga la cobranza de su factura."""
+        propuestas = self.proponer(get_movimiento('1500.00', 'Transferencias Inmediatas - Originante 30711111112'))
+        self.assertEqual(
+            propuestas,
+            [{'tipo': 'cobranza', 'cliente': self.cliente.pk, 'facturas': [self.factura.pk], 'criterio': 'entidad'}],
+        )
+
+    def test_cobranza_por_importe(self):
+        """Verifica la propuesta por importe sin CUIT, siempre que la factura sea anterior y de la misma moneda."""
+        propuestas = self.proponer(
+            get_movimiento('1500.00', fecha=date(2022, 5, 31)),
+            get_movimiento('1500.00', moneda='D'),
+            get_movimiento('1500.00'),
+            get_movimiento('1500.00'),
+        )
+        self.assertEqual(propuestas[:2], [None, None])
+        self.assertEqual(propuestas[2]['criterio'], 'importe')
+        self.assertIsNone(propuestas[3])
+
+    def test_pago_por_cbu_con_varias_facturas(self):
+        """Verifica que el débito al CBU del proveedor proponga las facturas que suman el importe."""
+        propuestas = self.proponer(get_movimiento('-500.00', 'Pago Cci 24hs - A Cbu 0070009220000015163004'))
+        self.assertEqual(propuestas[0]['tipo'], 'pago')
+        self.assertEqual(propuestas[0]['proveedor'], self.proveedor.pk)
+        self.assertEqual(
+            sorted(propuestas[0]['facturas']), [self.facturas_proveedor[0].pk, self.facturas_proveedor[2].pk]
+        )
+        self.assertEqual(propuestas[0]['criterio'], 'suma')
+
+    def test_sin_propuesta(self):
+        """Verifica que los débitos sin factura, como los impuestos, no tengan propuesta."""
+        self.assertEqual(self.proponer(get_movimiento('-15.00', 'Com Transf A Otros Bancos Canales')), [None])
+
+    def test_queries(self):
+        """Verifica que la cantidad de consultas no dependa de la cantidad de movimientos ni de facturas."""
+
+        def count_queries(limit):
+            FacturaClienteFactory.create_batch(
+                limit, cliente=self.cliente, fecha=date(2022, 6, 1), tipo='A', cobrado=False
+            )
+            concepto = '30711111112 - A Cbu 0070009220000015163004'
+            movimientos = [get_movimiento(f'{i}.00', concepto) for i in range(limit)]
+            with CaptureQueriesContext(connection) as context:
+                Conciliacion(movimientos).proponer()
+            return len(context.captured_queries)
+
+        self.assertEqual(count_queries(2), count_queries(40))
+
+
+class ConciliacionAPITestCase(BaseTestCase):
+    """Tests sobre la API de conciliación."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.create_user()
+        self.client.login(username='user', password='user12345')
+
+    def test_conciliacion(self):
+        """Verifica que se devuelvan los movimientos del extracto con sus propuestas."""
+        cliente = ClienteFactory.create(cuit='30546741253')
+        factura = FacturaClienteFactory.create(
+            cliente=cliente,
+            fecha=date(2019, 8, 1),
+            tipo='A',
+            moneda='P',
+            total=Decimal('418433.00'),
+            cobrado=False,
+        )
+        with open(TEST_DATA_DIR / 'movimientos.csv', 'rb') as file:
+            response = self.client.post('/api/conciliacion/', {'file': file}, format='multipart')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 207)
+        cobranzas = [movimiento for movimiento in response.json() if movimiento['propuesta']]
+        self.assertEqual(
+            [movimiento['propuesta'] for movimiento in cobranzas],
+            [{'tipo': 'cobranza', 'cliente': cliente.pk, 'facturas': [factura.pk], 'criterio': 'entidad'}],
+        )
+        self.assertEqual(cobranzas[0]['importe'], '418433.00')
+        self.assertEqual(
+            response.json()[-1],
+            {
+                'fecha': '2019-06-10',
+                'referencia': '004139739',
+                'concepto': 'Pago Cci 24hs Gravada Interbanking  - A Cbu 0070009230004029332655',
+                'moneda': 'P',
+                'importe': '-30000.00',
+                'propuesta': None,
+            },
+        )
+
+    @prevent_request_warnings
+    def test_conciliacion_invalid_file(self):
+        """Verifica el error de un archivo que no es un extracto."""
+        file = SimpleUploadedFile('movimientos.csv', 'Fecha\tReferencia\n01/01/2022\t1\n'.encode('latin-1'))
+        response = self.client.post('/api/conciliacion/', {'file': file}, format='multipart')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'file': ['El archivo no es un extracto de movimientos válido.']})
@@ -0,0 +1,116 @@
+"""Test de la cuenta corriente de clientes y proveedores."""
+
+# Utils
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+
+# Django
+from django.core.management import call_command
+
+# Sistemita
+from sistemita.accounting.models import MovimientoCliente, MovimientoProveedor
+from sistemita.accounting.tests.factories import CobranzaFactory
+from sistemita.core.models import Factura
+from sistemita.core.tests.factories import (
+    ClienteFactory,
+    FacturaClienteFactory,
+    FacturaProveedorFactory,
+)
+from sistemita.utils.tests import BaseTestCase
+
+
+def setUpModule():
+    """Agrega permisos a utilizar por los test."""
+    call_command('add_permissions', verbosity=0)
+
+
+class MovimientoClienteTest(BaseTestCase):
+    """Test sobre los movimientos de la cuenta corriente de clientes."""
+
+    def setUp(self):
+        """Genera facturas impagas de un cliente en pesos."""
+        super().setUp()
+        self.cliente = ClienteFactory.create()
+        self.factura = FacturaClienteFactory.create(
+            cliente=self.cliente, tipo='A', moneda='P', total=Decimal('100.00'), cobrado=False
+        )
+        self.nota_de_credito = FacturaClienteFactory.create(
+            cliente=self.cliente, tipo='NCA', moneda='P', total=Decimal('30.00'), cobrado=False
+        )
+        MovimientoCliente.objects.registrar([self.factura, self.nota_de_credito], concepto='factura')
+
+    def test_saldo(self):
+        """Verifica que el saldo sume las facturas impagas y reste las notas de crédito."""
+        self.assertEqual(MovimientoCliente.objects.saldo(self.cliente, 'P'), Decimal('70.00'))
+        self.assertEqual(MovimientoCliente.objects.saldos(self.cliente), {'P': Decimal('70.00'), 'D': Decimal('0')})
+
+    def test_registrar_sin_cambios(self):
+        """Verifica que no se registren movimientos si el saldo de las facturas no cambió."""
+        movimientos = MovimientoCliente.objects.registrar([self.factura, self.nota_de_credito], concepto='ajuste')
+        self.assertEqual(movimientos, [])
+        self.assertEqual(MovimientoCliente.objects.count(), 2)
+
+    def test_registrar_cobro(self):
+        """Verifica que el cobro agregue un movimiento sin modificar los anteriores."""
+        anteriores = list(MovimientoCliente.objects.values_list('pk', 'monto', 'saldo'))
+        Factura.objects.filter(pk=self.factura.pk).update(cobrado=True)
+        cobranza = CobranzaFactory.create(cliente=self.cliente)
+        MovimientoCliente.objects.registrar(
+            Factura.objects.filter(pk=self.factura.pk), concepto='cobranza', fecha=cobranza.fecha, cobranza=cobranza
+        )
+
+        self.assertEqual(list(MovimientoCliente.objects.values_list('pk', 'monto', 'saldo')[:2]), anteriores)
+        movimiento = MovimientoCliente.objects.latest('pk')
+        self.assertEqual(movimiento.monto, Decimal('-100.00'))
+        self.assertEqual(movimiento.saldo, Decimal('-30.00'))
+        self.assertEqual(movimiento.cobranza, cobranza)
+        self.assertEqual(MovimientoCliente.objects.saldo(self.cliente, 'P'), Decimal('-30.00'))
+
+    def test_registrar_cambio_de_moneda(self):
+        """Verifica que al cambiar la moneda el saldo pase de una moneda a la otra."""
+        Factura.objects.filter(pk=self.factura.pk).update(moneda='D')
+        MovimientoCliente.objects.registrar(Factura.objects.filter(pk=self.factura.pk), concepto='ajuste')
+        saldos = MovimientoCliente.objects.saldos(self.cliente)
+        self.assertEqual(saldos, {'P': Decimal('-30.00'), 'D': Decimal('100.00')})
+
+    def test_anular(self):
+        """Verifica que al anular las facturas el saldo vuelva a cero y se conserven los movimientos."""
+        MovimientoCliente.objects.registrar([self.factura, self.nota_de_credito], concepto='anulacion', anular=True)
+        self.assertEqual(MovimientoCliente.objects.saldo(self.cliente, 'P'), Decimal('0'))
+        self.assertEqual(MovimientoCliente.objects.count(), 4)
+
+    def test_estado_de_cuenta(self):
+        """Verifica que el estado de cuenta liste los movimientos en el orden en que se registraron."""
+        movimientos = MovimientoCliente.objects.estado_de_cuenta(self.cliente, 'P')
+        self.assertEqual([movimiento.factura for movimiento in movimientos], [self.factura, self.nota_de_credito])
+        self.assertEqual([movimiento.saldo for movimiento in movimientos], [Decimal('100.00'), Decimal('70.00')])
+
+    def test_antiguedad(self):
+        """Verifica la deuda agrupada por antigüedad de las facturas."""
+        hoy = date(2022, 6, 30)
+        Factura.objects.filter(pk=self.factura.pk).update(fecha=hoy - timedelta(days=45))
+        Factura.objects.filter(pk=self.nota_de_credito.pk).update(fecha=hoy - timedelta(days=10))
+        antiguedad = MovimientoCliente.objects.antiguedad(self.cliente, 'P', fecha=hoy)
+        self.assertEqual(
+            antiguedad,
+            {
+                (0, 30): Decimal('-30.00'),
+                (31, 60): Decimal('100.00'),
+                (61, 90): Decimal('0'),
+                (91, None): Decimal('0'),
+            },
+        )
+
+
+class MovimientoProveedorTest(BaseTestCase):
+    """Test sobre los movimientos de la cuenta corriente de proveedores."""
+
+    def test_load_cuenta_corriente(self):
+        """Verifica que el comando cargue el saldo de las facturas existentes una sola vez."""
+        factura = FacturaProveedorFactory.create(tipo='A', moneda='D', total=Decimal('50.00'), cobrado=False)
+        FacturaProveedorFactory.create(proveedor=factura.proveedor, tipo='B', moneda='D', cobrado=True)
+        call_command('load_cuenta_corriente', stdout=StringIO())
+        call_command('load_cuenta_corriente', stdout=StringIO())
+        self.assertEqual(MovimientoProveedor.objects.count(), 1)
+        self.assertEqual(MovimientoProveedor.objects.saldo(factura.proveedor, 'D'), Decimal('50.00'))
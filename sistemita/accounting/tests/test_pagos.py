@@ -1,7 +1,12 @@
 """Pagos test."""
 
+# Utils
+from decimal import Decimal
+
 # Django
 from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from faker import Faker
 
 # Sistemita
@@ -11,6 +16,8 @@ from sistemita.accounting.tests.factories import (
     PagoFacturaFactory,
     PagoFacturaPagoFactory,
 )
+from sistemita.core.tests.factories import MedioPagoFactory
+from sistemita.utils.export import PagoExport, PagoRetencionExport
 from sistemita.utils.tests import (
     BaseTestCase,
     prevent_request_error,
@@ -139,6 +146,54 @@ class PagoListViewTest(BaseTestCase):
         )
         self.assertEqual(response.status_code, 200)
 
+    def test_export_data(self):
+        """Verifica una fila por factura del pago, con el total pagado por banco en la primera."""
+        banco = MedioPagoFactory.create(nombre='Banco')
+        efectivo = MedioPagoFactory.create(nombre='Efectivo')
+        pago = PagoFactory.create()
+        metodos = [[(banco, '100.00'), (efectivo, '50.00')], [(banco, '30.00')]]
+        for pago_factura, pagos in zip(PagoFacturaFactory.create_batch(2, pago=pago), metodos):
+            for metodo, monto in pagos:
+                PagoFacturaPagoFactory.create(pago_factura=pago_factura, metodo=metodo, monto=Decimal(monto))
+        pago = Pago.objects.select_related('proveedor').get(pk=pago.pk)
+        pago_facturas = pago.pago_facturas.select_related('factura').order_by('pk')
+
+        rows = list(PagoExport(Pago.objects.all()).get_data())
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(
+            rows[0][:5],
+            [
+                pago.pk,
+                pago.fecha.strftime('%d/%m/%Y'),
+                pago.proveedor.razon_social,
+                pago.proveedor.cbu,
+                pago_facturas[0].factura.numero,
+            ],
+        )
+        self.assertEqual(rows[0][11], Decimal('130.00'))
+        self.assertEqual(rows[1][4], pago_facturas[1].factura.numero)
+
+        rows = list(PagoRetencionExport(Pago.objects.all()).get_data())
+        self.assertEqual(
+            rows[1], ['', '', '', pago_facturas[1].ganancias, pago_facturas[1].ingresos_brutos, pago_facturas[1].iva]
+        )
+
+    def test_export_queries(self):
+        """Verifica que la cantidad de consultas de las exportaciones no dependa de la cantidad de pagos."""
+        banco = MedioPagoFactory.create(nombre='Banco')
+
+        def count_queries(export_class, limit):
+            for pago in PagoFactory.create_batch(limit):
+                for pago_factura in PagoFacturaFactory.create_batch(2, pago=pago):
+                    PagoFacturaPagoFactory.create(pago_factura=pago_factura, metodo=banco)
+            with CaptureQueriesContext(connection) as context:
+                list(export_class(Pago.objects.all()).get_data())
+            return len(context.captured_queries)
+
+        for export_class in (PagoExport, PagoRetencionExport):
+            with self.subTest(export=export_class.__name__):
+                self.assertEqual(count_queries(export_class, 2), count_queries(export_class, 10))
+
     @prevent_request_error
     @prevent_request_warnings
     def test_list_export_retencion_ganancia(self):
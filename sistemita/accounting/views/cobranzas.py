@@ -1,14 +1,10 @@
 """Vistas del modelo de Cobranza."""
 
-# Datetime
-from datetime import date
-
 # Django
 from django.contrib import messages
 from django.contrib.auth.mixins import PermissionRequiredMixin
 from django.contrib.messages.views import SuccessMessageMixin
 from django.core.exceptions import FieldError
-from django.db.models import Q
 from django.http import HttpResponseRedirect
 from django.shortcuts import redirect
 from django.urls import reverse_lazy
@@ -18,11 +14,14 @@ from django_filters.views import FilterView
 # Sistemita
 from sistemita.accounting.filters import CobranzaFilterSet
 from sistemita.accounting.models.cobranza import Cobranza
+from sistemita.accounting.models.cuentacorriente import MovimientoCliente
 from sistemita.core.models.cliente import Factura
 from sistemita.core.views.home import error_403
 from sistemita.expense.models import Fondo
 from sistemita.utils.commons import get_deleted_objects
+from sistemita.utils.search import search_queryset
 from sistemita.utils.strings import _MESSAGE_SUCCESS_DELETE, MESSAGE_403
+from sistemita.utils.summary import created_this_week
 
 
 class CobranzaListView(PermissionRequiredMixin, SuccessMessageMixin, FilterView):
@@ -32,6 +31,7 @@ class CobranzaListView(PermissionRequiredMixin, SuccessMessageMixin, FilterView)
     paginate_by = 10
     permission_required = 'accounting.list_cobranza'
     raise_exception = True
+    search_fields = ['cliente__razon_social', 'cliente__correo', 'cliente__cuit']
     template_name = 'accounting/cobranza_list.html'
 
     def get_queryset(self):
@@ -42,11 +42,7 @@ class CobranzaListView(PermissionRequiredMixin, SuccessMessageMixin, FilterView)
         order_by = self.request.GET.get('order_by', None)
         try:
             if search:
-                queryset = queryset.filter(
-                    Q(cliente__razon_social__icontains=search)
-                    | Q(cliente__correo__icontains=search)
-                    | Q(cliente__cuit__icontains=search)
-                )
+                queryset = search_queryset(queryset, search, self.search_fields)
             if order_by:
                 queryset = queryset.order_by(order_by)
         except FieldError:
@@ -57,9 +53,7 @@ class CobranzaListView(PermissionRequiredMixin, SuccessMessageMixin, FilterView)
         """Obtiene datos para incluir en los reportes."""
         context = super().get_context_data(**kwargs)
         queryset = self.get_queryset()
-        current_week = date.today().isocalendar()[1]
-
-        context['last_created'] = queryset.filter(creado__week=current_week).count()
+        context['last_created'] = queryset.filter(created_this_week()).count()
 
         return context
 
@@ -145,6 +139,10 @@ class CobranzaDeleteView(PermissionRequiredMixin, DeleteView):
         for c_factura in cobranza_facturas:
             Factura.objects.filter(pk=c_factura.factura.id).update(cobrado=False)
             Fondo.objects.filter(factura=c_factura.factura).update(disponible=False)
+        Factura.objects.filter(cobranzafactura__cobranza=self.object).update_status()
+        MovimientoCliente.objects.registrar(
+            Factura.objects.filter(cobranzafactura__cobranza=self.object), concepto='anulacion'
+        )
 
         success_url = self.get_success_url()
         self.object.delete()
@@ -4,14 +4,14 @@
 import tempfile
 
 # Datetime
-from datetime import date, datetime
+from datetime import datetime
 
 # Django
 from django.contrib import messages
 from django.contrib.auth.mixins import PermissionRequiredMixin
 from django.contrib.messages.views import SuccessMessageMixin
 from django.core.exceptions import FieldError
-from django.db.models import Count, F, Q, Sum
+from django.db.models import F, Sum
 from django.http import HttpResponse, HttpResponseRedirect
 from django.shortcuts import redirect
 from django.template.loader import render_to_string
@@ -24,21 +24,27 @@ from weasyprint import HTML
 
 # Accounting
 from sistemita.accounting.filters import PagoFilterSet
+from sistemita.accounting.models.cuentacorriente import MovimientoProveedor
 from sistemita.accounting.models.pago import Pago, PagoFactura
+from sistemita.core.models.cliente import Factura
 from sistemita.core.models.proveedor import FacturaProveedor
 from sistemita.core.views.home import error_403
 from sistemita.utils.commons import get_deleted_objects
 from sistemita.utils.export import export_excel
+from sistemita.utils.pagination import KeysetPaginationMixin
+from sistemita.utils.search import search_queryset
 from sistemita.utils.strings import MESSAGE_403, MESSAGE_SUCCESS_DELETE
+from sistemita.utils.summary import get_debt_summary
 
 
-class PagoListView(PermissionRequiredMixin, SuccessMessageMixin, FilterView):
+class PagoListView(PermissionRequiredMixin, SuccessMessageMixin, KeysetPaginationMixin, FilterView):
     """Vista que devuelve un listado de pagos."""
 
     filterset_class = PagoFilterSet
     paginate_by = 10
     permission_required = 'accounting.list_pago'
     raise_exception = True
+    search_fields = ['proveedor__razon_social', 'proveedor__correo', 'proveedor__cuit']
     template_name = 'accounting/pago_list.html'
 
     def get_queryset(self):
@@ -51,11 +57,7 @@ class PagoListView(PermissionRequiredMixin, SuccessMessageMixin, FilterView):
         order_by = self.request.GET.get('order_by', None)
         try:
             if search:
-                queryset = queryset.filter(
-                    Q(proveedor__razon_social__icontains=search)
-                    | Q(proveedor__correo__icontains=search)
-                    | Q(proveedor__cuit__icontains=search)
-                )
+                queryset = search_queryset(queryset, search, self.search_fields)
             if desde:
                 desde = datetime.strptime(desde, '%d/%m/%Y')
                 queryset = queryset.filter(fecha__gte=desde)
@@ -86,11 +88,7 @@ class PagoListView(PermissionRequiredMixin, SuccessMessageMixin, FilterView):
         """Obtiene datos para incluir en los reportes."""
         context = super().get_context_data(**kwargs)
         queryset = self.get_queryset()
-        current_week = date.today().isocalendar()[1]
-
-        context['last_created'] = queryset.filter(creado__week=current_week).count()
-        context['debt_in_peso'] = queryset.filter(pagado=False, moneda='P').aggregate(Sum('total'), Count('id'))
-        context['debt_in_dollar'] = queryset.filter(pagado=False, moneda='D').aggregate(Sum('total'), Count('id'))
+        context.update(get_debt_summary(queryset, 'pagado', notas_de_credito=False))
 
         return context
 
@@ -173,6 +171,11 @@ class PagoDeleteView(PermissionRequiredMixin, DeleteView):
         pago_facturas = self.object.pago_facturas.all()
         for c_factura in pago_facturas:
             FacturaProveedor.objects.filter(pk=c_factura.factura.id).update(cobrado=False)
+        facturas_proveedor = [c_factura.factura_id for c_factura in pago_facturas]
+        Factura.objects.filter_by_facturas_proveedor(facturas_proveedor).update_status()
+        MovimientoProveedor.objects.registrar(
+            FacturaProveedor.objects.filter(pk__in=facturas_proveedor), concepto='anulacion'
+        )
 
         success_url = self.get_success_url()
         self.object.delete()
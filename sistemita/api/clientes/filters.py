@@ -55,4 +55,4 @@ class FacturaFilterSet(filters.FilterSet):
         """Configuraciones del filter."""
 
         model = Factura
-        fields = ('cobrado', 'cliente', 'numero')
+        fields = ('cobrado', 'cliente', 'numero', 'estado')
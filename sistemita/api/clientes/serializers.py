@@ -2,14 +2,16 @@
 
 # Imports
 import json
-from datetime import datetime
 from decimal import Decimal
-from re import match
+
+# Django
+from django.db.models import Prefetch, prefetch_related_objects
 
 # Django Rest Framework
 from rest_framework import serializers
 
 # Sistemita
+from sistemita.accounting.models.cuentacorriente import MovimientoCliente
 from sistemita.api.archivos.serializers import ArchivoSerializer
 from sistemita.api.entidades.serializers import (
     DistritoSerializer,
@@ -19,12 +21,7 @@ from sistemita.api.entidades.serializers import (
 from sistemita.api.proveedores.serializers import (
     FacturaDistribuidaProveedorModelSerializer,
 )
-from sistemita.core.constants import (
-    MONEDAS,
-    TIPOS_DOC_IMPORT,
-    TIPOS_FACTURA,
-    TIPOS_FACTURA_IMPORT,
-)
+from sistemita.core.constants import MONEDAS, TIPOS_FACTURA
 from sistemita.core.models.cliente import (
     Cliente,
     Contrato,
@@ -37,15 +34,11 @@ from sistemita.core.models.proveedor import (
     FacturaDistribuidaProveedor,
     Proveedor,
 )
-from sistemita.utils.commons import get_total_factura
+from sistemita.expense.models import Fondo
+from sistemita.utils.commons import get_total_factura, imputar_nota_de_credito
+from sistemita.utils.diff import NestedDiff
 from sistemita.utils.emails import send_notification_factura_distribuida
-from sistemita.utils.strings import (
-    MESSAGE_CUIT_INVALID,
-    MESSAGE_MONEDA_INVALID,
-    MESSAGE_NUMERO_EXISTS,
-    MESSAGE_TIPO_DOC_IMPORT_INVALID,
-    MESSAGE_TIPO_FACTURA_INVALID,
-)
+from sistemita.utils.importacion import BATCH_SIZE, ImportacionListSerializer
 from sistemita.utils.validators import validate_is_number
 
 
@@ -105,6 +98,8 @@ class FacturaSerializer(serializers.ModelSerializer):
     archivos = ArchivoSerializer(many=True, read_only=True)
     cliente = ClienteSerializer(read_only=True)
     impuestos = FacturaImpuestoModelSerializer(many=True, read_only=True)
+    # Se conserva el valor numérico que devolvía cuando era una propiedad calculada
+    monto_a_distribuir = serializers.ReadOnlyField()
 
     class Meta:
         """Configuraciones del serializer."""
@@ -129,80 +124,39 @@ class FacturaSerializer(serializers.ModelSerializer):
         ]
 
 
-class FacturaBeforeImportSerializer(serializers.Serializer):
-    """Serializador para validar facturas a importar."""
-
-    fecha = serializers.DateTimeField(input_formats=['%d/%m/%Y', '%Y-%m-%dT%H:%M:%S'])
-
-    tipo = serializers.CharField()
-    numero = serializers.CharField(read_only=True)
-    punto_de_venta = serializers.CharField(validators=[validate_is_number])
-    numero_desde = serializers.CharField(validators=[validate_is_number])
-
-    tipo_doc_receptor = serializers.CharField()
-    nro_doc_receptor = serializers.IntegerField()
-    denominacion_receptor = serializers.CharField()
-    exists_receptor = serializers.BooleanField(read_only=True, default=False)
-
-    moneda = serializers.CharField()
-    imp_neto_gravado = serializers.DecimalField(required=False, decimal_places=2, max_digits=12, allow_null=True)
-    imp_total = serializers.DecimalField(decimal_places=2, max_digits=12)
+class FacturaImportListSerializer(ImportacionListSerializer):
+    """Importación de facturas de clientes junto con su fondo y su distribución."""
 
-    def validate_tipo(self, attr):
-        """Valida tipo de factura."""
-        try:
-            index = list(x[0] for x in TIPOS_FACTURA_IMPORT).index(attr)
-        except ValueError as err:
-            raise serializers.ValidationError(MESSAGE_TIPO_FACTURA_INVALID) from err
-        return TIPOS_FACTURA_IMPORT[index][1]
-
-    def validate_tipo_doc_receptor(self, attr):
-        """Valida tipo de documento."""
-        if attr not in TIPOS_DOC_IMPORT:
-            raise serializers.ValidationError(MESSAGE_TIPO_DOC_IMPORT_INVALID)
-        return attr
-
-    def validate_nro_doc_receptor(self, attr):
-        """Validate el cuit del cliente."""
-        if not match(r'^[0-9]{11}$', str(attr)):
-            raise serializers.ValidationError(MESSAGE_CUIT_INVALID)
-        self.context['cliente'] = Cliente.objects.filter(cuit=attr).first()
-        return attr
+    contraparte = 'receptor'
+    entidad_model = Cliente
+    factura_model = Factura
+    movimiento_model = MovimientoCliente
 
-    def validate_moneda(self, attr):
-        """Valida el tipo de moneda."""
-        type_monedas = list(m[1] for m in MONEDAS)
-        if attr not in type_monedas:
-            raise serializers.ValidationError(MESSAGE_MONEDA_INVALID)
-        return attr
-
-    def validate_imp_neto_gravado(self, attr):
-        """Valida el valor neto."""
-        return attr or 0.0
-
-    def validate(self, attrs):
-        """Valida que el numero de factura no exita exista para el mismo receptor."""
-        numero = attrs.get('punto_de_venta').zfill(5) + attrs.get('numero_desde').zfill(8)
-        cliente = self.context.get('cliente', None)
-        if Factura.objects.filter(numero=numero, cliente=cliente).exists():
-            raise serializers.ValidationError({'numero_desde': MESSAGE_NUMERO_EXISTS.format(numero, 'receptor')})
-        return attrs
-
-    def to_representation(self, instance):
-        """Modifica representación de los campos."""
-
-        rep = super().to_representation(instance)
-        rep['fecha'] = datetime.strptime(rep['fecha'][:19], '%Y-%m-%dT%H:%M:%S').strftime('%d-%m-%Y')
-        rep['numero'] = rep['punto_de_venta'].zfill(5) + rep['numero_desde'].zfill(8)
-
-        cliente = self.context.get('cliente', None)
-        if cliente:
-            rep['exists_receptor'] = True
-            rep['denominacion_receptor'] = cliente.razon_social
+    def build_factura(self, entidad, validated_data):
+        """Factura con los montos calculados sin impuestos, como al guardarla."""
+        factura = super().build_factura(entidad, validated_data)
+        factura.set_montos(0)
+        return factura
 
-        rep.pop('punto_de_venta')
-        rep.pop('numero_desde')
-        return rep
+    def post_create(self, facturas):
+        """Crea el fondo y la distribución de cada factura y actualiza sus estados."""
+        Fondo.objects.bulk_create(
+            [
+                Fondo(
+                    factura=factura,
+                    monto=factura.porcentaje_fondo_monto,
+                    monto_disponible=factura.porcentaje_fondo_monto,
+                    disponible=factura.cobrado,
+                    moneda=factura.moneda,
+                )
+                for factura in facturas
+            ],
+            batch_size=BATCH_SIZE,
+        )
+        FacturaDistribuida.objects.bulk_create(
+            [FacturaDistribuida(factura=factura) for factura in facturas], batch_size=BATCH_SIZE
+        )
+        Factura.objects.filter(pk__in=[factura.pk for factura in facturas]).update_status()
 
 
 class FacturaImportSerializer(serializers.Serializer):
@@ -230,26 +184,10 @@ class FacturaImportSerializer(serializers.Serializer):
         index = list(x[1] for x in MONEDAS).index(attr)
         return MONEDAS[index][0]
 
-    def create(self, validated_data):
-        """
-        Crea una factura asociandola a un cliente.
-        Si el cliente no existe es creado.
-        """
-        cuit = validated_data.get('nro_doc_receptor')
-        razon_social = validated_data.get('denominacion_receptor')
-        cliente, _ = Cliente.objects.get_or_create(cuit=cuit, razon_social=razon_social)
-
-        factura = Factura.objects.create(
-            cliente=cliente,
-            numero=validated_data.get('numero'),
-            fecha=validated_data.get('fecha'),
-            tipo=validated_data.get('tipo'),
-            moneda=validated_data.get('moneda'),
-            neto=validated_data.get('imp_neto_gravado'),
-            total=validated_data.get('imp_total'),
-        )
+    class Meta:
+        """Configuraciones del serializer."""
 
-        return factura
+        list_serializer_class = FacturaImportListSerializer
 
 
 class FacturaImputadaModelSerializer(serializers.ModelSerializer):
@@ -287,11 +225,16 @@ class FacturaImputadaModelSerializer(serializers.ModelSerializer):
         read_only_fields = ('id', 'cliente', 'facturas', 'nota_de_credito')
 
     def to_representation(self, instance):
-        """Modifica el orden de las facturas imputadas."""
-        rep = super().to_representation(instance)
-        facturas = instance.facturas.all().order_by('facturas_imputacion')
-        rep['facturas'] = FacturaSerializer(facturas, many=True).data
-        return rep
+        """Modifica el orden de las facturas imputadas, con sus relaciones en pocas consultas."""
+        facturas = (
+            Factura.objects.select_related(
+                'cliente__provincia', 'cliente__distrito', 'cliente__localidad', 'factura_distribuida'
+            )
+            .prefetch_related('archivos', 'impuestos')
+            .order_by('facturas_imputacion')
+        )
+        prefetch_related_objects([instance], Prefetch('facturas', queryset=facturas))
+        return super().to_representation(instance)
 
     def validate_cliente_id(self, data):
         """Valida datos de cliente."""
@@ -313,13 +256,24 @@ class FacturaImputadaModelSerializer(serializers.ModelSerializer):
         monedas = []
         pks = []
 
+        # Busca todas las facturas, incluidas las que se reemplazan, en una sola consulta
+        try:
+            for row in data:
+                row['factura'] = int(row.get('factura'))
+                if 'update' in str(row.get('action')) and str(row.get('action')).startswith('{'):
+                    row['reemplaza'] = int(json.loads(row.get('action').replace("'", "\""))['id'])
+        except (KeyError, TypeError, ValueError) as error:
+            raise serializers.ValidationError('La factura o el cliente no existe.') from error
+        cliente = self.context.get('cliente', None)
+        facturas_by_pk = Factura.objects.filter(cliente=cliente).in_bulk(
+            [row.get('factura') for row in data] + [row.get('reemplaza') for row in data if row.get('reemplaza')]
+        )
+
         for row in data:
-            try:
-                cliente = self.context.get('cliente', None)
-                factura = Factura.objects.get(pk=row.get('factura'), cliente=cliente)
-                facturas.append({'factura': factura, 'action': row.get('action')})
-            except Factura.DoesNotExist:
+            factura = facturas_by_pk.get(row.get('factura'))
+            if factura is None or (row.get('reemplaza') and row.get('reemplaza') not in facturas_by_pk):
                 raise serializers.ValidationError('La factura o el cliente no existe.')
+            facturas.append({'factura': factura, 'action': row.get('action'), 'reemplaza': row.get('reemplaza')})
 
             if row.get('action') in ['add', 'update']:
                 monedas.append(factura.moneda)
@@ -381,28 +335,18 @@ class FacturaImputadaModelSerializer(serializers.ModelSerializer):
 
         facturas = validated_data.pop('facturas_list')
         nota_de_credito = validated_data.get('nota_de_credito')
-        total_nc = nota_de_credito.total
         instance = FacturaImputada.objects.create(**validated_data)
 
-        for row in facturas:
-            factura = row.get('factura')
-            # Asignado facturas
-            instance.facturas.add(factura)
-
-            # Imputando costos
-            if total_nc == 0:
-                break
-            factura_total = get_total_factura(factura.total, total_nc)
-            factura.monto_imputado = factura.total if factura_total == 0 else total_nc
-            total_nc -= factura.total if total_nc > factura.total else total_nc
-            factura.total = factura_total
-            factura.cobrado = not bool(factura.total)
-            factura.save()
-
-        nota_de_credito.monto_imputado = nota_de_credito.total - total_nc
-        nota_de_credito.total = total_nc
-        nota_de_credito.cobrado = not bool(nota_de_credito.total)
-        nota_de_credito.save()
+        facturas_pks = [row.get('factura').pk for row in facturas]
+        instance.facturas.add(*facturas_pks)
+        imputadas = imputar_nota_de_credito(Factura, nota_de_credito, agregar=facturas_pks)
+        instance.nota_de_credito = imputadas[nota_de_credito.pk]
+
+        facturas_pks.append(nota_de_credito.pk)
+        Factura.objects.filter(pk__in=facturas_pks).update_status()
+        MovimientoCliente.objects.registrar(
+            Factura.objects.filter(pk__in=facturas_pks), concepto='imputacion', fecha=instance.fecha
+        )
 
         instance.save()
         return instance
@@ -410,62 +354,34 @@ class FacturaImputadaModelSerializer(serializers.ModelSerializer):
     def update(self, instance, validated_data):
         """Edición de facturas imputadas."""
         facturas = validated_data.get('facturas_list')
-        nota_de_credito = instance.nota_de_credito
-        total_nc = nota_de_credito.total
         instance.monto_facturas = validated_data.get('monto_facturas')
         instance.total_factura = validated_data.get('total_factura')
 
+        agregar = []
+        liberar = []
         for row in facturas:
             factura = row.get('factura')
             action = row.get('action')
             if 'add' in action:
-                instance.facturas.add(factura)
-                if total_nc == 0:
-                    break
-                factura_total = get_total_factura(factura.total, total_nc)
-                factura.monto_imputado = factura.total if factura_total == 0 else total_nc
-                total_nc -= factura.total if total_nc > factura.total else total_nc
-                factura.total = factura_total
-                factura.cobrado = not bool(factura.total)
-                factura.save()
+                agregar.append(factura.pk)
             elif 'update' in action:
-                replace_pk = json.loads(action.replace("'", "\""))['id']
                 # Verifico si no son facturas iguales
-                if factura.pk != replace_pk:
-                    # Restablece los valores de la nota de credito
-                    factura_repleace = Factura.objects.get(pk=replace_pk)
-                    nota_de_credito.total += factura_repleace.monto_imputado
-                    nota_de_credito.monto_imputado -= factura_repleace.monto_imputado
-                    nota_de_credito.save()
-                    total_nc = nota_de_credito.total
-
-                    # Restablece los valores de la factura a remplazar
-                    factura_repleace.total += factura_repleace.monto_imputado
-                    factura_repleace.monto_imputado = 0
-                    factura_repleace.cobrado = False
-                    factura_repleace.save()
-                    instance.facturas.remove(factura_repleace)
-
-                    # Imputa a la nueva factura
-                    instance.facturas.add(factura)
-                    factura_total = get_total_factura(factura.total, total_nc)
-                    factura.monto_imputado = factura.total if factura_total == 0 else total_nc
-                    total_nc -= factura.total if total_nc > factura.total else total_nc
-                    factura.total = factura_total
-                    factura.cobrado = not bool(factura.total)
-                    factura.save()
+                if row.get('reemplaza') and factura.pk != row.get('reemplaza'):
+                    liberar.append(row.get('reemplaza'))
+                    agregar.append(factura.pk)
             elif 'delete' in action:
-                total_nc += factura.monto_imputado
-                factura.total += factura.monto_imputado
-                factura.cobrado = False
-                factura.monto_imputado = 0
-                factura.save()
-                instance.facturas.remove(factura)
-
-        nota_de_credito.monto_imputado = (nota_de_credito.total + nota_de_credito.monto_imputado) - total_nc
-        nota_de_credito.total = total_nc
-        nota_de_credito.cobrado = not bool(nota_de_credito.total)
-        nota_de_credito.save()
+                liberar.append(factura.pk)
+
+        instance.facturas.remove(*liberar)
+        instance.facturas.add(*agregar)
+        imputadas = imputar_nota_de_credito(Factura, instance.nota_de_credito, agregar=agregar, liberar=liberar)
+        instance.nota_de_credito = imputadas[instance.nota_de_credito_id]
+
+        facturas_pks = liberar + [row.get('factura').pk for row in facturas] + [instance.nota_de_credito_id]
+        Factura.objects.filter(pk__in=facturas_pks).update_status()
+        MovimientoCliente.objects.registrar(
+            Factura.objects.filter(pk__in=facturas_pks), concepto='imputacion', fecha=instance.fecha
+        )
 
         instance.save()
         return instance
@@ -508,17 +424,22 @@ class FacturaDistribuidaSerializer(serializers.Serializer):
         montos = 0
         factura_distribuida = self.context.get('factura_distribuida', None)
 
+        # Los proveedores de todas las filas se buscan en una sola consulta
+        try:
+            proveedores = Proveedor.objects.in_bulk({int(row.get('id')) for row in data})
+        except (TypeError, ValueError):
+            raise serializers.ValidationError('El proveedor no existe.')
+
         for row in data:
-            try:
-                proveedor = Proveedor.objects.get(pk=row.get('id'))
-                data = row.get('data')
-                distribucion.append(
-                    {'proveedor': proveedor, 'detalle': row.get('detalle'), 'monto': row.get('monto'), 'data': data}
-                )
-                if data.get('action') in ['add', 'update']:
-                    montos += float(row.get('monto'))
-            except Proveedor.DoesNotExist:
+            proveedor = proveedores.get(int(row.get('id')))
+            if proveedor is None:
                 raise serializers.ValidationError('El proveedor no existe.')
+            data = row.get('data')
+            distribucion.append(
+                {'proveedor': proveedor, 'detalle': row.get('detalle'), 'monto': row.get('monto'), 'data': data}
+            )
+            if data.get('action') in ['add', 'update']:
+                montos += float(row.get('monto'))
 
         if round(Decimal(montos), 2) > factura_distribuida.factura.monto_a_distribuir:
             raise serializers.ValidationError('Los montos no pueden superar al total de la factura.')
@@ -548,6 +469,7 @@ class FacturaDistribuidaSerializer(serializers.Serializer):
 
         facturadistribuida.monto_distribuido = monto_distribuido
         facturadistribuida.save()
+        Factura.objects.filter(pk=facturadistribuida.factura_id).update_status()
 
         return {'factura_distribuida_id': facturadistribuida.pk, 'distribucion_list': proveedores_list}
 
@@ -558,29 +480,30 @@ class FacturaDistribuidaSerializer(serializers.Serializer):
         monto_distribuido = 0
         proveedores_list = []
 
+        distribucion = NestedDiff(
+            FacturaDistribuidaProveedor,
+            ('proveedor', 'monto', 'detalle'),
+            queryset=facturadistribuida.factura_distribuida_proveedores.all(),
+        )
+
         for item in distribucion_list:
-            detalle = item.get('detalle', '')
-            monto = item.get('monto')
             data = item.get('data')
+            valores = {
+                'proveedor': item.get('proveedor'),
+                'monto': item.get('monto'),
+                'detalle': item.get('detalle', ''),
+            }
             if data.get('action') == 'add':
-                monto_distribuido += float(monto)
-                proveedor = item.get('proveedor')
-                FacturaDistribuidaProveedor.objects.create(
-                    factura_distribucion=facturadistribuida,
-                    proveedor=proveedor,
-                    detalle=detalle,
-                    monto=monto,
-                )
-                send_notification_factura_distribuida(proveedor, facturadistribuida)
+                distribucion.add(factura_distribucion=facturadistribuida, **valores)
                 proveedores_list.append({'id': item.get('proveedor').pk})
-            elif data.get('action') == 'update':
-                proveedor = item.get('proveedor')
-                monto_distribuido += float(monto)
-                FacturaDistribuidaProveedor.objects.filter(id=data.get('id')).update(
-                    proveedor=proveedor, monto=monto, detalle=detalle
-                )
-            elif data.get('action') == 'delete':
-                FacturaDistribuidaProveedor.objects.filter(id=data.get('id')).delete()
+            else:
+                distribucion.push(data.get('action'), data.get('id'), **valores)
+            if data.get('action') in ['add', 'update']:
+                monto_distribuido += float(item.get('monto'))
+
+        distribucion.apply()
+        for item in distribucion.added:
+            send_notification_factura_distribuida(item.proveedor, facturadistribuida)
 
         facturadistribuida.monto_distribuido = monto_distribuido
         if round(Decimal(monto_distribuido), 2) == facturadistribuida.factura.monto_a_distribuir:
@@ -588,6 +511,7 @@ class FacturaDistribuidaSerializer(serializers.Serializer):
         else:
             facturadistribuida.distribuida = False
         facturadistribuida.save()
+        Factura.objects.filter(pk=facturadistribuida.factura_id).update_status()
 
         return {'factura_distribuida_id': facturadistribuida.pk, 'distribucion_list': proveedores_list}
 
@@ -1,5 +1,12 @@
 """Serializers de los modelos Cobranza, CobranzaFactura y CobranzaFacturaPago."""
 
+# Utils
+from collections import Counter
+
+# Django
+from django.db import connection, transaction
+from django.db.models import prefetch_related_objects
+
 # Django REST Framework
 from rest_framework import serializers
 
@@ -9,9 +16,16 @@ from sistemita.accounting.models.cobranza import (
     CobranzaFactura,
     CobranzaFacturaPago,
 )
+from sistemita.accounting.models.cuentacorriente import MovimientoCliente
 from sistemita.api.clientes.serializers import ClienteSerializer
 from sistemita.core.models.cliente import Cliente, Factura
+from sistemita.core.models.mediopago import MedioPago
 from sistemita.expense.models import Fondo
+from sistemita.utils.diff import (
+    InBulkPrimaryKeyRelatedField,
+    NestedDiff,
+    prefetch_pks,
+)
 
 
 class CobranzaFacturaPagoSerializer(serializers.ModelSerializer):
@@ -24,6 +38,7 @@ class CobranzaFacturaPagoSerializer(serializers.ModelSerializer):
     """
 
     data = serializers.DictField(required=False)
+    serializer_related_field = InBulkPrimaryKeyRelatedField
 
     class Meta:
         """Clase meta."""
@@ -50,6 +65,7 @@ class CobranzaFacturaSerializer(serializers.ModelSerializer):
 
     data = serializers.DictField(required=False)
     cobranza_factura_pagos = CobranzaFacturaPagoSerializer(many=True)
+    serializer_related_field = InBulkPrimaryKeyRelatedField
 
     class Meta:
         """Clase meta."""
@@ -59,6 +75,49 @@ class CobranzaFacturaSerializer(serializers.ModelSerializer):
         read_only_fields = ('id',)
 
 
+def prefetch_cobranzas(context, cobranzas):
+    """Busca en una consulta por modelo los clientes, las facturas y los métodos de pago de las cobranzas."""
+    cobranzas = [cobranza for cobranza in cobranzas if isinstance(cobranza, dict)]
+    clientes = [cobranza.get('cliente') for cobranza in cobranzas if isinstance(cobranza.get('cliente'), dict)]
+    filas = [
+        fila for cobranza in cobranzas for fila in cobranza.get('cobranza_facturas') or [] if isinstance(fila, dict)
+    ]
+    pagos = [pago for fila in filas for pago in fila.get('cobranza_factura_pagos') or [] if isinstance(pago, dict)]
+    context['clientes'] = Cliente.objects.in_bulk({str(cliente.get('cuit')) for cliente in clientes}, field_name='cuit')
+    prefetch_pks(context, Factura, [fila.get('factura') for fila in filas])
+    prefetch_pks(context, MedioPago, [pago.get('metodo') for pago in pagos])
+
+
+class CobranzaBatchSerializer(serializers.ListSerializer):
+    """
+    Lote de cobranzas. Valida todas con las mismas búsquedas de clientes, facturas y métodos de pago
+    y las crea en una sola transacción, si alguna no es válida no se crea ninguna.
+    """
+
+    def to_internal_value(self, data):
+        """Valida las cobranzas del lote y que una factura no se cobre en más de una de ellas."""
+        if isinstance(data, list):
+            prefetch_cobranzas(self.context, data)
+        cobranzas = super().to_internal_value(data)
+
+        facturas = [[fila['factura'].pk for fila in cobranza['cobranza_facturas']] for cobranza in cobranzas]
+        repetidas = Counter(pk for pks in facturas for pk in set(pks))
+        errors = [
+            {'cobranza_facturas': ['Hay facturas cobradas en otra cobranza del lote.']}
+            if any(repetidas[pk] > 1 for pk in pks)
+            else {}
+            for pks in facturas
+        ]
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return cobranzas
+
+    def create(self, validated_data):
+        """Crea todas las cobranzas en una transacción."""
+        with transaction.atomic():
+            return super().create(validated_data)
+
+
 class CobranzaSerializer(serializers.ModelSerializer):
     """Cobranza Serializer."""
 
@@ -80,9 +139,25 @@ class CobranzaSerializer(serializers.ModelSerializer):
             'cobranza_facturas',
         )
         read_only_fields = ('id', 'cliente')
+        list_serializer_class = CobranzaBatchSerializer
+
+    def to_internal_value(self, data):
+        """Busca en una consulta por modelo las facturas y los métodos de pago de las filas anidadas."""
+        if self.parent is None:
+            # En un lote las búsquedas ya las hizo `CobranzaBatchSerializer` para todas las cobranzas
+            prefetch_cobranzas(self.context, [data])
+        return super().to_internal_value(data)
+
+    def to_representation(self, instance):
+        """Busca los pagos de todas las facturas en una sola consulta."""
+        prefetch_related_objects([instance], 'cobranza_facturas__cobranza_factura_pagos')
+        return super().to_representation(instance)
 
     def validate_cliente(self, data):
         """Valida datos de cliente."""
+        clientes = self.context.get('clientes', {})
+        if data['cuit'] in clientes:
+            return clientes[data['cuit']]
         try:
             cliente = Cliente.objects.get(cuit=data['cuit'])
         except Cliente.DoesNotExist as not_exist:
@@ -122,30 +197,65 @@ class CobranzaSerializer(serializers.ModelSerializer):
             cobranza = Cobranza.objects.create(fecha=fecha, cliente=cliente, moneda=moneda, total=total)
 
             # Factura cobranza
-            facturas = validated_data['cobranza_facturas']
-            for factura in facturas:
-                # La factura pasa a estar cobrada
-                factura_entry = factura['factura']
-                Factura.objects.filter(pk=factura_entry.id).update(cobrado=True)
-                # Habilita fondo
-                Fondo.objects.filter(factura=factura_entry).update(disponible=True)
-                cobranza_factura = CobranzaFactura.objects.create(
+            facturas_pks = self.create_cobranza_facturas(cobranza, validated_data['cobranza_facturas'])
+
+            # Actualiza el estado de las facturas cobradas
+            Factura.objects.filter(pk__in=facturas_pks).update_status()
+            MovimientoCliente.objects.registrar(
+                Factura.objects.filter(pk__in=facturas_pks), concepto='cobranza', fecha=fecha, cobranza=cobranza
+            )
+            return cobranza
+        except Exception as error:
+            raise serializers.ValidationError(error)
+
+    @staticmethod
+    def create_cobranza_facturas(cobranza, facturas):
+        """
+        Agrega las facturas y sus pagos a la cobranza con inserciones masivas.
+        Las facturas pasan a estar cobradas y se habilitan sus fondos. Retorna las pks de las facturas.
+        """
+        facturas_pks = [factura['factura'].pk for factura in facturas]
+        if not facturas_pks:
+            return facturas_pks
+
+        # La factura pasa a estar cobrada y se habilita su fondo
+        Factura.objects.filter(pk__in=facturas_pks).update(cobrado=True)
+        Fondo.objects.filter(factura__in=facturas_pks).update(disponible=True)
+
+        cobranza_facturas = CobranzaFactura.objects.bulk_create(
+            [
+                CobranzaFactura(
                     cobranza=cobranza,
-                    factura=factura_entry,
+                    factura=factura['factura'],
                     ganancias=factura['ganancias'],
                     ingresos_brutos=factura['ingresos_brutos'],
                     iva=factura['iva'],
                     suss=factura['suss'],
                 )
-                # Pagos
-                pagos = factura['cobranza_factura_pagos']
-                for pago in pagos:
-                    CobranzaFacturaPago.objects.create(
-                        cobranza_factura=cobranza_factura, metodo=pago['metodo'], monto=pago['monto']
-                    )
-            return cobranza
-        except Exception as error:
-            raise serializers.ValidationError(error)
+                for factura in facturas
+            ]
+        )
+
+        if not connection.features.can_return_rows_from_bulk_insert:
+            # Sin las pks de la inserción se leen las últimas filas de la cobranza, en el orden en que se insertaron
+            insertadas = len(cobranza_facturas)
+            pks = CobranzaFactura.objects.filter(cobranza=cobranza, factura__in=facturas_pks).order_by('-pk')
+            pks = list(pks.values_list('pk', flat=True)[:insertadas])
+            for cobranza_factura, pk in zip(cobranza_facturas, reversed(pks)):
+                cobranza_factura.pk = pk
+
+        CobranzaFacturaPago.objects.bulk_create(
+            [
+                CobranzaFacturaPago(
+                    cobranza_factura_id=cobranza_factura.pk,
+                    metodo=pago['metodo'],
+                    monto=pago['monto'],
+                )
+                for factura, cobranza_factura in zip(facturas, cobranza_facturas)
+                for pago in factura['cobranza_factura_pagos']
+            ]
+        )
+        return facturas_pks
 
     def update(self, instance, validated_data):
         """Actualiza la intancia."""
@@ -153,81 +263,67 @@ class CobranzaSerializer(serializers.ModelSerializer):
             instance.fecha = validated_data['fecha']
             instance.total = validated_data['total']
             facturas = validated_data['cobranza_facturas']
+            campos = ('factura', 'ganancias', 'ingresos_brutos', 'iva', 'suss')
+            cobranza_facturas = NestedDiff(CobranzaFactura, campos, queryset=instance.cobranza_facturas.all())
+            pagos = NestedDiff(
+                CobranzaFacturaPago,
+                ('metodo', 'monto'),
+                queryset=CobranzaFacturaPago.objects.filter(cobranza_factura__cobranza=instance),
+            )
+            nuevas = []
+            cobradas = set()
+            no_cobradas = set()
 
             # Recorro las facturas
             for factura in facturas:
-                if factura['data']['action'] == 'add':
-                    # Agrego factura cobranza
-
-                    # La factura del cliente pasa a estar cobrada
-                    factura_entry = factura['factura']
-                    Factura.objects.filter(pk=factura_entry.id).update(cobrado=True)
-                    # Se habilita el fondo asociado a la factura
-                    Fondo.objects.filter(factura=factura_entry).update(disponible=True)
-                    cobranza_factura = CobranzaFactura.objects.create(
-                        cobranza=instance,
-                        factura=factura['factura'],
-                        ganancias=factura['ganancias'],
-                        ingresos_brutos=factura['ingresos_brutos'],
-                        iva=factura['iva'],
-                        suss=factura['suss'],
-                    )
-
-                    # pagos
-                    pagos = factura['cobranza_factura_pagos']
-                    for pago in pagos:
-                        # Todos los pagos son nuevos al ser nueva la factura
-                        CobranzaFacturaPago.objects.create(
-                            cobranza_factura=cobranza_factura, metodo=pago['metodo'], monto=pago['monto']
-                        )
-                elif factura['data']['action'] == 'update':
-                    # Actualizo factura de la cobranza
-                    cobranza_factura = CobranzaFactura.objects.get(
-                        pk=factura['data']['id']  # data contiene la pk de la factura cobranza
-                    )
-
-                    factura_entry = factura['factura']
-                    if cobranza_factura.factura.id != factura_entry.id:
-                        # Si la factura es diferente, la anterior pasa a estar no cobrada
-                        Factura.objects.filter(pk=cobranza_factura.factura.id).update(cobrado=False)
-                        Fondo.objects.filter(factura=cobranza_factura.factura).update(disponible=False)
-
-                    # La factura actual del cliente pasa a estar cobrada
-                    Factura.objects.filter(pk=factura_entry.id).update(cobrado=True)
-                    Fondo.objects.filter(factura=factura_entry).update(disponible=True)
-
-                    CobranzaFactura.objects.filter(pk=factura['data']['id']).update(
-                        factura=factura_entry,
-                        ganancias=factura['ganancias'],
-                        ingresos_brutos=factura['ingresos_brutos'],
-                        iva=factura['iva'],
-                        suss=factura['suss'],
-                    )
+                action = factura['data']['action']
+                factura_entry = factura['factura']
+                if action == 'add':
+                    # Las facturas nuevas se agregan con sus pagos al final
+                    nuevas.append(factura)
+                    cobradas.add(factura_entry.pk)
+                elif action == 'update':
+                    # Actualizo factura de la cobranza, data contiene la pk de la factura cobranza
+                    cobranza_facturas.update(factura['data']['id'], **{campo: factura[campo] for campo in campos})
+                    cobradas.add(factura_entry.pk)
 
                     # Pagos
-                    pagos = factura['cobranza_factura_pagos']
-                    for pago in pagos:
-                        if pago['data']['action'] == 'update':
-                            # Actualiza pago
-                            CobranzaFacturaPago.objects.filter(pk=pago['data']['id']).update(
-                                metodo=pago['metodo'], monto=pago['monto']
-                            )
-                        elif pago['data']['action'] == 'add':
-                            # Agrega Pago
-                            CobranzaFacturaPago.objects.create(
-                                cobranza_factura=cobranza_factura, metodo=pago['metodo'], monto=pago['monto']
-                            )
-                        elif pago['data']['action'] == 'delete':
-                            # Elimina Pago
-                            CobranzaFacturaPago.objects.get(pk=pago['data']['id']).delete()
-                elif factura['data']['action'] == 'delete':
-                    # Elimino la factura cobranza
-
-                    # La facturas asociadas pasan a ser no cobradas y los fondos asociados pasar a no estar disponibles
-                    factura_entry = factura['factura']
-                    Factura.objects.filter(pk=factura_entry.id).update(cobrado=False)
-                    Fondo.objects.filter(factura=factura_entry).update(disponible=False)
-                    CobranzaFactura.objects.get(pk=factura['data']['id']).delete()
+                    for pago in factura['cobranza_factura_pagos']:
+                        valores = {'metodo': pago['metodo'], 'monto': pago['monto']}
+                        if pago['data']['action'] == 'add':
+                            pagos.add(cobranza_factura_id=factura['data']['id'], **valores)
+                        else:
+                            pagos.push(pago['data']['action'], pago['data'].get('id'), **valores)
+                elif action == 'delete':
+                    # La factura asociada pasa a ser no cobrada y su fondo a no estar disponible
+                    cobranza_facturas.delete(factura['data']['id'])
+                    no_cobradas.add(factura_entry.pk)
+
+            # Si la factura de una fila editada es diferente, la anterior pasa a estar no cobrada
+            for pk, values in cobranza_facturas.updated.items():
+                anterior = cobranza_facturas.instances.get(pk)
+                if anterior and anterior.factura_id != values['factura'].pk:
+                    no_cobradas.add(anterior.factura_id)
+
+            pagos.apply(strict=True)
+            cobranza_facturas.apply(strict=True)
+            self.create_cobranza_facturas(instance, nuevas)
+
+            no_cobradas -= cobradas
+            Factura.objects.filter(pk__in=no_cobradas).update(cobrado=False)
+            Fondo.objects.filter(factura__in=no_cobradas).update(disponible=False)
+            Factura.objects.filter(pk__in=cobradas).update(cobrado=True)
+            Fondo.objects.filter(factura__in=cobradas).update(disponible=True)
+
+            # Actualiza el estado de las facturas modificadas
+            facturas_pks = cobradas | no_cobradas
+            Factura.objects.filter(pk__in=facturas_pks).update_status()
+            MovimientoCliente.objects.registrar(
+                Factura.objects.filter(pk__in=facturas_pks),
+                concepto='cobranza',
+                fecha=instance.fecha,
+                cobranza=instance,
+            )
 
             instance.save()
             return instance
@@ -1,7 +1,9 @@
 """Viewset de cobranzas."""
 
 # Django Rest Framework
-from rest_framework import mixins, permissions, viewsets
+from rest_framework import mixins, permissions, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.response import Response
 
 # Sistemita
 from sistemita.accounting.models.cobranza import Cobranza
@@ -20,3 +22,23 @@ class CobranzaViewSet(
     queryset = Cobranza.objects.all()
     permission_classes = (permissions.IsAuthenticated,)
     serializer_class = CobranzaSerializer
+
+    @action(detail=False, methods=['post'], url_path='batch')
+    def batch(self, request):
+        """
+        Carga un lote de cobranzas en una sola transacción.
+        Devuelve el resultado de cada cobranza en el orden recibido, si alguna no es válida no se carga ninguna.
+        """
+        serializer = self.get_serializer(data=request.data, many=True)
+        if not serializer.is_valid():
+            if not isinstance(serializer.errors, list):
+                return Response({'errors': serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+            results = [{'id': None, 'errors': errors} for errors in serializer.errors]
+            return Response({'results': results}, status=status.HTTP_400_BAD_REQUEST)
+
+        cobranzas = serializer.save()
+        results = [
+            {'id': cobranza.pk, 'cliente': cobranza.cliente.cuit, 'total': str(cobranza.total), 'errors': {}}
+            for cobranza in cobranzas
+        ]
+        return Response({'results': results}, status=status.HTTP_201_CREATED)
@@ -0,0 +1,43 @@
+"""Serializadores de conciliaciones bancarias."""
+
+# Django REST Framework
+from rest_framework import serializers
+
+# Sistemita
+from sistemita.accounting.conciliacion import DIAS_VENTANA, Conciliacion
+from sistemita.utils.extractos import leer_extracto
+from sistemita.utils.strings import MESSAGE_EXTRACTO_INVALID
+
+
+class ConciliacionSerializer(serializers.Serializer):
+    """Serializador del extracto bancario a conciliar."""
+
+    file = serializers.FileField()
+    dias = serializers.IntegerField(required=False, min_value=0, default=DIAS_VENTANA)
+
+    def validate_file(self, file):
+        """Lee los movimientos del extracto."""
+        try:
+            return list(leer_extracto(file))
+        except (ArithmeticError, KeyError, ValueError) as error:
+            raise serializers.ValidationError(MESSAGE_EXTRACTO_INVALID) from error
+
+    def create(self, validated_data):
+        """Retorna los movimientos del extracto con sus propuestas de cobranza o pago."""
+        return Conciliacion(validated_data['file'], dias=validated_data['dias']).proponer()
+
+
+class MovimientoBancarioSerializer(serializers.Serializer):
+    """Serializer de un movimiento del extracto con su propuesta."""
+
+    fecha = serializers.DateField()
+    referencia = serializers.CharField()
+    concepto = serializers.CharField()
+    moneda = serializers.CharField()
+    importe = serializers.DecimalField(decimal_places=2, max_digits=14)
+    propuesta = serializers.DictField(allow_null=True)
+
+    def to_representation(self, instance):
+        """Representa la tupla (movimiento, propuesta)."""
+        movimiento, propuesta = instance
+        return super().to_representation({**movimiento._asdict(), 'propuesta': propuesta})
@@ -0,0 +1,29 @@
+"""Vistas de conciliaciones bancarias."""
+
+# Django REST framework
+from rest_framework import permissions, status, viewsets
+from rest_framework.response import Response
+
+# Sistemita
+from sistemita.api.conciliaciones.serializers import (
+    ConciliacionSerializer,
+    MovimientoBancarioSerializer,
+)
+
+
+class ConciliacionViewSet(viewsets.GenericViewSet):
+    """Conciliación view set."""
+
+    permission_classes = (permissions.IsAuthenticated,)
+    serializer_class = ConciliacionSerializer
+
+    def create(self, request):
+        """
+        Propone las cobranzas y los pagos de los movimientos del extracto bancario recibido.
+        No guarda nada, las propuestas se confirman con las cobranzas y la liquidación de pagos.
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        propuestas = serializer.save()
+        data = MovimientoBancarioSerializer(propuestas, many=True).data
+        return Response(data, status=status.HTTP_200_OK)
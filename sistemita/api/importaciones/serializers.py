@@ -0,0 +1,71 @@
+"""Serializadores de importaciones."""
+
+# Django REST Framework
+from rest_framework import serializers
+
+# Sistemita
+from sistemita.core.models.importacion import Importacion, ImportacionError
+from sistemita.utils.strings import MESSAGE_PLANILLA_INVALID
+
+MAX_ERRORES = 100
+
+
+class ImportacionArchivoSerializer(serializers.Serializer):
+    """Serializador de la planilla a importar."""
+
+    file = serializers.FileField()
+
+    def validate_file(self, file):
+        """Valida que el archivo sea una planilla xlsx o csv."""
+        if not file.name.lower().endswith(('.xlsx', '.csv')):
+            raise serializers.ValidationError(MESSAGE_PLANILLA_INVALID)
+        return file
+
+
+class ImportacionErrorSerializer(serializers.ModelSerializer):
+    """Serializer de ImportacionError."""
+
+    class Meta:
+        """Configuraciones del serializer."""
+
+        model = ImportacionError
+        fields = ('fila', 'datos', 'errores')
+
+
+class ImportacionSerializer(serializers.ModelSerializer):
+    """Serializer del progreso de una importación con sus primeras filas con errores."""
+
+    url = serializers.HyperlinkedIdentityField(view_name='api:importacion-detail')
+    estado = serializers.CharField(source='get_estado_display')
+    progreso = serializers.SerializerMethodField()
+    errores = serializers.SerializerMethodField()
+
+    class Meta:
+        """Configuraciones del serializer."""
+
+        model = Importacion
+        fields = (
+            'id',
+            'url',
+            'tipo',
+            'estado',
+            'filas_total',
+            'filas_procesadas',
+            'filas_importadas',
+            'filas_con_errores',
+            'progreso',
+            'mensaje',
+            'errores',
+        )
+
+    def get_progreso(self, obj):
+        """Porcentaje de filas procesadas."""
+        if obj.estado == Importacion.TERMINADA:
+            return 100
+        if not obj.filas_total:
+            return 0
+        return min(obj.filas_procesadas * 100 // obj.filas_total, 100)
+
+    def get_errores(self, obj):
+        """Primeras filas con errores."""
+        return ImportacionErrorSerializer(obj.errores.all()[:MAX_ERRORES], many=True).data
@@ -0,0 +1,16 @@
+"""Vistas de importaciones."""
+
+# Django REST framework
+from rest_framework import mixins, permissions, viewsets
+
+# Sistemita
+from sistemita.api.importaciones.serializers import ImportacionSerializer
+from sistemita.core.models.importacion import Importacion
+
+
+class ImportacionViewSet(mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    """Importación view set, para consultar el progreso."""
+
+    queryset = Importacion.objects.all()
+    serializer_class = ImportacionSerializer
+    permission_classes = (permissions.IsAuthenticated,)
@@ -1,17 +1,28 @@
 """Serializers de los modelos Pago, PagoFactura y PagoFacturaPago."""
 
 # Django
-from django.conf import settings
-from django.template.loader import render_to_string
+from django.db import connection, transaction
+from django.db.models import prefetch_related_objects
 
 # Django REST Framework
 from rest_framework import serializers
 
 # Sistemita
+from sistemita.accounting.models.cuentacorriente import MovimientoProveedor
 from sistemita.accounting.models.pago import Pago, PagoFactura, PagoFacturaPago
 from sistemita.api.proveedores.serializers import ProveedorSerializer
+from sistemita.core.models.cliente import Factura
+from sistemita.core.models.mediopago import MedioPago
 from sistemita.core.models.proveedor import FacturaProveedor, Proveedor
-from sistemita.utils.emails import send_mail
+from sistemita.utils.diff import (
+    InBulkPrimaryKeyRelatedField,
+    NestedDiff,
+    prefetch_pks,
+)
+from sistemita.utils.emails import (
+    send_notification_pago_cargado,
+    send_notifications_pago_cargado,
+)
 
 
 class PagoFacturaPagoSerializer(serializers.ModelSerializer):
@@ -24,6 +35,7 @@ class PagoFacturaPagoSerializer(serializers.ModelSerializer):
     """
 
     data = serializers.DictField(required=False)
+    serializer_related_field = InBulkPrimaryKeyRelatedField
 
     class Meta:
         """Clase meta."""
@@ -50,6 +62,7 @@ class PagoFacturaSerializer(serializers.ModelSerializer):
 
     data = serializers.DictField(required=False)
     pago_factura_pagos = PagoFacturaPagoSerializer(many=True)
+    serializer_related_field = InBulkPrimaryKeyRelatedField
 
     class Meta:
         """Clase meta."""
@@ -108,6 +121,20 @@ class CreateUpdatePagoModelSerializer(serializers.ModelSerializer):
         )
         read_only_fields = ('id', 'proveedor')
 
+    def to_internal_value(self, data):
+        """Busca en una consulta por modelo las facturas y los métodos de pago de las filas anidadas."""
+        filas = data.get('pago_facturas') if isinstance(data, dict) else None
+        filas = [fila for fila in filas or [] if isinstance(fila, dict)]
+        pagos = [pago for fila in filas for pago in fila.get('pago_factura_pagos') or [] if isinstance(pago, dict)]
+        prefetch_pks(self.context, FacturaProveedor, [fila.get('factura') for fila in filas])
+        prefetch_pks(self.context, MedioPago, [pago.get('metodo') for pago in pagos])
+        return super().to_internal_value(data)
+
+    def to_representation(self, instance):
+        """Busca los pagos de todas las facturas en una sola consulta."""
+        prefetch_related_objects([instance], 'pago_facturas__pago_factura_pagos')
+        return super().to_representation(instance)
+
     def validate_proveedor(self, attr):
         """Valida datos de proveedor."""
         try:
@@ -151,45 +178,70 @@ class CreateUpdatePagoModelSerializer(serializers.ModelSerializer):
 
             # Factura pago
             facturas = validated_data['pago_facturas']
-            for index, factura in enumerate(facturas):
-                # La factura pasa a estar cobrada
-                factura_entry = factura['factura']
-                FacturaProveedor.objects.filter(pk=factura_entry.id).update(cobrado=True)
+            facturas_pks = self.create_pago_facturas(pago, facturas)
+
+            factura_entry = facturas[0]['factura'] if facturas else None
+            if factura_entry and hasattr(factura_entry.factura, 'cliente'):
+                # El email se envía una vez confirmado el pago, sin demorar la transacción
+                factura_numero = factura_entry.numero
+                cliente_razon_social = factura_entry.factura.cliente.razon_social
+                transaction.on_commit(
+                    lambda: send_notification_pago_cargado(proveedor, factura_numero, cliente_razon_social)
+                )
+
+            # Actualiza el estado de las facturas de cliente asociadas
+            Factura.objects.filter_by_facturas_proveedor(facturas_pks).update_status()
+            MovimientoProveedor.objects.registrar(
+                FacturaProveedor.objects.filter(pk__in=facturas_pks), concepto='pago', fecha=fecha, pago=pago
+            )
+        except Exception as error:
+            raise serializers.ValidationError(error)
 
-                pago_factura = PagoFactura.objects.create(
+        return pago
+
+    @staticmethod
+    def create_pago_facturas(pago, facturas):
+        """
+        Agrega las facturas y sus pagos al pago con inserciones masivas.
+        Las facturas pasan a estar cobradas. Retorna las pks de las facturas.
+        """
+        facturas_pks = [factura['factura'].pk for factura in facturas]
+        if not facturas_pks:
+            return facturas_pks
+
+        # La factura pasa a estar cobrada
+        FacturaProveedor.objects.filter(pk__in=facturas_pks).update(cobrado=True)
+
+        pago_facturas = PagoFactura.objects.bulk_create(
+            [
+                PagoFactura(
                     pago=pago,
-                    factura=factura_entry,
+                    factura=factura['factura'],
                     ganancias=factura['ganancias'],
                     ingresos_brutos=factura['ingresos_brutos'],
                     iva=factura['iva'],
                     suss=factura['suss'],
                 )
-                # Pagos
-                pagos = factura['pago_factura_pagos']
-                for row in pagos:
-                    PagoFacturaPago.objects.create(pago_factura=pago_factura, metodo=row['metodo'], monto=row['monto'])
-
-                if index == 0 and hasattr(factura_entry.factura, 'cliente'):
-                    # Send Email
-                    html_content = render_to_string(
-                        'emails/pago_cargado.html',
-                        {
-                            'factura_numero': factura_entry.numero,
-                            'cliente_razon_social': factura_entry.factura.cliente.razon_social,
-                        },
-                    )
-                    send_mail(
-                        'Liqueed - Pago cargado',
-                        '',
-                        settings.EMAIL_FROM,
-                        [proveedor.correo],
-                        html=html_content,
-                    )
-
-        except Exception as error:
-            raise serializers.ValidationError(error)
+                for factura in facturas
+            ]
+        )
 
-        return pago
+        if not connection.features.can_return_rows_from_bulk_insert:
+            # Sin las pks de la inserción se leen las últimas filas del pago, en el orden en que se insertaron
+            insertadas = len(pago_facturas)
+            pks = PagoFactura.objects.filter(pago=pago, factura__in=facturas_pks).order_by('-pk')
+            pks = list(pks.values_list('pk', flat=True)[:insertadas])
+            for pago_factura, pk in zip(pago_facturas, reversed(pks)):
+                pago_factura.pk = pk
+
+        PagoFacturaPago.objects.bulk_create(
+            [
+                PagoFacturaPago(pago_factura_id=pago_factura.pk, metodo=row['metodo'], monto=row['monto'])
+                for factura, pago_factura in zip(facturas, pago_facturas)
+                for row in factura['pago_factura_pagos']
+            ]
+        )
+        return facturas_pks
 
     def update(self, instance, validated_data):
         """Actualiza la instancia."""
@@ -198,80 +250,189 @@ class CreateUpdatePagoModelSerializer(serializers.ModelSerializer):
             instance.total = validated_data['total']
             instance.pagado = validated_data['pagado']
             facturas = validated_data['pago_facturas']
+            campos = ('factura', 'ganancias', 'ingresos_brutos', 'iva', 'suss')
+            pago_facturas = NestedDiff(PagoFactura, campos, queryset=instance.pago_facturas.all())
+            pagos = NestedDiff(
+                PagoFacturaPago,
+                ('metodo', 'monto'),
+                queryset=PagoFacturaPago.objects.filter(pago_factura__pago=instance),
+            )
+            nuevas = []
+            cobradas = set()
+            no_cobradas = set()
 
             # Recorro las facturas
             for factura in facturas:
-                if factura['data']['action'] == 'add':
-                    # Agrego factura pago
-
-                    # La factura del proveedor pasa a estar cobrada
-                    factura_entry = factura['factura']
-                    FacturaProveedor.objects.filter(pk=factura_entry.id).update(cobrado=True)
-
-                    pago_factura = PagoFactura.objects.create(
-                        pago=instance,
-                        factura=factura['factura'],
-                        ganancias=factura['ganancias'],
-                        ingresos_brutos=factura['ingresos_brutos'],
-                        iva=factura['iva'],
-                        suss=factura['suss'],
-                    )
-
-                    # pagos
-                    pagos = factura['pago_factura_pagos']
-                    for row in pagos:
-                        # Todos los pagos son nuevos al ser nueva la factura
-                        PagoFacturaPago.objects.create(
-                            pago_factura=pago_factura, metodo=row['metodo'], monto=row['monto']
-                        )
-                elif factura['data']['action'] == 'update':
-                    # Actualizo factura del pago
-                    pago_factura = PagoFactura.objects.get(
-                        pk=factura['data']['id']  # data contiene la pk de la factura de pago
-                    )
-
-                    factura_entry = factura['factura']
-                    if pago_factura.factura.id != factura_entry.id:
-                        # Si la factura es diferente, la anterior pasa a estar no cobrada
-                        FacturaProveedor.objects.filter(pk=pago_factura.factura.id).update(cobrado=False)
-
-                    # La factura actual del proveedor pasa a estar cobrada
-                    FacturaProveedor.objects.filter(pk=factura_entry.id).update(cobrado=True)
-
-                    PagoFactura.objects.filter(pk=factura['data']['id']).update(
-                        factura=factura_entry,
-                        ganancias=factura['ganancias'],
-                        ingresos_brutos=factura['ingresos_brutos'],
-                        iva=factura['iva'],
-                        suss=factura['suss'],
-                    )
+                action = factura['data']['action']
+                factura_entry = factura['factura']
+                if action == 'add':
+                    # Las facturas nuevas se agregan con sus pagos al final
+                    nuevas.append(factura)
+                    cobradas.add(factura_entry.pk)
+                elif action == 'update':
+                    # Actualizo factura del pago, data contiene la pk de la factura de pago
+                    pago_facturas.update(factura['data']['id'], **{campo: factura[campo] for campo in campos})
+                    cobradas.add(factura_entry.pk)
 
                     # Pagos
-                    pagos = factura['pago_factura_pagos']
-                    for row in pagos:
-                        if row['data']['action'] == 'update':
-                            # Actualiza pago
-                            PagoFacturaPago.objects.filter(pk=row['data']['id']).update(
-                                metodo=row['metodo'], monto=row['monto']
-                            )
-                        elif row['data']['action'] == 'add':
-                            # Agrega Pago
-                            PagoFacturaPago.objects.create(
-                                pago_factura=pago_factura, metodo=row['metodo'], monto=row['monto']
-                            )
-                        elif row['data']['action'] == 'delete':
-                            # Elimina Pago
-                            PagoFacturaPago.objects.get(pk=row['data']['id']).delete()
-                elif factura['data']['action'] == 'delete':
-                    # Elimino la factura de pago
-
-                    # La facturas asociadas pasan a ser no cobradas
-                    factura_entry = factura['factura']
-                    FacturaProveedor.objects.filter(pk=factura_entry.id).update(cobrado=False)
-
-                    PagoFactura.objects.get(pk=factura['data']['id']).delete()
+                    for row in factura['pago_factura_pagos']:
+                        valores = {'metodo': row['metodo'], 'monto': row['monto']}
+                        if row['data']['action'] == 'add':
+                            pagos.add(pago_factura_id=factura['data']['id'], **valores)
+                        else:
+                            pagos.push(row['data']['action'], row['data'].get('id'), **valores)
+                elif action == 'delete':
+                    # La factura asociada pasa a ser no cobrada
+                    pago_facturas.delete(factura['data']['id'])
+                    no_cobradas.add(factura_entry.pk)
+
+            # Si la factura de una fila editada es diferente, la anterior pasa a estar no cobrada
+            for pk, values in pago_facturas.updated.items():
+                anterior = pago_facturas.instances.get(pk)
+                if anterior and anterior.factura_id != values['factura'].pk:
+                    no_cobradas.add(anterior.factura_id)
+
+            pagos.apply(strict=True)
+            pago_facturas.apply(strict=True)
+            self.create_pago_facturas(instance, nuevas)
+
+            no_cobradas -= cobradas
+            FacturaProveedor.objects.filter(pk__in=no_cobradas).update(cobrado=False)
+            FacturaProveedor.objects.filter(pk__in=cobradas).update(cobrado=True)
+            facturas_pks = list(cobradas | no_cobradas)
+
+            # Actualiza el estado de las facturas de cliente asociadas
+            Factura.objects.filter_by_facturas_proveedor(facturas_pks).update_status()
+            MovimientoProveedor.objects.registrar(
+                FacturaProveedor.objects.filter(pk__in=facturas_pks),
+                concepto='pago',
+                fecha=instance.fecha,
+                pago=instance,
+            )
 
             instance.save()
             return instance
         except Exception as error:
             raise serializers.ValidationError(error)
+
+
+class PagoLiquidacionSerializer(serializers.Serializer):
+    """
+    Liquidación de facturas de proveedores pendientes de pago.
+    Agrupa las facturas por proveedor y moneda y genera un pago por grupo.
+    """
+
+    fecha = serializers.DateField(required=True)
+    metodo = serializers.PrimaryKeyRelatedField(queryset=MedioPago.objects.all())
+    facturas = serializers.ListField(child=serializers.IntegerField(), allow_empty=False)
+
+    def validate_facturas(self, data):
+        """Valida que las facturas existan, estén pendientes de pago y que sus proveedores tengan CBU."""
+        pks = list(dict.fromkeys(data))
+        facturas = FacturaProveedor.objects.select_related('proveedor', 'factura__cliente').in_bulk(pks)
+        errors = []
+
+        no_existen = [str(pk) for pk in pks if pk not in facturas]
+        if no_existen:
+            errors.append(f'Las facturas {", ".join(no_existen)} no existen.')
+
+        pagadas = [pk for pk, factura in facturas.items() if factura.cobrado]
+        if pagadas:
+            errors.append(self.get_mensaje_pagadas(pagadas))
+
+        notas_de_credito = [str(pk) for pk, factura in facturas.items() if factura.tipo.startswith('NC')]
+        if notas_de_credito:
+            errors.append(f'Las facturas {", ".join(notas_de_credito)} son notas de crédito.')
+
+        sin_cbu = sorted({factura.proveedor.razon_social for factura in facturas.values() if not factura.proveedor.cbu})
+        if sin_cbu:
+            errors.append(f'Los proveedores {", ".join(sin_cbu)} no tienen CBU.')
+
+        if errors:
+            raise serializers.ValidationError(errors)
+        return [facturas[pk] for pk in pks]
+
+    def get_mensaje_pagadas(self, pks):
+        """Mensaje de error de las facturas que ya están pagadas."""
+        return f'Las facturas {", ".join(str(pk) for pk in pks)} ya están pagadas.'
+
+    def create(self, validated_data):
+        """Genera los pagos de cada proveedor y moneda con inserciones masivas. Retorna los pagos."""
+        fecha = validated_data['fecha']
+        metodo = validated_data['metodo']
+        facturas = validated_data['facturas']
+        facturas_pks = [factura.pk for factura in facturas]
+
+        # Bloquea las facturas y vuelve a validar que estén pendientes, otra liquidación o pago
+        # concurrente pudo pagarlas luego de la validación
+        pagadas = [
+            pk
+            for pk, cobrado in FacturaProveedor.objects.select_for_update()
+            .filter(pk__in=facturas_pks)
+            .order_by('pk')
+            .values_list('pk', 'cobrado')
+            if cobrado
+        ]
+        if pagadas:
+            raise serializers.ValidationError({'facturas': [self.get_mensaje_pagadas(pagadas)]})
+
+        grupos = {}
+        for factura in facturas:
+            grupos.setdefault((factura.proveedor_id, factura.moneda), []).append(factura)
+
+        pagos = [
+            Pago(
+                fecha=fecha,
+                proveedor=grupo[0].proveedor,
+                moneda=moneda,
+                total=sum(factura.total for factura in grupo),
+                pagado=True,
+            )
+            for (_, moneda), grupo in grupos.items()
+        ]
+        if connection.features.can_return_rows_from_bulk_insert:
+            Pago.objects.bulk_create(pagos)
+        else:
+            # La base no devuelve las pks al insertar en masa y los pagos no tienen otra clave
+            for pago in pagos:
+                pago.save()
+
+        facturas_pago = {factura.pk: pago for pago, grupo in zip(pagos, grupos.values()) for factura in grupo}
+        pago_facturas = PagoFactura.objects.bulk_create(
+            [PagoFactura(pago=facturas_pago[factura.pk], factura=factura) for factura in facturas]
+        )
+
+        if not connection.features.can_return_rows_from_bulk_insert:
+            # Sin las pks de la inserción se leen en una consulta, cada factura está una sola vez
+            pks = dict(
+                PagoFactura.objects.filter(pago__in=pagos, factura__in=facturas_pks).values_list('factura', 'pk')
+            )
+            for pago_factura in pago_facturas:
+                pago_factura.pk = pks[pago_factura.factura_id]
+
+        PagoFacturaPago.objects.bulk_create(
+            [
+                PagoFacturaPago(pago_factura_id=pago_factura.pk, metodo=metodo, monto=pago_factura.factura.total)
+                for pago_factura in pago_facturas
+            ]
+        )
+
+        # Las facturas pasan a estar cobradas
+        FacturaProveedor.objects.filter(pk__in=facturas_pks).update(cobrado=True)
+        Factura.objects.filter_by_facturas_proveedor(facturas_pks).update_status()
+        MovimientoProveedor.objects.registrar(
+            FacturaProveedor.objects.filter(pk__in=facturas_pks),
+            concepto='pago',
+            fecha=fecha,
+            por_factura={pk: {'pago': pago} for pk, pago in facturas_pago.items()},
+        )
+
+        # Un email por pago, como al cargarlos de a uno, enviados juntos una vez confirmada la liquidación
+        notificaciones = []
+        for pago, grupo in zip(pagos, grupos.values()):
+            factura = grupo[0]
+            if factura.factura and factura.factura.cliente:
+                notificaciones.append((pago.proveedor, factura.numero, factura.factura.cliente.razon_social))
+        transaction.on_commit(lambda: send_notifications_pago_cargado(notificaciones))
+
+        return pagos
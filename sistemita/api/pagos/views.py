@@ -1,14 +1,19 @@
 """Viewset pagos."""
 
 # Django Rest Framework
-from rest_framework import mixins, permissions, viewsets
+from rest_framework import mixins, permissions, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from rest_framework.reverse import reverse
 
 # Sistemita
 from sistemita.accounting.models.pago import Pago
 from sistemita.api.pagos.serializers import (
     CreateUpdatePagoModelSerializer,
+    PagoLiquidacionSerializer,
     PagoModelSerializer,
 )
+from sistemita.utils.export import export_transferencias
 
 
 class PagoViewSet(
@@ -28,4 +33,39 @@ class PagoViewSet(
         """Return serializer based on action."""
         if self.action in ['create', 'update']:
             return CreateUpdatePagoModelSerializer
+        if self.action == 'liquidacion':
+            return PagoLiquidacionSerializer
         return PagoModelSerializer
+
+    @action(detail=False, methods=['post'], url_path='liquidacion')
+    def liquidacion(self, request):
+        """
+        Paga las facturas de proveedores recibidas, con un pago por proveedor y moneda.
+        Devuelve los pagos generados y el enlace al archivo de transferencias bancarias.
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        pagos = serializer.save()
+        results = [
+            {
+                'id': pago.pk,
+                'proveedor': pago.proveedor.cuit,
+                'cbu': pago.proveedor.cbu,
+                'moneda': pago.moneda,
+                'total': str(pago.total),
+            }
+            for pago in pagos
+        ]
+        transferencias = '{}?pagos={}'.format(
+            reverse('api:pago-transferencias', request=request), ','.join(str(pago.pk) for pago in pagos)
+        )
+        return Response({'results': results, 'transferencias': transferencias}, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['get'], url_path='transferencias')
+    def transferencias(self, request):
+        """Archivo de transferencias bancarias de los pagos recibidos en el parámetro `pagos`."""
+        pks = [pk for pk in request.query_params.get('pagos', '').split(',') if pk.isdigit()]
+        if not pks:
+            return Response({'pagos': 'Este parámetro es requerido.'}, status=status.HTTP_400_BAD_REQUEST)
+        pagos = Pago.objects.filter(pk__in=pks).select_related('proveedor').order_by('pk')
+        return export_transferencias(pagos)
@@ -2,39 +2,31 @@
 
 # Imports
 import json
-from datetime import datetime
-from re import match
+
+# Django
+from django.db.models import Prefetch, prefetch_related_objects
 
 # Django REST Framework
 from rest_framework import serializers
 
 # Sistemita
+from sistemita.accounting.models.cuentacorriente import MovimientoProveedor
 from sistemita.api.archivos.serializers import ArchivoSerializer
 from sistemita.api.entidades.serializers import (
     DistritoSerializer,
     LocalidadSerializer,
     ProvinciaSerializer,
 )
-from sistemita.core.constants import (
-    MONEDAS,
-    TIPOS_DOC_IMPORT,
-    TIPOS_FACTURA,
-    TIPOS_FACTURA_IMPORT,
-)
+from sistemita.core.constants import MONEDAS, TIPOS_FACTURA
+from sistemita.core.models.cliente import Factura
 from sistemita.core.models.proveedor import (
     FacturaDistribuidaProveedor,
     FacturaProveedor,
     FacturaProveedorImputada,
     Proveedor,
 )
-from sistemita.utils.commons import get_total_factura
-from sistemita.utils.strings import (
-    MESSAGE_CUIT_INVALID,
-    MESSAGE_MONEDA_INVALID,
-    MESSAGE_NUMERO_EXISTS,
-    MESSAGE_TIPO_DOC_IMPORT_INVALID,
-    MESSAGE_TIPO_FACTURA_INVALID,
-)
+from sistemita.utils.commons import get_total_factura, imputar_nota_de_credito
+from sistemita.utils.importacion import ImportacionListSerializer
 from sistemita.utils.validators import validate_is_number
 
 
@@ -96,80 +88,13 @@ class FacturaProveedorSerializer(serializers.ModelSerializer):
         ]
 
 
-class FacturaProveedorBeforeImportSerializer(serializers.Serializer):
-    """Serializador para validar facturas a importar."""
-
-    fecha = serializers.DateTimeField(input_formats=['%d/%m/%Y', '%Y-%m-%dT%H:%M:%S'])
-
-    tipo = serializers.CharField()
-    numero = serializers.CharField(read_only=True)
-    punto_de_venta = serializers.CharField(validators=[validate_is_number])
-    numero_desde = serializers.CharField(validators=[validate_is_number])
-
-    tipo_doc_emisor = serializers.CharField()
-    nro_doc_emisor = serializers.IntegerField()
-    denominacion_emisor = serializers.CharField()
-    exists_emisor = serializers.BooleanField(read_only=True, default=False)
-
-    moneda = serializers.CharField()
-    imp_neto_gravado = serializers.DecimalField(required=False, decimal_places=2, max_digits=12, allow_null=True)
-    imp_total = serializers.DecimalField(decimal_places=2, max_digits=12)
-
-    def validate_tipo(self, attr):
-        """Valida tipo de factura."""
-        try:
-            index = list(x[0] for x in TIPOS_FACTURA_IMPORT).index(attr)
-        except ValueError as err:
-            raise serializers.ValidationError(MESSAGE_TIPO_FACTURA_INVALID) from err
-        return TIPOS_FACTURA_IMPORT[index][1]
-
-    def validate_tipo_doc_emisor(self, attr):
-        """Valida tipo de documento."""
-        if attr not in TIPOS_DOC_IMPORT:
-            raise serializers.ValidationError(MESSAGE_TIPO_DOC_IMPORT_INVALID)
-        return attr
-
-    def validate_nro_doc_emisor(self, attr):
-        """Validate el cuit del proveedor."""
-        if not match(r'^[0-9]{11}$', str(attr)):
-            raise serializers.ValidationError(MESSAGE_CUIT_INVALID)
-        self.context['proveedor'] = Proveedor.objects.filter(cuit=attr).first()
-        return attr
-
-    def validate_moneda(self, attr):
-        """Valida el tipo de moneda."""
-        type_monedas = list(m[1] for m in MONEDAS)
-        if attr not in type_monedas:
-            raise serializers.ValidationError(MESSAGE_MONEDA_INVALID)
-        return attr
-
-    def validate_imp_neto_gravado(self, attr):
-        """Valida el valor neto."""
-        return attr or 0.0
-
-    def validate(self, attrs):
-        """Valida que el numero de factura no exita exista para el mismo emisor."""
-        numero = attrs.get('punto_de_venta').zfill(5) + attrs.get('numero_desde').zfill(8)
-        proveedor = self.context.get('proveedor', None)
-        if FacturaProveedor.objects.filter(numero=numero, proveedor=proveedor).exists():
-            raise serializers.ValidationError({'numero_desde': MESSAGE_NUMERO_EXISTS.format(numero, 'emisor')})
-        return attrs
+class FacturaProveedorImportListSerializer(ImportacionListSerializer):
+    """Importación de facturas de proveedores."""
 
-    def to_representation(self, instance):
-        """Modifica representación de los campos."""
-
-        rep = super().to_representation(instance)
-        rep['fecha'] = datetime.strptime(rep['fecha'][:19], '%Y-%m-%dT%H:%M:%S').strftime('%d-%m-%Y')
-        rep['numero'] = rep['punto_de_venta'].zfill(5) + rep['numero_desde'].zfill(8)
-
-        proveedor = self.context.get('proveedor', None)
-        if proveedor:
-            rep['exists_emisor'] = True
-            rep['denominacion_emisor'] = proveedor.razon_social
-
-        rep.pop('punto_de_venta')
-        rep.pop('numero_desde')
-        return rep
+    contraparte = 'emisor'
+    entidad_model = Proveedor
+    factura_model = FacturaProveedor
+    movimiento_model = MovimientoProveedor
 
 
 class FacturaProveedorImportSerializer(serializers.Serializer):
@@ -197,26 +122,10 @@ class FacturaProveedorImportSerializer(serializers.Serializer):
         index = list(x[1] for x in MONEDAS).index(attr)
         return MONEDAS[index][0]
 
-    def create(self, validated_data):
-        """
-        Crea una factura asociandola a un proveedor.
-        Si el proveedor no existe es creado.
-        """
-        cuit = validated_data.get('nro_doc_emisor')
-        razon_social = validated_data.get('denominacion_emisor')
-        proveedor, _ = Proveedor.objects.get_or_create(cuit=cuit, razon_social=razon_social)
-
-        factura = FacturaProveedor.objects.create(
-            proveedor=proveedor,
-            numero=validated_data.get('numero'),
-            fecha=validated_data.get('fecha'),
-            tipo=validated_data.get('tipo'),
-            moneda=validated_data.get('moneda'),
-            neto=validated_data.get('imp_neto_gravado'),
-            total=validated_data.get('imp_total'),
-        )
+    class Meta:
+        """Configuraciones del serializer."""
 
-        return factura
+        list_serializer_class = FacturaProveedorImportListSerializer
 
 
 class FacturaProveedorImputadaModelSerializer(serializers.ModelSerializer):
@@ -254,11 +163,16 @@ class FacturaProveedorImputadaModelSerializer(serializers.ModelSerializer):
         read_only_fields = ('id', 'proveedor', 'facturas', 'nota_de_credito')
 
     def to_representation(self, instance):
-        """Modifica el orden de las facturas imputadas."""
-        rep = super().to_representation(instance)
-        facturas = instance.facturas.all().order_by('facturas_imputacion')
-        rep['facturas'] = FacturaProveedorSerializer(facturas, many=True).data
-        return rep
+        """Modifica el orden de las facturas imputadas, con sus relaciones en pocas consultas."""
+        facturas = (
+            FacturaProveedor.objects.select_related(
+                'proveedor__provincia', 'proveedor__distrito', 'proveedor__localidad'
+            )
+            .prefetch_related('archivos')
+            .order_by('facturas_imputacion')
+        )
+        prefetch_related_objects([instance], Prefetch('facturas', queryset=facturas))
+        return super().to_representation(instance)
 
     def validate_proveedor_id(self, data):
         """Valida datos de proveedor."""
@@ -280,13 +194,24 @@ class FacturaProveedorImputadaModelSerializer(serializers.ModelSerializer):
         monedas = []
         pks = []
 
+        # Busca todas las facturas, incluidas las que se reemplazan, en una sola consulta
+        try:
+            for row in data:
+                row['factura'] = int(row.get('factura'))
+                if 'update' in str(row.get('action')) and str(row.get('action')).startswith('{'):
+                    row['reemplaza'] = int(json.loads(row.get('action').replace("'", "\""))['id'])
+        except (KeyError, TypeError, ValueError) as error:
+            raise serializers.ValidationError('La factura no existe.') from error
+        proveedor = self.context.get('proveedor', None)
+        facturas_by_pk = FacturaProveedor.objects.filter(proveedor=proveedor).in_bulk(
+            [row.get('factura') for row in data] + [row.get('reemplaza') for row in data if row.get('reemplaza')]
+        )
+
         for row in data:
-            try:
-                proveedor = self.context.get('proveedor', None)
-                factura = FacturaProveedor.objects.get(pk=row.get('factura'), proveedor=proveedor)
-                facturas.append({'factura': factura, 'action': row.get('action')})
-            except FacturaProveedor.DoesNotExist:
+            factura = facturas_by_pk.get(row.get('factura'))
+            if factura is None or (row.get('reemplaza') and row.get('reemplaza') not in facturas_by_pk):
                 raise serializers.ValidationError('La factura no existe.')
+            facturas.append({'factura': factura, 'action': row.get('action'), 'reemplaza': row.get('reemplaza')})
 
             if row.get('action') in ['add', 'update']:
                 monedas.append(factura.moneda)
@@ -348,28 +273,18 @@ class FacturaProveedorImputadaModelSerializer(serializers.ModelSerializer):
 
         facturas = validated_data.pop('facturas_list')
         nota_de_credito = validated_data.get('nota_de_credito')
-        total_nc = nota_de_credito.total
         instance = FacturaProveedorImputada.objects.create(**validated_data)
 
-        for row in facturas:
-            factura = row.get('factura')
-            # Asignado facturas
-            instance.facturas.add(factura)
-
-            # Imputando costos
-            if total_nc == 0:
-                break
-            factura_total = get_total_factura(factura.total, total_nc)
-            factura.monto_imputado = factura.total if factura_total == 0 else total_nc
-            total_nc -= factura.total if total_nc > factura.total else total_nc
-            factura.total = factura_total
-            factura.cobrado = not bool(factura.total)
-            factura.save()
-
-        nota_de_credito.monto_imputado = nota_de_credito.total - total_nc
-        nota_de_credito.total = total_nc
-        nota_de_credito.cobrado = not bool(nota_de_credito.total)
-        nota_de_credito.save()
+        facturas_pks = [row.get('factura').pk for row in facturas]
+        instance.facturas.add(*facturas_pks)
+        imputadas = imputar_nota_de_credito(FacturaProveedor, nota_de_credito, agregar=facturas_pks)
+        instance.nota_de_credito = imputadas[nota_de_credito.pk]
+
+        facturas_pks.append(nota_de_credito.pk)
+        Factura.objects.filter_by_facturas_proveedor(facturas_pks).update_status()
+        MovimientoProveedor.objects.registrar(
+            FacturaProveedor.objects.filter(pk__in=facturas_pks), concepto='imputacion', fecha=instance.fecha
+        )
 
         instance.save()
         return instance
@@ -377,62 +292,36 @@ class FacturaProveedorImputadaModelSerializer(serializers.ModelSerializer):
     def update(self, instance, validated_data):
         """Edición de facturas imputadas."""
         facturas = validated_data.get('facturas_list')
-        nota_de_credito = instance.nota_de_credito
-        total_nc = nota_de_credito.total
         instance.monto_facturas = validated_data.get('monto_facturas')
         instance.total_factura = validated_data.get('total_factura')
 
+        agregar = []
+        liberar = []
         for row in facturas:
             factura = row.get('factura')
             action = row.get('action')
             if 'add' in action:
-                instance.facturas.add(factura)
-                if total_nc == 0:
-                    break
-                factura_total = get_total_factura(factura.total, total_nc)
-                factura.monto_imputado = factura.total if factura_total == 0 else total_nc
-                total_nc -= factura.total if total_nc > factura.total else total_nc
-                factura.total = factura_total
-                factura.cobrado = not bool(factura.total)
-                factura.save()
+                agregar.append(factura.pk)
             elif 'update' in action:
-                replace_pk = json.loads(action.replace("'", "\""))['id']
                 # Verifico si no son facturas iguales
-                if factura.pk != replace_pk:
-                    # Restablece los valores de la nota de credito
-                    factura_repleace = FacturaProveedor.objects.get(pk=replace_pk)
-                    nota_de_credito.total += factura_repleace.monto_imputado
-                    nota_de_credito.monto_imputado -= factura_repleace.monto_imputado
-                    nota_de_credito.save()
-                    total_nc = nota_de_credito.total
-
-                    # Restablece los valores de la factura a remplazar
-                    factura_repleace.total += factura_repleace.monto_imputado
-                    factura_repleace.monto_imputado = 0
-                    factura_repleace.cobrado = False
-                    factura_repleace.save()
-                    instance.facturas.remove(factura_repleace)
-
-                    # Imputa a la nueva factura
-                    instance.facturas.add(factura)
-                    factura_total = get_total_factura(factura.total, total_nc)
-                    factura.monto_imputado = factura.total if factura_total == 0 else total_nc
-                    total_nc -= factura.total if total_nc > factura.total else total_nc
-                    factura.total = factura_total
-                    factura.cobrado = not bool(factura.total)
-                    factura.save()
+                if row.get('reemplaza') and factura.pk != row.get('reemplaza'):
+                    liberar.append(row.get('reemplaza'))
+                    agregar.append(factura.pk)
             elif 'delete' in action:
-                total_nc += factura.monto_imputado
-                factura.total += factura.monto_imputado
-                factura.cobrado = False
-                factura.monto_imputado = 0
-                factura.save()
-                instance.facturas.remove(factura)
-
-        nota_de_credito.monto_imputado = (nota_de_credito.total + nota_de_credito.monto_imputado) - total_nc
-        nota_de_credito.total = total_nc
-        nota_de_credito.cobrado = not bool(nota_de_credito.total)
-        nota_de_credito.save()
+                liberar.append(factura.pk)
+
+        instance.facturas.remove(*liberar)
+        instance.facturas.add(*agregar)
+        imputadas = imputar_nota_de_credito(
+            FacturaProveedor, instance.nota_de_credito, agregar=agregar, liberar=liberar
+        )
+        instance.nota_de_credito = imputadas[instance.nota_de_credito_id]
+
+        facturas_pks = liberar + [row.get('factura').pk for row in facturas] + [instance.nota_de_credito_id]
+        Factura.objects.filter_by_facturas_proveedor(facturas_pks).update_status()
+        MovimientoProveedor.objects.registrar(
+            FacturaProveedor.objects.filter(pk__in=facturas_pks), concepto='imputacion', fecha=instance.fecha
+        )
 
         instance.save()
         return instance
@@ -1,22 +1,21 @@
 """Viewset proveedores"""
 
-# Pandas
-import pandas as pd
-
 # Django REST Framework
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import mixins, permissions, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from unidecode import unidecode
 
 # Sistemita
+from sistemita.api.importaciones.serializers import (
+    ImportacionArchivoSerializer,
+    ImportacionSerializer,
+)
 from sistemita.api.proveedores.filters import (
     FacturaProveedorFilterSet,
     ProveedorFilterSet,
 )
 from sistemita.api.proveedores.serializers import (
-    FacturaProveedorBeforeImportSerializer,
     FacturaProveedorImportSerializer,
     FacturaProveedorImputadaModelSerializer,
     FacturaProveedorSerializer,
@@ -27,6 +26,13 @@ from sistemita.core.models.proveedor import (
     FacturaProveedorImputada,
     Proveedor,
 )
+from sistemita.utils.importacion import (
+    ImportacionPreparadaSerializer,
+    ValidacionImportacion,
+    iniciar_importacion,
+    leer_planilla,
+    preparar_importacion,
+)
 
 
 class ProveedorViewSet(mixins.RetrieveModelMixin, mixins.ListModelMixin, viewsets.GenericViewSet):
@@ -56,7 +62,6 @@ class FacturaProveedorViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin,
     def get_serializer_class(self):
         """Devuelve un serializador en base a una acción."""
         action_mappings = {
-            'validate_import': FacturaProveedorBeforeImportSerializer,
             'list_import': FacturaProveedorImportSerializer,
         }
         return action_mappings.get(self.action, FacturaProveedorSerializer)
@@ -67,55 +72,54 @@ class FacturaProveedorViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin,
         file = request.FILES.get('file')
         errors = []
         result = []
+        token = None
         result_status = None
         if not file:
             result.append({'message': 'error'})
 
         try:
-            df = pd.read_excel(file)
-            df = df.fillna('')
-            df.columns = map(lambda header: unidecode(header.replace(" ", "_").replace(".", "").lower()), df.columns)
-            data = df.to_dict(orient='records')
-            serializer_class = self.get_serializer_class()
-
-            for row in data:
-                serializer = serializer_class(data=row)
-                if not serializer.is_valid():
-                    errors.append(
-                        {
-                            'fecha': row.get('fecha', None),
-                            'tipo': row.get('tipo', None),
-                            'punto_de_venta': row.get('punto_de_venta', None),
-                            'numero_desde': row.get('numero_desde', None),
-                            'tipo_doc_emisor': row.get('tipo_doc_emisor', None),
-                            'nro_doc_emisor': row.get('nro_doc_emisor', None),
-                            'denominacion_emisor': row.get('denominacion_emisor', None),
-                            'moneda': row.get('moneda', None),
-                            'imp_neto_gravado': row.get('imp_neto_gravado', None),
-                            'imp_total': row.get('imp_total', None),
-                            'errors': serializer.errors,
-                        }
-                    )
-                else:
-                    result.append(serializer.data)
+            df = leer_planilla(file)
+            validacion = ValidacionImportacion(df, 'emisor', Proveedor, FacturaProveedor)
+            result, errors = validacion.validate()
+            # Las facturas válidas quedan en el servidor, se importan enviando solo el token
+            token = preparar_importacion('emisor', validacion.validated_data.to_dict(orient='records'))
             result_status = status.HTTP_200_OK
         except Exception as error:
             errors.append(str(error))
             result_status = status.HTTP_400_BAD_REQUEST
 
-        data = {'result': result, 'errors': errors}
+        data = {'result': result, 'errors': errors, 'token': token}
         return Response(data, status=result_status)
 
     @action(detail=False, methods=['post'], url_path='importar-lista')
     def list_import(self, request):
-        """Importación de listado facturas de clientes."""
+        """
+        Importación de listado facturas de proveedores.
+        Con el token de `validar-importacion` se importan las facturas validadas sin volver a enviarlas.
+        """
         facturas = request.data.get('facturas', None)
         serializer_class = self.get_serializer_class()
-        serializer = serializer_class(data=facturas, many=True)
+        if 'token' in request.data:
+            serializer = ImportacionPreparadaSerializer(data=request.data, importacion=serializer_class(many=True))
+        else:
+            serializer = serializer_class(data=facturas, many=True)
         serializer.is_valid(raise_exception=True)
         serializer.save()
         return Response({}, status=status.HTTP_201_CREATED)
 
+    @action(detail=False, methods=['post'], url_path='importar')
+    def import_file(self, request):
+        """
+        Importación de la planilla de facturas de proveedores por partes, fuera de la petición.
+        El progreso se consulta en la url de la importación.
+        """
+        serializer = ImportacionArchivoSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        file = serializer.validated_data['file']
+        importacion = iniciar_importacion('proveedor', file, FacturaProveedorImportSerializer(many=True))
+        data = ImportacionSerializer(importacion, context=self.get_serializer_context()).data
+        return Response(data, status=status.HTTP_202_ACCEPTED)
+
 
 class FacturaProveedorImputadaViewSet(
     mixins.CreateModelMixin,
@@ -2,15 +2,23 @@
 
 # Django
 from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from rest_framework.test import APIClient
 
 # Sistemita
-from sistemita.accounting.models import CobranzaFactura, CobranzaFacturaPago
+from sistemita.accounting.models import (
+    CobranzaFactura,
+    CobranzaFacturaPago,
+    MovimientoCliente,
+)
 from sistemita.accounting.tests.factories import (
     CobranzaFactory,
     CobranzaFactoryData,
+    CobranzaFacturaFactory,
 )
-from sistemita.core.models import Cliente, Factura
+from sistemita.api.cobranzas.serializers import CobranzaSerializer
+from sistemita.core.models import Cliente, Factura, MedioPago
 from sistemita.core.tests.factories import FacturaClienteFactory
 from sistemita.expense.models import Fondo
 from sistemita.expense.tests.factories import FondoFactory
@@ -237,6 +245,34 @@ class CobranzaCreateViewAPITestCase(BaseTestCase):
         self.assertEqual(results, len(facturas_pk))
         self.assertEqual(response.status_code, 201)
 
+    def test_facturas_estado(self):
+        """Valida que el estado guardado de las facturas asociadas pase a cobrada."""
+        self.create_user()
+        self.client.login(username='user', password='user12345')
+        facturas_pk = []
+        for factura in self.data_create.get('cobranza_facturas'):
+            facturas_pk.append(factura.get('factura'))
+        response = self.client.post('/api/cobranza/', self.data_create, format='json')
+        for factura in Factura.objects.filter(pk__in=facturas_pk):
+            self.assertEqual(factura.estado, 2)
+        self.assertEqual(response.status_code, 201)
+
+    def test_cuenta_corriente(self):
+        """Valida que la cobranza cancele el saldo de las facturas en la cuenta corriente del cliente."""
+        self.create_user()
+        self.client.login(username='user', password='user12345')
+        facturas_pk = [factura.get('factura') for factura in self.data_create.get('cobranza_facturas')]
+        facturas = Factura.objects.filter(pk__in=facturas_pk)
+        MovimientoCliente.objects.registrar(facturas, concepto='factura')
+        cliente = facturas.first().cliente
+        self.assertTrue(any(MovimientoCliente.objects.saldos(cliente).values()))
+
+        response = self.client.post('/api/cobranza/', self.data_create, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertFalse(any(MovimientoCliente.objects.saldos(cliente).values()))
+        movimientos = MovimientoCliente.objects.filter(concepto='cobranza', cobranza_id=response.json()['id'])
+        self.assertEqual(movimientos.count(), len(facturas_pk))
+
     def test_fondos_disponibles(self):
         """Valida que los fondos de las facturas asociadas pasen a estar disponibles."""
         self.create_user()
@@ -254,6 +290,127 @@ class CobranzaCreateViewAPITestCase(BaseTestCase):
         self.assertEqual(results, len(facturas_pk))
         self.assertEqual(response.status_code, 201)
 
+    def test_create_write_queries(self):
+        """Valida que la cantidad de escrituras no dependa de la cantidad de facturas y pagos."""
+        self.create_user()
+        self.client.login(username='user', password='user12345')
+
+        def count_writes(data):
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.post('/api/cobranza/', data, format='json')
+            self.assertEqual(response.status_code, 201)
+            return len([query for query in context.captured_queries if query['sql'].startswith(('INSERT', 'UPDATE'))])
+
+        writes = count_writes(self.data_create)
+
+        data = CobranzaFactoryData().create()
+        row = data['cobranza_facturas'][0]
+        factura = Factura.objects.get(pk=row['factura'])
+        for _ in range(0, 8):
+            nueva = FacturaClienteFactory.create(
+                cliente=factura.cliente, cobrado=False, moneda=factura.moneda, tipo='A'
+            )
+            pagos = [dict(pago) for pago in row['cobranza_factura_pagos'] * 2]
+            data['cobranza_facturas'].append({**row, 'factura': nueva.pk, 'cobranza_factura_pagos': pagos})
+            data['total'] += nueva.total
+        self.assertEqual(count_writes(data), writes)
+        facturas_pk = [row['factura'] for row in data['cobranza_facturas']]
+        cobranza_facturas = CobranzaFactura.objects.filter(factura__in=facturas_pk)
+        self.assertEqual(cobranza_facturas.count(), 10)
+        self.assertEqual(CobranzaFacturaPago.objects.filter(cobranza_factura__in=cobranza_facturas).count(), 18)
+
+    def test_create_cobranza_facturas_pagos(self):
+        """Valida que los pagos queden en su factura de la cobranza aunque la factura se repita."""
+        cobranza = CobranzaFactory.create()
+        existente = CobranzaFacturaFactory.create(cobranza=cobranza)
+        metodo = MedioPago.objects.first()
+        facturas = [
+            {
+                'factura': existente.factura,
+                'ganancias': 0,
+                'ingresos_brutos': 0,
+                'iva': 0,
+                'suss': 0,
+                'cobranza_factura_pagos': [{'metodo': metodo, 'monto': monto}],
+            }
+            for monto in (10, 20)
+        ]
+        CobranzaSerializer.create_cobranza_facturas(cobranza, facturas)
+        nuevas = CobranzaFactura.objects.filter(cobranza=cobranza).exclude(pk=existente.pk).order_by('pk')
+        montos = [list(nueva.cobranza_factura_pagos.values_list('monto', flat=True)) for nueva in nuevas]
+        self.assertEqual(montos, [[10], [20]])
+        self.assertFalse(existente.cobranza_factura_pagos.exists())
+
+
+class CobranzaBatchAPITestCase(BaseTestCase):
+    """Tests sobre la carga de un lote de cobranzas."""
+
+    fixtures = [
+        'fixtures/medio_pagos.json',
+    ]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.data_batch = [CobranzaFactoryData().create() for _ in range(0, 3)]
+
+    def test_batch(self):
+        """Valida que se carguen todas las cobranzas y se informe el resultado de cada una."""
+        self.create_user()
+        self.client.login(username='user', password='user12345')
+        response = self.client.post('/api/cobranza/batch/', self.data_batch, format='json')
+        self.assertEqual(response.status_code, 201)
+        results = response.json()['results']
+        self.assertEqual([result['cliente'] for result in results], [row['cliente']['cuit'] for row in self.data_batch])
+        for result, row in zip(results, self.data_batch):
+            facturas_pk = [factura['factura'] for factura in row['cobranza_facturas']]
+            self.assertEqual(
+                set(CobranzaFactura.objects.filter(cobranza=result['id']).values_list('factura', flat=True)),
+                set(facturas_pk),
+            )
+            self.assertFalse(Factura.objects.filter(pk__in=facturas_pk, cobrado=False).exists())
+
+    def test_batch_with_anonymous(self):
+        """Verifica que el usuario anónimo no pueda cargar cobranzas."""
+        response = self.client.post('/api/cobranza/batch/', self.data_batch, format='json')
+        self.assertEqual(response.status_code, 403)
+
+    def test_batch_invalid(self):
+        """Valida que si una cobranza no es válida no se cargue ninguna y se informe cuál falló."""
+        self.create_user()
+        self.client.login(username='user', password='user12345')
+        self.data_batch[1]['cliente']['cuit'] = '20000000001'
+        response = self.client.post('/api/cobranza/batch/', self.data_batch, format='json')
+        self.assertEqual(response.status_code, 400)
+        errors = [result['errors'] for result in response.json()['results']]
+        self.assertEqual(errors[0], {})
+        self.assertIn('cliente', errors[1])
+        self.assertEqual(errors[2], {})
+        self.assertFalse(CobranzaFactura.objects.exists())
+
+    def test_batch_factura_repeat(self):
+        """Valida que una factura no se cobre en dos cobranzas del lote."""
+        self.create_user()
+        self.client.login(username='user', password='user12345')
+        self.data_batch.append(self.data_batch[0])
+        response = self.client.post('/api/cobranza/batch/', self.data_batch, format='json')
+        self.assertEqual(response.status_code, 400)
+        errors = [result['errors'] for result in response.json()['results']]
+        self.assertIn('cobranza_facturas', errors[0])
+        self.assertEqual(errors[1], {})
+        self.assertIn('cobranza_facturas', errors[3])
+        self.assertFalse(CobranzaFactura.objects.exists())
+
+    def test_batch_validate_queries(self):
+        """Valida que la cantidad de consultas de la validación no dependa de la cantidad de cobranzas."""
+
+        def count_queries(data):
+            serializer = CobranzaSerializer(data=data, many=True)
+            with CaptureQueriesContext(connection) as context:
+                self.assertTrue(serializer.is_valid())
+            return len(context.captured_queries)
+
+        self.assertEqual(count_queries(self.data_batch[:1]), count_queries(self.data_batch))
+
 
 class CobranzaRetrieveAPITestCase(BaseTestCase):
     """Tests sobre el detalle de la API de cobranzas."""
@@ -591,3 +748,24 @@ class CobranzaUpdateViewAPITestCase(BaseTestCase):
         response = self.client.put(f'/api/cobranza/{self.data_update.get("id")}/', data, format='json')
         self.assertFalse(CobranzaFacturaPago.objects.filter(pk=cobranza_pago_pk).exists())
         self.assertEqual(response.status_code, 200)
+
+    def test_update_queries(self):
+        """Valida que la cantidad de consultas de la edición no dependa de la cantidad de facturas y pagos."""
+        self.create_user()
+        self.client.login(username='user', password='user12345')
+
+        def count_queries(limit):
+            data = CobranzaFactoryData().update(limit=limit)
+            for row in data['cobranza_facturas']:
+                row['ganancias'] = 0
+                row['cobranza_factura_pagos'].append({'data': {'action': 'add'}, 'metodo': 2, 'monto': 10})
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.put(f'/api/cobranza/{data["id"]}/', data, format='json')
+            self.assertEqual(response.status_code, 200)
+            cobranza_facturas = CobranzaFactura.objects.filter(cobranza=data['id'])
+            self.assertFalse(cobranza_facturas.exclude(ganancias=0).exists())
+            pagos = CobranzaFacturaPago.objects.filter(cobranza_factura__in=cobranza_facturas)
+            self.assertEqual(pagos.count(), limit * 2)
+            return len(context.captured_queries)
+
+        self.assertEqual(count_queries(2), count_queries(10))
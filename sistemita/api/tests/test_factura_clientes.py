@@ -1,13 +1,27 @@
 """Facturas de Clientes API test."""
 
+# Utils
+from datetime import date, datetime
+from decimal import Decimal
+
 # Django
 from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from rest_framework.test import APIClient
 
 # Sistemita
-from sistemita.core.tests.factories import FacturaClienteFactory
+from sistemita.accounting.models import MovimientoCliente
+from sistemita.api.clientes.serializers import FacturaImportSerializer
+from sistemita.core.models import Cliente, Factura, FacturaImpuesto
+from sistemita.core.tests.factories import (
+    ClienteFactory,
+    FacturaClienteFactory,
+)
+from sistemita.utils.importacion import ImportacionPreparadaSerializer
 from sistemita.utils.tests import (
     BaseTestCase,
+    get_planilla,
     prevent_request_warnings,
     rand_range,
 )
@@ -46,6 +60,24 @@ class FacturaListViewAPITestCase(BaseTestCase):
         request = self.client.get('/api/factura/')
         self.assertEqual(len(request.json()), limit)
 
+    def test_factura_cliente_list_queries(self):
+        """Verifica que la cantidad de consultas del listado no dependa de la cantidad de facturas."""
+        self.create_user()
+        self.client.login(username='user', password='user12345')
+        for factura in FacturaClienteFactory.create_batch(2):
+            FacturaImpuesto.objects.create(factura=factura, detalle='IIBB', monto=1)
+        with CaptureQueriesContext(connection) as context:
+            self.client.get('/api/factura/')
+        queries = len(context.captured_queries)
+
+        for factura in FacturaClienteFactory.create_batch(10):
+            FacturaImpuesto.objects.create(factura=factura, detalle='IIBB', monto=1)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get('/api/factura/')
+        self.assertEqual(len(context.captured_queries), queries)
+        factura = Factura.objects.get(pk=response.json()[0]['id'])
+        self.assertEqual(response.json()[0]['monto_a_distribuir'], float(factura.monto_a_distribuir))
+
     def test_factura_cliente_list_empty(self):
         """Verifica que devuelva un listado vacío."""
         self.create_user()
@@ -143,3 +175,254 @@ class FacturaRetrieveViewAPITestCase(BaseTestCase):
         request = self.client.get(f'/api/factura/{factura.pk}/')
         fields = ['id', 'fecha', 'numero', 'cliente', 'tipo', 'moneda', 'neto', 'iva', 'cobrado', 'total', 'archivos']
         self.assertHasProps(request.json(), fields)
+
+
+class FacturaValidateImportAPITestCase(BaseTestCase):
+    """Tests sobre la validación de la planilla de facturas a importar."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.cliente = ClienteFactory.create(cuit='20111111112')
+        self.create_user()
+        self.client.login(username='user', password='user12345')
+
+    def get_row(self, **kwargs):
+        """Fila válida de la planilla."""
+        row = {
+            'Fecha': datetime(2022, 1, 5),
+            'Tipo': '1 - Factura A',
+            'Punto de Venta': 3,
+            'Número Desde': 125,
+            'Tipo Doc. Receptor': 'CUIT',
+            'Nro. Doc. Receptor': 20111111112,
+            'Denominación Receptor': 'Razón social en AFIP',
+            'Moneda': '$',
+            'Imp. Neto Gravado': 100,
+            'Imp. Total': 121.5,
+        }
+        row.update(kwargs)
+        return row
+
+    def validate(self, rows):
+        """Envía la planilla a validar."""
+        return self.client.post('/api/factura/validar-importacion/', {'file': get_planilla(rows)}, format='multipart')
+
+    def test_validate_import(self):
+        """Valida la representación de las facturas válidas."""
+        rows = [
+            self.get_row(),
+            self.get_row(**{'Fecha': '06/01/2022', 'Nro. Doc. Receptor': 20222222223, 'Imp. Neto Gravado': ''}),
+        ]
+        response = self.validate(rows)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['errors'], [])
+        self.assertEqual(
+            response.json()['result'],
+            [
+                {
+                    'fecha': '05-01-2022',
+                    'tipo': 'A',
+                    'numero': '0000300000125',
+                    'tipo_doc_receptor': 'CUIT',
+                    'nro_doc_receptor': 20111111112,
+                    'denominacion_receptor': self.cliente.razon_social,
+                    'exists_receptor': True,
+                    'moneda': '$',
+                    'imp_neto_gravado': '100.00',
+                    'imp_total': '121.50',
+                },
+                {
+                    'fecha': '06-01-2022',
+                    'tipo': 'A',
+                    'numero': '0000300000125',
+                    'tipo_doc_receptor': 'CUIT',
+                    'nro_doc_receptor': 20222222223,
+                    'denominacion_receptor': 'Razón social en AFIP',
+                    'exists_receptor': False,
+                    'moneda': '$',
+                    'imp_neto_gravado': '0.00',
+                    'imp_total': '121.50',
+                },
+            ],
+        )
+
+    def test_validate_import_errors(self):
+        """Valida los errores de cada fila inválida."""
+        FacturaClienteFactory.create(cliente=self.cliente, numero='0000300000125')
+        rows = [
+            self.get_row(),
+            self.get_row(**{'Tipo': '99 - Otro', 'Moneda': 'EUR', 'Número Desde': 126}),
+            self.get_row(**{'Nro. Doc. Receptor': 123, 'Fecha': '2022-01-05', 'Número Desde': 127}),
+            self.get_row(**{'Punto de Venta': 'A', 'Imp. Total': 'abc'}),
+            self.get_row(**{'Número Desde': 128}),
+        ]
+        response = self.validate(rows)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['result']), 1)
+        errors = [row['errors'] for row in response.json()['errors']]
+        self.assertEqual(list(errors[0]), ['numero_desde'])
+        self.assertEqual(errors[0]['numero_desde'], ['El numero de factura 0000300000125 ya existe para el receptor.'])
+        self.assertEqual(list(errors[1]), ['tipo', 'moneda'])
+        self.assertEqual(list(errors[2]), ['fecha', 'nro_doc_receptor'])
+        self.assertEqual(errors[2]['nro_doc_receptor'], ['Número de CUIT inválido.'])
+        self.assertEqual(list(errors[3]), ['punto_de_venta', 'imp_total'])
+        self.assertEqual(response.json()['errors'][3]['punto_de_venta'], 'A')
+
+    def test_validate_import_queries(self):
+        """Valida que la cantidad de consultas no dependa de la cantidad de filas."""
+
+        def count_queries(limit):
+            rows = [self.get_row(**{'Número Desde': numero}) for numero in range(0, limit)]
+            with CaptureQueriesContext(connection) as context:
+                response = self.validate(rows)
+            self.assertEqual(len(response.json()['result']), limit)
+            return len(context.captured_queries)
+
+        self.assertEqual(count_queries(2), count_queries(50))
+
+    def list_import(self, token):
+        """Importa las facturas validadas por su token."""
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post('/api/factura/importar-lista/', {'token': token}, format='json')
+
+    @prevent_request_warnings
+    def test_list_import_token(self):
+        """Valida que el token importe solo las facturas válidas y que se use una sola vez."""
+        rows = [
+            self.get_row(),
+            self.get_row(**{'Nro. Doc. Receptor': 20222222223, 'Tipo': '3 - Nota de Crédito A'}),
+            self.get_row(**{'Moneda': 'EUR', 'Número Desde': 126}),
+        ]
+        token = self.validate(rows).json()['token']
+        response = self.list_import(token)
+        self.assertEqual(response.status_code, 201)
+
+        importadas = Factura.objects.filter(numero='0000300000125').order_by('cliente__cuit')
+        self.assertEqual([factura.cliente.cuit for factura in importadas], ['20111111112', '20222222223'])
+        self.assertEqual([factura.tipo for factura in importadas], ['A', 'NCA'])
+        self.assertEqual((importadas[0].fecha, importadas[0].total), (date(2022, 1, 5), Decimal('121.50')))
+        self.assertTrue(importadas[0].factura_fondo.exists())
+        self.assertFalse(Factura.objects.filter(numero='0000300000126').exists())
+
+        response = self.list_import(token)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'token': ['La validación de la planilla expiró, vuelva a validarla.']})
+
+    def test_list_import_token_doble_envio(self):
+        """Valida que si el token se envía dos veces antes de importar, solo el primer envío importe."""
+        token = self.validate([self.get_row()]).json()['token']
+        serializers = [
+            ImportacionPreparadaSerializer(data={'token': token}, importacion=FacturaImportSerializer(many=True))
+            for _ in range(2)
+        ]
+        self.assertTrue(serializers[0].is_valid())
+        self.assertFalse(serializers[1].is_valid())
+        mensaje = 'La validación de la planilla expiró, vuelva a validarla.'
+        self.assertEqual(serializers[1].errors, {'token': [mensaje]})
+        serializers[0].save()
+        self.assertEqual(Factura.objects.filter(numero='0000300000125').count(), 1)
+
+    @prevent_request_warnings
+    def test_list_import_token_numero_exists(self):
+        """Valida que no se importen las facturas si el número se cargó después de validarlas."""
+        token = self.validate([self.get_row()]).json()['token']
+        FacturaClienteFactory.create(cliente=self.cliente, numero='0000300000125')
+        response = self.list_import(token)
+        self.assertEqual(response.status_code, 400)
+        mensaje = 'El numero de factura 0000300000125 ya existe para el receptor.'
+        self.assertEqual(response.json(), {'facturas': [{'numero': [mensaje]}]})
+
+
+class FacturaListImportAPITestCase(BaseTestCase):
+    """Tests sobre la importación de facturas validadas."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.cliente = ClienteFactory.create(cuit='20111111112')
+        self.create_user()
+        self.client.login(username='user', password='user12345')
+
+    def get_factura(self, numero, cuit='20111111112', **kwargs):
+        """Factura validada a importar."""
+        factura = {
+            'fecha': '05-01-2022',
+            'tipo': 'A',
+            'numero': numero,
+            'tipo_doc_receptor': 'CUIT',
+            'nro_doc_receptor': cuit,
+            'denominacion_receptor': f'Razón social {cuit}',
+            'moneda': '$',
+            'imp_neto_gravado': '100.00',
+            'imp_total': '121.00',
+        }
+        factura.update(kwargs)
+        return factura
+
+    def list_import(self, facturas):
+        """Envía las facturas a importar."""
+        return self.client.post('/api/factura/importar-lista/', {'facturas': facturas}, format='json')
+
+    def test_list_import(self):
+        """Valida que se creen las facturas con sus clientes, fondos, distribuciones y movimientos."""
+        facturas = [
+            self.get_factura('0000300000125'),
+            self.get_factura('0000300000126', cuit='20222222223', moneda='USD'),
+            self.get_factura('0000300000127', cuit='20222222223'),
+        ]
+        facturas[2].pop('imp_neto_gravado')
+        response = self.list_import(facturas)
+        self.assertEqual(response.status_code, 201)
+
+        nuevo = Cliente.objects.get(cuit='20222222223')
+        self.assertEqual(nuevo.razon_social, 'Razón social 20222222223')
+        importadas = Factura.objects.filter(numero__startswith='00003').order_by('numero')
+        self.assertEqual([factura.cliente for factura in importadas], [self.cliente, nuevo, nuevo])
+        self.assertEqual([factura.moneda for factura in importadas], ['P', 'D', 'P'])
+        self.assertEqual(importadas[0].neto_sin_impuestos, Decimal('100.00'))
+        self.assertEqual(importadas[0].monto_a_distribuir, Decimal('80.00'))
+        self.assertEqual(importadas[2].neto, Decimal('0.00'))
+
+        for factura in importadas:
+            fondo = factura.factura_fondo.get()
+            self.assertEqual(fondo.monto, factura.porcentaje_fondo_monto)
+            self.assertEqual((fondo.moneda, fondo.disponible), (factura.moneda, False))
+            self.assertFalse(factura.factura_distribuida.distribuida)
+            movimiento = MovimientoCliente.objects.get(factura=factura)
+            self.assertEqual((movimiento.fecha, movimiento.monto), (date(2022, 1, 5), factura.total))
+
+    @prevent_request_warnings
+    def test_list_import_numero_exists(self):
+        """Valida que no se importe ninguna factura si algún número existe o se repite para el mismo cliente."""
+        FacturaClienteFactory.create(cliente=self.cliente, numero='0000300000125')
+        facturas = [
+            self.get_factura('0000300000125'),
+            self.get_factura('0000300000126', cuit='20222222223'),
+            self.get_factura('0000300000126', cuit='20222222223'),
+            self.get_factura('0000300000126'),
+        ]
+        response = self.list_import(facturas)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.json(),
+            [
+                {'numero': ['El numero de factura 0000300000125 ya existe para el receptor.']},
+                {'numero': ['El numero de factura 0000300000126 ya existe para el receptor.']},
+                {'numero': ['El numero de factura 0000300000126 ya existe para el receptor.']},
+                {},
+            ],
+        )
+        self.assertFalse(Cliente.objects.filter(cuit='20222222223').exists())
+
+    def test_list_import_queries(self):
+        """Valida que la cantidad de consultas no dependa de la cantidad de facturas ni de clientes nuevos."""
+
+        def count_queries(limit):
+            facturas = [
+                self.get_factura(f'{limit:05}{numero:08}', cuit=f'2{limit:02}{numero:08}') for numero in range(limit)
+            ]
+            with CaptureQueriesContext(connection) as context:
+                response = self.list_import(facturas)
+            self.assertEqual(response.status_code, 201)
+            return len(context.captured_queries)
+
+        self.assertEqual(count_queries(2), count_queries(30))
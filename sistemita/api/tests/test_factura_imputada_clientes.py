@@ -4,17 +4,20 @@ from decimal import Decimal
 
 # Django
 from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from rest_framework.test import APIClient
 
 # Sistemita
 from sistemita.core.constants import ZERO_DECIMAL
 from sistemita.core.models import Factura
 from sistemita.core.tests.factories import (
+    ClienteFactory,
     FacturaClienteFactory,
     FacturaImputadaClienteFactory,
     FacturaImputadaClienteFactoryData,
 )
-from sistemita.utils.commons import get_total_factura
+from sistemita.utils.commons import get_imputaciones, get_total_factura
 from sistemita.utils.tests import (
     BaseTestCase,
     prevent_request_warnings,
@@ -863,3 +866,84 @@ class FacturaImputadaClienteUpdateViewAPITestCase(BaseTestCase):
         total_nc += _factura.monto_imputado
         self.assertEqual(instance.nota_de_credito.total, total_nc)
         self.assertEqual(response.status_code, 200)
+
+
+class FacturaImputadaClienteImputacionTestCase(BaseTestCase):
+    """Tests sobre la distribución de la nota de crédito entre las facturas."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.cliente = ClienteFactory.create()
+
+    def get_data(self, nota_de_credito, facturas):
+        """Devuelve los datos para imputar la nota de crédito a las facturas."""
+        monto_facturas = sum(factura.total_sin_imputar for factura in facturas)
+        return {
+            'cliente_id': self.cliente.pk,
+            'nota_de_credito_id': nota_de_credito.pk,
+            'fecha': nota_de_credito.fecha,
+            'moneda': nota_de_credito.moneda,
+            'monto_facturas': monto_facturas,
+            'monto_nota_de_credito': nota_de_credito.total_sin_imputar,
+            'total_factura': get_total_factura(monto_facturas, nota_de_credito.total_sin_imputar),
+            'facturas_list': [{'factura': factura.pk, 'action': 'add'} for factura in facturas],
+        }
+
+    def create_facturas(self, totales, total_nc):
+        """Crea la nota de crédito y las facturas impagas del cliente."""
+        nota_de_credito = FacturaClienteFactory.create(
+            cliente=self.cliente, tipo='NC', moneda='P', total=total_nc, monto_imputado=0, cobrado=False
+        )
+        facturas = [
+            FacturaClienteFactory.create(
+                cliente=self.cliente, tipo='A', moneda='P', total=total, monto_imputado=0, cobrado=False
+            )
+            for total in totales
+        ]
+        return nota_de_credito, facturas
+
+    def test_get_imputaciones(self):
+        """Verifica que la nota de crédito cubra las facturas en orden hasta agotarse."""
+        totales = [Decimal('100.00'), Decimal('50.00'), Decimal('80.00')]
+        self.assertEqual(
+            get_imputaciones(totales, Decimal('120.00')),
+            ([Decimal('100.00'), Decimal('20.00'), Decimal('0.00')], Decimal('0.00')),
+        )
+        self.assertEqual(get_imputaciones(totales, Decimal('300.00')), (totales, Decimal('70.00')))
+
+    def test_create_nota_de_credito_agotada(self):
+        """Verifica que se asignen todas las facturas aunque la nota de crédito se agote antes."""
+        self.create_user()
+        self.client.login(username='user', password='user12345')
+        nota_de_credito, facturas = self.create_facturas([Decimal('100.00'), Decimal('50.00')], Decimal('60.00'))
+        response = self.client.post('/api/factura-imputada/', self.get_data(nota_de_credito, facturas), format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.json()['facturas']), 2)
+        self.assertEqual(response.json()['nota_de_credito']['total'], '0.00')
+
+        primera, segunda = Factura.objects.filter(pk__in=[factura.pk for factura in facturas]).order_by('pk')
+        self.assertEqual((primera.total, primera.monto_imputado, primera.cobrado), (Decimal('40.00'), 60, False))
+        self.assertEqual((segunda.total, segunda.monto_imputado, segunda.cobrado), (Decimal('50.00'), 0, False))
+        nota_de_credito.refresh_from_db()
+        self.assertEqual((nota_de_credito.monto_imputado, nota_de_credito.cobrado), (Decimal('60.00'), True))
+
+    def test_create_queries(self):
+        """Verifica que la cantidad de consultas no dependa de la cantidad de facturas."""
+        self.create_user()
+        self.client.login(username='user', password='user12345')
+        nota_de_credito, facturas = self.create_facturas([Decimal('10.00')] * 2, Decimal('1000.00'))
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(
+                '/api/factura-imputada/', self.get_data(nota_de_credito, facturas), format='json'
+            )
+        self.assertEqual(response.status_code, 201)
+        queries = len(context.captured_queries)
+
+        nota_de_credito, facturas = self.create_facturas([Decimal('10.00')] * 20, Decimal('1000.00'))
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(
+                '/api/factura-imputada/', self.get_data(nota_de_credito, facturas), format='json'
+            )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(context.captured_queries), queries)
+        self.assertFalse(Factura.objects.filter(pk__in=[factura.pk for factura in facturas], cobrado=False).exists())
@@ -1,13 +1,23 @@
 """Factura de Proveedores API test."""
 
+# Utils
+from datetime import date, datetime
+from decimal import Decimal
+
 # Django
 from django.core.management import call_command
 from rest_framework.test import APIClient
 
 # Sistemita
-from sistemita.core.tests.factories import FacturaProveedorFactory
+from sistemita.accounting.models import MovimientoProveedor
+from sistemita.core.models import FacturaProveedor, Proveedor
+from sistemita.core.tests.factories import (
+    FacturaProveedorFactory,
+    ProveedorFactory,
+)
 from sistemita.utils.tests import (
     BaseTestCase,
+    get_planilla,
     prevent_request_warnings,
     rand_range,
 )
@@ -143,3 +153,83 @@ class FacturaProveeedorRetrieveAPITestCase(BaseTestCase):
         request = self.client.get(f'/api/factura-proveedor/{factura.pk}/')
         fields = ['id', 'fecha', 'numero', 'proveedor', 'tipo', 'moneda', 'neto', 'iva', 'cobrado', 'total', 'archivos']
         self.assertHasProps(request.json(), fields)
+
+
+class FacturaProveedorValidateImportAPITestCase(BaseTestCase):
+    """Tests sobre la validación de la planilla de facturas de proveedores a importar."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.proveedor = ProveedorFactory.create(cuit='20111111112')
+        self.create_user()
+        self.client.login(username='user', password='user12345')
+
+    def test_validate_import(self):
+        """Valida que se informen las facturas repetidas del emisor y se representen las válidas."""
+        FacturaProveedorFactory.create(proveedor=self.proveedor, numero='0000300000125')
+        row = {
+            'Fecha': datetime(2022, 1, 5),
+            'Tipo': '11 - Factura C',
+            'Punto de Venta': 3,
+            'Número Desde': 125,
+            'Tipo Doc. Emisor': 'CUIT',
+            'Nro. Doc. Emisor': 20111111112,
+            'Denominación Emisor': 'Razón social en AFIP',
+            'Moneda': 'USD',
+            'Imp. Neto Gravado': 100,
+            'Imp. Total': 100,
+        }
+        planilla = get_planilla([row, {**row, 'Número Desde': 126}])
+        response = self.client.post(
+            '/api/factura-proveedor/validar-importacion/', {'file': planilla}, format='multipart'
+        )
+        self.assertEqual(response.status_code, 200)
+        errors = response.json()['errors']
+        self.assertEqual(len(errors), 1)
+        mensaje = 'El numero de factura 0000300000125 ya existe para el emisor.'
+        self.assertEqual(errors[0]['errors'], {'numero_desde': [mensaje]})
+        result = response.json()['result']
+        self.assertEqual(len(result), 1)
+        self.assertEqual(result[0]['numero'], '0000300000126')
+        self.assertEqual(result[0]['tipo'], 'C')
+        self.assertTrue(result[0]['exists_emisor'])
+        self.assertEqual(result[0]['denominacion_emisor'], self.proveedor.razon_social)
+
+
+class FacturaProveedorListImportAPITestCase(BaseTestCase):
+    """Tests sobre la importación de facturas de proveedores validadas."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.proveedor = ProveedorFactory.create(cuit='20111111112')
+        self.create_user()
+        self.client.login(username='user', password='user12345')
+
+    def get_factura(self, numero, cuit='20111111112'):
+        """Factura validada a importar."""
+        return {
+            'fecha': '05-01-2022',
+            'tipo': 'A',
+            'numero': numero,
+            'tipo_doc_emisor': 'CUIT',
+            'nro_doc_emisor': cuit,
+            'denominacion_emisor': f'Razón social {cuit}',
+            'moneda': '$',
+            'imp_neto_gravado': '100.00',
+            'imp_total': '121.00',
+        }
+
+    def test_list_import(self):
+        """Valida que se creen las facturas con sus proveedores y movimientos."""
+        facturas = [self.get_factura('0000300000125'), self.get_factura('0000300000126', cuit='20222222223')]
+        response = self.client.post('/api/factura-proveedor/importar-lista/', {'facturas': facturas}, format='json')
+        self.assertEqual(response.status_code, 201)
+
+        nuevo = Proveedor.objects.get(cuit='20222222223')
+        importadas = FacturaProveedor.objects.filter(numero__startswith='00003').order_by('numero')
+        self.assertEqual([factura.proveedor for factura in importadas], [self.proveedor, nuevo])
+        self.assertEqual(MovimientoProveedor.objects.saldo(nuevo, 'P'), Decimal('121.00'))
+        self.assertEqual(
+            list(MovimientoProveedor.objects.filter(factura__in=importadas).values_list('fecha', flat=True)),
+            [date(2022, 1, 5)] * 2,
+        )
@@ -0,0 +1,171 @@
+"""Importaciones por partes API test."""
+
+# Utils
+import tempfile
+from datetime import datetime, timedelta
+from io import StringIO
+
+# Django
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+# Sistemita
+from sistemita.accounting.models import MovimientoCliente
+from sistemita.api.clientes.serializers import FacturaImportSerializer
+from sistemita.core.models import Cliente, Factura, Importacion
+from sistemita.core.tests.factories import (
+    ClienteFactory,
+    FacturaClienteFactory,
+)
+from sistemita.utils.importacion import (
+    importar_por_partes,
+    leer_planilla_por_partes,
+)
+from sistemita.utils.tests import (
+    BaseTestCase,
+    get_planilla,
+    prevent_request_warnings,
+)
+
+
+def setUpModule():
+    """Agrega permisos a utilizar por los test."""
+    call_command('add_permissions', verbosity=0)
+
+
+def get_row(numero, cuit=20111111112, **kwargs):
+    """Fila válida de la planilla de facturas de clientes."""
+    row = {
+        'Fecha': datetime(2022, 1, 5),
+        'Tipo': '1 - Factura A',
+        'Punto de Venta': 3,
+        'Número Desde': numero,
+        'Tipo Doc. Receptor': 'CUIT',
+        'Nro. Doc. Receptor': cuit,
+        'Denominación Receptor': f'Razón social {cuit}',
+        'Moneda': '$',
+        'Imp. Neto Gravado': 100,
+        'Imp. Total': 121,
+    }
+    row.update(kwargs)
+    return row
+
+
+class ImportacionAPITestCase(BaseTestCase):
+    """Tests sobre la importación por partes de planillas de facturas de clientes."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.cliente = ClienteFactory.create(cuit='20111111112')
+        self.create_user()
+        self.client.login(username='user', password='user12345')
+
+        # Las planillas se guardan en un directorio temporal
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings = self.settings(MEDIA_ROOT=media.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def importar(self, file):
+        """Envía la planilla a importar y retorna la importación creada sin procesar."""
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.post('/api/factura/importar/', {'file': file}, format='multipart')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(len(callbacks), 1)
+        return Importacion.objects.get(pk=response.json()['id'])
+
+    def test_leer_planilla_por_partes(self):
+        """Valida que la planilla se lea por partes sin las filas vacías."""
+        rows = [get_row(1), get_row(2), {}, get_row(3), get_row(4), get_row(5)]
+        partes = list(leer_planilla_por_partes(get_planilla(rows), chunk_size=2))
+        self.assertEqual([list(df.index) for df in partes], [[0, 1], [3], [4, 5]])
+        self.assertEqual(list(partes[0]['numero_desde']), [1, 2])
+        self.assertIn('denominacion_receptor', partes[0])
+
+    def test_leer_planilla_por_partes_csv(self):
+        """Valida que el csv se lea por partes."""
+        csv = 'Fecha;Número Desde;Imp. Total\n05/01/2022;1;121\n05/01/2022;2;121\n05/01/2022;3;121\n'
+        partes = list(leer_planilla_por_partes(SimpleUploadedFile('comprobantes.csv', csv.encode()), chunk_size=2))
+        self.assertEqual([list(df.index) for df in partes], [[0, 1], [2]])
+        self.assertEqual(list(partes[1]['numero_desde']), ['3'])
+
+    def test_import(self):
+        """Valida que cada parte se guarde con sus fondos, movimientos y errores."""
+        FacturaClienteFactory.create(cliente=self.cliente, numero='0000300000002')
+        rows = [
+            get_row(1),
+            get_row(2),
+            get_row(3, cuit=20222222223, **{'Tipo': '3 - Nota de Crédito A'}),
+            get_row(4, **{'Moneda': 'EUR'}),
+            get_row(1),
+        ]
+        importacion = self.importar(get_planilla(rows))
+        self.assertEqual((importacion.estado, importacion.filas_total), (Importacion.PENDIENTE, 5))
+
+        importar_por_partes(importacion, FacturaImportSerializer(many=True), chunk_size=2)
+
+        response = self.client.get(f'/api/importacion/{importacion.pk}/')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['estado'], 'Terminada')
+        self.assertEqual(data['progreso'], 100)
+        self.assertEqual((data['filas_procesadas'], data['filas_importadas'], data['filas_con_errores']), (5, 2, 3))
+        self.assertEqual([error['fila'] for error in data['errores']], [3, 5, 6])
+        mensaje = 'El numero de factura 0000300000002 ya existe para el receptor.'
+        self.assertEqual(data['errores'][0]['errores'], {'numero_desde': [mensaje]})
+        self.assertEqual(list(data['errores'][1]['errores']), ['moneda'])
+        self.assertEqual(data['errores'][1]['datos']['moneda'], 'EUR')
+        self.assertEqual(list(data['errores'][2]['errores']), ['numero_desde'])
+
+        nota_de_credito = Factura.objects.get(numero='0000300000003')
+        self.assertEqual(nota_de_credito.cliente, Cliente.objects.get(cuit='20222222223'))
+        self.assertEqual(nota_de_credito.tipo, 'NCA')
+        self.assertTrue(nota_de_credito.factura_fondo.exists())
+        self.assertTrue(MovimientoCliente.objects.filter(factura=nota_de_credito).exists())
+
+    def test_import_fallida(self):
+        """Valida que la importación quede fallida si la planilla no se puede leer."""
+        importacion = self.importar(SimpleUploadedFile('comprobantes.csv', b'\xff\xfe\x00'))
+        importar_por_partes(importacion, FacturaImportSerializer(many=True))
+        importacion.refresh_from_db()
+        self.assertEqual(importacion.estado, Importacion.FALLIDA)
+        self.assertTrue(importacion.mensaje)
+
+    def test_resume_importaciones(self):
+        """Valida que el comando retome las importaciones interrumpidas desde las filas ya procesadas."""
+        importacion = self.importar(get_planilla([get_row(1), get_row(2), get_row(3), get_row(4)]))
+        # Las dos primeras filas se guardaron antes de la interrupción
+        FacturaClienteFactory.create(cliente=self.cliente, numero='0000300000001')
+        FacturaClienteFactory.create(cliente=self.cliente, numero='0000300000002')
+        Importacion.objects.filter(pk=importacion.pk).update(
+            estado=Importacion.PROCESANDO,
+            filas_procesadas=2,
+            filas_importadas=2,
+            modificado=timezone.now() - timedelta(hours=1),
+        )
+        reciente = self.importar(get_planilla([get_row(5)]))
+        Importacion.objects.filter(pk=reciente.pk).update(estado=Importacion.PROCESANDO)
+
+        call_command('resume_importaciones', stdout=StringIO())
+
+        importacion.refresh_from_db()
+        self.assertEqual(importacion.estado, Importacion.TERMINADA)
+        self.assertEqual(
+            (importacion.filas_total, importacion.filas_procesadas, importacion.filas_importadas), (4, 4, 4)
+        )
+        self.assertFalse(importacion.errores.exists())
+        self.assertTrue(Factura.objects.filter(numero='0000300000004').exists())
+        reciente.refresh_from_db()
+        self.assertEqual((reciente.estado, reciente.filas_procesadas), (Importacion.PROCESANDO, 0))
+
+    @prevent_request_warnings
+    def test_import_invalid_file(self):
+        """Valida que solo se acepten planillas xlsx o csv."""
+        file = SimpleUploadedFile('comprobantes.pdf', b'%PDF')
+        response = self.client.post('/api/factura/importar/', {'file': file}, format='multipart')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'file': ['El archivo debe ser una planilla xlsx o csv.']})
+        self.assertFalse(Importacion.objects.exists())
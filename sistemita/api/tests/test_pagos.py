@@ -1,14 +1,38 @@
 """Pago de clientes API test."""
 
+# Utils
+import threading
+
 # Django
+from django.core import mail
 from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.exceptions import ValidationError
 from rest_framework.test import APIClient
 
 # Sistemita
-from sistemita.accounting.models import PagoFactura, PagoFacturaPago
-from sistemita.accounting.tests.factories import PagoFactory, PagoFactoryData
-from sistemita.core.models import FacturaProveedor, Proveedor
-from sistemita.core.tests.factories import FacturaProveedorFactory
+from sistemita.accounting.models import (
+    MovimientoProveedor,
+    Pago,
+    PagoFactura,
+    PagoFacturaPago,
+)
+from sistemita.accounting.tests.factories import (
+    PagoFactory,
+    PagoFactoryData,
+    PagoFacturaFactory,
+)
+from sistemita.api.pagos.serializers import (
+    CreateUpdatePagoModelSerializer,
+    PagoLiquidacionSerializer,
+)
+from sistemita.core.models import FacturaProveedor, MedioPago, Proveedor
+from sistemita.core.tests.factories import (
+    FacturaProveedorFactory,
+    ProveedorFactory,
+)
+from sistemita.utils.emails import EmailBatchThread, EmailThread
 from sistemita.utils.tests import (
     BaseTestCase,
     prevent_request_warnings,
@@ -227,6 +251,197 @@ class PagoCreateViewAPITestCase(BaseTestCase):
         self.assertEqual(results, len(facturas_pk))
         self.assertEqual(response.status_code, 201)
 
+    def test_create_write_queries(self):
+        """Valida que la cantidad de escrituras no dependa de la cantidad de facturas y pagos."""
+        self.create_user()
+        self.client.login(username='user', password='user12345')
+
+        def count_writes(data):
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.post('/api/pago/', data, format='json')
+            self.assertEqual(response.status_code, 201)
+            return len([query for query in context.captured_queries if query['sql'].startswith(('INSERT', 'UPDATE'))])
+
+        writes = count_writes(self.data_create)
+
+        data = PagoFactoryData().create()
+        row = data['pago_facturas'][0]
+        factura = FacturaProveedor.objects.get(pk=row['factura'])
+        for _ in range(0, 8):
+            nueva = FacturaProveedorFactory.create(
+                proveedor=factura.proveedor, cobrado=False, moneda=factura.moneda, tipo='A'
+            )
+            pagos = [dict(pago) for pago in row['pago_factura_pagos'] * 2]
+            data['pago_facturas'].append({**row, 'factura': nueva.pk, 'pago_factura_pagos': pagos})
+            data['total'] += nueva.total
+        self.assertEqual(count_writes(data), writes)
+        pago_facturas = PagoFactura.objects.filter(factura__in=[row['factura'] for row in data['pago_facturas']])
+        self.assertEqual(pago_facturas.count(), 10)
+        self.assertEqual(PagoFacturaPago.objects.filter(pago_factura__in=pago_facturas).count(), 18)
+
+    def test_email_on_commit(self):
+        """Valida que el email de pago cargado se envíe recién al confirmar la transacción."""
+        self.create_user()
+        self.client.login(username='user', password='user12345')
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.post('/api/pago/', self.data_create, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(mail.outbox), 0)
+
+        for callback in callbacks:
+            callback()
+        for thread in threading.enumerate():
+            if isinstance(thread, EmailThread):
+                thread.join()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].subject, 'Liqueed - Pago cargado')
+
+    def test_create_pago_facturas_pagos(self):
+        """Valida que los pagos queden en su factura del pago aunque la factura se repita."""
+        pago = PagoFactory.create()
+        existente = PagoFacturaFactory.create(pago=pago)
+        metodo = MedioPago.objects.first()
+        facturas = [
+            {
+                'factura': existente.factura,
+                'ganancias': 0,
+                'ingresos_brutos': 0,
+                'iva': 0,
+                'suss': 0,
+                'pago_factura_pagos': [{'metodo': metodo, 'monto': monto}],
+            }
+            for monto in (10, 20)
+        ]
+        CreateUpdatePagoModelSerializer.create_pago_facturas(pago, facturas)
+        nuevas = PagoFactura.objects.filter(pago=pago).exclude(pk=existente.pk).order_by('pk')
+        montos = [list(nueva.pago_factura_pagos.values_list('monto', flat=True)) for nueva in nuevas]
+        self.assertEqual(montos, [[10], [20]])
+        self.assertFalse(existente.pago_factura_pagos.exists())
+
+
+class PagoLiquidacionAPITestCase(BaseTestCase):
+    """Tests sobre la liquidación de pagos a proveedores."""
+
+    fixtures = [
+        'fixtures/medio_pagos.json',
+    ]
+
+    def setUp(self):
+        """Genera facturas pendientes de dos proveedores, uno de ellos con facturas en pesos y dólares."""
+        super().setUp()
+        self.client = APIClient()
+        self.proveedor = ProveedorFactory.create()
+        self.otro_proveedor = ProveedorFactory.create()
+        self.facturas = [
+            FacturaProveedorFactory.create(proveedor=self.proveedor, moneda='P', tipo='A', cobrado=False),
+            FacturaProveedorFactory.create(proveedor=self.proveedor, moneda='P', tipo='A', cobrado=False),
+            FacturaProveedorFactory.create(proveedor=self.proveedor, moneda='D', tipo='A', cobrado=False),
+            FacturaProveedorFactory.create(proveedor=self.otro_proveedor, moneda='P', tipo='A', cobrado=False),
+        ]
+        self.data = {'fecha': '2022-06-30', 'metodo': 1, 'facturas': [factura.pk for factura in self.facturas]}
+        MovimientoProveedor.objects.registrar(self.facturas, concepto='factura')
+
+    def test_liquidacion_with_anonymous(self):
+        """Verifica que el usuario anónimo no pueda liquidar pagos."""
+        response = self.client.post('/api/pago/liquidacion/', self.data, format='json')
+        self.assertEqual(response.status_code, 403)
+
+    def test_liquidacion(self):
+        """Valida que se genere un pago por proveedor y moneda con sus facturas pagadas."""
+        self.create_user()
+        self.client.login(username='user', password='user12345')
+        response = self.client.post('/api/pago/liquidacion/', self.data, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.json()['results']), 3)
+
+        pago = Pago.objects.get(proveedor=self.proveedor, moneda='P')
+        self.assertEqual(pago.total, self.facturas[0].total + self.facturas[1].total)
+        self.assertTrue(pago.pagado)
+        self.assertEqual(
+            set(pago.pago_facturas.values_list('factura', flat=True)), {self.facturas[0].pk, self.facturas[1].pk}
+        )
+        for factura in self.facturas:
+            factura.refresh_from_db()
+            self.assertTrue(factura.cobrado)
+            pago_factura_pago = PagoFacturaPago.objects.get(pago_factura__factura=factura)
+            self.assertEqual(pago_factura_pago.monto, factura.total)
+            self.assertEqual(pago_factura_pago.metodo_id, 1)
+            movimiento = MovimientoProveedor.objects.filter(factura=factura).latest('pk')
+            self.assertEqual(movimiento.pago, PagoFactura.objects.get(factura=factura).pago)
+
+    def test_liquidacion_write_queries(self):
+        """Valida que las facturas y sus pagos se inserten juntos sin importar la cantidad."""
+        self.create_user()
+        self.client.login(username='user', password='user12345')
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post('/api/pago/liquidacion/', self.data, format='json')
+        self.assertEqual(response.status_code, 201)
+        inserts = [query['sql'] for query in context.captured_queries if query['sql'].startswith('INSERT')]
+        self.assertEqual(len([sql for sql in inserts if 'accounting_proveedor_pago_factura"' in sql]), 1)
+        self.assertEqual(len([sql for sql in inserts if 'accounting_proveedor_pago_factura_pago"' in sql]), 1)
+
+    def test_liquidacion_validate_facturas(self):
+        """Valida que las facturas estén pendientes de pago, no sean notas de crédito y existan."""
+        self.create_user()
+        self.client.login(username='user', password='user12345')
+        FacturaProveedor.objects.filter(pk=self.facturas[0].pk).update(cobrado=True)
+        FacturaProveedor.objects.filter(pk=self.facturas[1].pk).update(tipo='NCA')
+        self.data['facturas'].append(0)
+        response = self.client.post('/api/pago/liquidacion/', self.data, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(len(response.json()['facturas']), 3)
+        self.assertFalse(Pago.objects.exists())
+
+    def test_liquidacion_facturas_pagadas_concurrentemente(self):
+        """Valida que no se paguen las facturas que otro pago pagó luego de la validación."""
+        serializer = PagoLiquidacionSerializer(data=self.data)
+        self.assertTrue(serializer.is_valid())
+        FacturaProveedor.objects.filter(pk=self.facturas[2].pk).update(cobrado=True)
+        with self.assertRaises(ValidationError) as context:
+            serializer.save()
+        mensaje = f'Las facturas {self.facturas[2].pk} ya están pagadas.'
+        self.assertEqual(context.exception.detail['facturas'][0], mensaje)
+        self.assertFalse(Pago.objects.exists())
+
+    def test_liquidacion_validate_cbu(self):
+        """Valida que los proveedores tengan CBU para generar las transferencias."""
+        self.create_user()
+        self.client.login(username='user', password='user12345')
+        Proveedor.objects.filter(pk=self.otro_proveedor.pk).update(cbu='')
+        response = self.client.post('/api/pago/liquidacion/', self.data, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(self.otro_proveedor.razon_social, response.json()['facturas'][0])
+
+    def test_liquidacion_email_on_commit(self):
+        """Valida que los emails de pago cargado se envíen juntos al confirmar la transacción."""
+        self.create_user()
+        self.client.login(username='user', password='user12345')
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.post('/api/pago/liquidacion/', self.data, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(mail.outbox), 0)
+
+        for callback in callbacks:
+            callback()
+        for thread in threading.enumerate():
+            if isinstance(thread, EmailBatchThread):
+                thread.join()
+        self.assertEqual(len(mail.outbox), 3)
+
+    def test_transferencias(self):
+        """Valida el archivo de transferencias bancarias de los pagos liquidados."""
+        self.create_user()
+        self.client.login(username='user', password='user12345')
+        response = self.client.post('/api/pago/liquidacion/', self.data, format='json')
+        response = self.client.get(response.json()['transferencias'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        rows = response.content.decode().splitlines()
+        self.assertEqual(len(rows), 4)
+        pago = Pago.objects.get(proveedor=self.otro_proveedor)
+        self.assertIn(f'{self.otro_proveedor.cbu},{self.otro_proveedor.cuit},', rows[-1])
+        self.assertIn(f',P,{pago.total:.2f},Pago {pago.pk}', rows[-1])
+
 
 class PagoRetrieveViewAPITestCase(BaseTestCase):
     """Tests sobre el detalle de la API de pagos."""
@@ -554,3 +769,24 @@ class PagoUpdateViewAPITestCase(BaseTestCase):
         response = self.client.put(f'/api/pago/{self.data_update.get("id")}/', data, format='json')
         self.assertFalse(PagoFacturaPago.objects.filter(pk=pago_pago_pk).exists())
         self.assertEqual(response.status_code, 200)
+
+    def test_update_queries(self):
+        """Valida que la cantidad de consultas de la edición no dependa de la cantidad de facturas y pagos."""
+        self.create_user()
+        self.client.login(username='user', password='user12345')
+
+        def count_queries(limit):
+            data = PagoFactoryData().update(limit=limit)
+            for row in data['pago_facturas']:
+                row['ganancias'] = 0
+                row['pago_factura_pagos'].append({'data': {'action': 'add'}, 'metodo': 2, 'monto': 10})
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.put(f'/api/pago/{data["id"]}/', data, format='json')
+            self.assertEqual(response.status_code, 200)
+            pago_facturas = PagoFactura.objects.filter(pago=data['id'])
+            self.assertFalse(pago_facturas.exclude(ganancias=0).exists())
+            pagos = PagoFacturaPago.objects.filter(pago_factura__in=pago_facturas)
+            self.assertEqual(pagos.count(), limit * 2)
+            return len(context.captured_queries)
+
+        self.assertEqual(count_queries(2), count_queries(10))
@@ -15,7 +15,9 @@ from sistemita.api.clientes.views import (
     FacturaViewSet,
 )
 from sistemita.api.cobranzas.views import CobranzaViewSet
+from sistemita.api.conciliaciones.views import ConciliacionViewSet
 from sistemita.api.entidades.views import DistritoViewSet, LocalidadViewSet
+from sistemita.api.importaciones.views import ImportacionViewSet
 from sistemita.api.mediopago.views import MedioPagoViewSet
 from sistemita.api.pagos.views import PagoViewSet
 from sistemita.api.proveedores.views import (
@@ -38,6 +40,7 @@ router.register(r'factura', FacturaViewSet)
 router.register(r'factura-distribuida', FacturaDistribuidaViewSet)
 router.register(r'factura-imputada', FacturaImputadaViewSet)
 router.register(r'factura-proveedor', FacturaProveedorViewSet)
+router.register(r'importacion', ImportacionViewSet)
 router.register(r'localidad', LocalidadViewSet)
 router.register(r'proveedor', ProveedorViewSet)
 router.register(r'facturaproveedor-imputada', FacturaProveedorImputadaViewSet)
@@ -46,6 +49,7 @@ router.register(r'mediopago', MedioPagoViewSet)
 # Accounting
 router.register(r'cobranza', CobranzaViewSet)
 router.register(r'pago', PagoViewSet)
+router.register(r'conciliacion', ConciliacionViewSet, basename='conciliacion')
 
 app_name = "api"
 urlpatterns = router.urls
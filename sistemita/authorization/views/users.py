@@ -1,8 +1,5 @@
 """Vistas del módulo de usuarios."""
 
-# Datetime
-from datetime import date
-
 # Django
 from django.contrib import messages
 from django.contrib.auth import get_user_model
@@ -30,6 +27,7 @@ from sistemita.utils.strings import (
     MESSAGE_SUCCESS_DELETE,
     MESSAGE_SUCCESS_UPDATE,
 )
+from sistemita.utils.summary import created_this_week
 
 User = get_user_model()
 
@@ -63,9 +61,7 @@ class UserListView(PermissionRequiredMixin, SuccessMessageMixin, ListView):
         """Obtiene datos para incluir en los reportes."""
         context = super().get_context_data(**kwargs)
         queryset = self.get_queryset()
-        current_week = date.today().isocalendar()[1]
-
-        context['last_created'] = queryset.filter(date_joined__week=current_week).count()
+        context['last_created'] = queryset.filter(created_this_week('date_joined')).count()
 
         return context
 
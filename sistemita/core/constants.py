@@ -41,4 +41,38 @@ TIPOS_FACTURA_IMPORT = (
 
 TIPOS_DOC_IMPORT = 'CUIT'
 
+# Estados de factura de cliente en el panel de control
+ESTADOS_FACTURA = (
+    (1, 'Enviada al cliente'),
+    (2, 'Cobrada'),
+    (3, 'Demorada'),
+    (4, 'Lista'),
+)
+
 ZERO_DECIMAL = Decimal(0)
+
+# Conceptos de los movimientos de cuenta corriente
+CONCEPTOS_CUENTA_CORRIENTE = (
+    ('factura', 'Factura'),
+    ('ajuste', 'Ajuste'),
+    ('anulacion', 'Anulación'),
+    ('imputacion', 'Imputación'),
+    ('cobranza', 'Cobranza'),
+    ('pago', 'Pago'),
+)
+
+# Tramos de antigüedad de deuda en días
+TRAMOS_ANTIGUEDAD = ((0, 30), (31, 60), (61, 90), (91, None))
+
+# Importaciones por partes de planillas de comprobantes de AFIP
+TIPOS_IMPORTACION = (
+    ('cliente', 'Facturas de clientes'),
+    ('proveedor', 'Facturas de proveedores'),
+)
+
+ESTADOS_IMPORTACION = (
+    (1, 'Pendiente'),
+    (2, 'Procesando'),
+    (3, 'Terminada'),
+    (4, 'Fallida'),
+)
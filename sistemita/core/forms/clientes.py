@@ -15,6 +15,7 @@ from django.contrib import admin
 from django_select2 import forms as ds2_forms
 
 # Sistemita
+from sistemita.accounting.models.cuentacorriente import MovimientoCliente
 from sistemita.core.models.archivo import Archivo
 from sistemita.core.models.cliente import (
     Cliente,
@@ -27,7 +28,9 @@ from sistemita.core.models.cliente import (
 from sistemita.core.models.entidad import Distrito, Localidad
 from sistemita.core.models.proveedor import Proveedor
 from sistemita.expense.models import Fondo
+from sistemita.utils.cache import invalidate_panel_cache
 from sistemita.utils.commons import get_porcentaje_agregado
+from sistemita.utils.diff import NestedDiff
 from sistemita.utils.strings import (
     MESSAGE_CUIT_INVALID,
     MESSAGE_PERMISSION_ERROR,
@@ -333,9 +336,32 @@ class FacturaForm(forms.ModelForm):
         data.pop('archivos')
         proveedores = data.pop('proveedores')
         instance = self.instance
+        creada = instance.pk is None
+        anterior = None if creada else Factura.objects.filter(pk=instance.pk).values_list('contrato', 'neto').first()
 
-        if instance.pk is None:
+        if creada:
             instance = Factura.objects.create(**data)
+        else:
+            Factura.objects.filter(pk=instance.pk).update(**data)
+
+        # Impuestos
+        if impuestos:
+            cambios = NestedDiff(
+                FacturaImpuesto, ('detalle', 'monto'), queryset=FacturaImpuesto.objects.filter(factura=instance)
+            )
+            for impuesto in impuestos:
+                valores = {'detalle': impuesto.get('detalle'), 'monto': impuesto.get('monto')}
+                if impuesto.get('action') == 'add':
+                    cambios.add(factura=instance, **valores)
+                else:
+                    cambios.push(impuesto.get('action'), impuesto.get('id'), **valores)
+            cambios.apply()
+
+        # Montos calculados sobre el neto sin impuestos
+        Factura.objects.filter(pk=instance.pk).update_montos()
+        instance.refresh_from_db(fields=['neto_sin_impuestos', 'monto_a_distribuir'])
+
+        if creada:
             Fondo.objects.create(
                 factura=instance,
                 monto=instance.porcentaje_fondo_monto,
@@ -344,7 +370,6 @@ class FacturaForm(forms.ModelForm):
                 moneda=instance.moneda,
             )
         else:
-            Factura.objects.filter(pk=instance.pk).update(**data)
             instance.factura_fondo.update_or_create(
                 moneda=instance.moneda,
                 monto=instance.porcentaje_fondo_monto,
@@ -353,6 +378,8 @@ class FacturaForm(forms.ModelForm):
             )
 
         if proveedores:
+            # Los proveedores anteriores dejan de ver la factura en su panel
+            invalidate_panel_cache(instance.proveedores.values_list('pk', flat=True))
             instance.proveedores.clear()
             for proveedor in proveedores:
                 instance.proveedores.add(proveedor)
@@ -371,31 +398,24 @@ class FacturaForm(forms.ModelForm):
                 facturadistribuida.distribuida = False
             facturadistribuida.save()
 
-        # Impuestos
-        if impuestos:
-            for impuesto in impuestos:
-                action = impuesto.get('action')
-                if action == 'add':
-                    FacturaImpuesto.objects.create(
-                        factura=instance, detalle=impuesto.get('detalle'), monto=impuesto.get('monto')
-                    )
-                elif action == 'update':
-                    FacturaImpuesto.objects.filter(id=impuesto.get('id')).update(
-                        factura=instance, detalle=impuesto.get('detalle'), monto=impuesto.get('monto')
-                    )
-                elif action == 'delete':
-                    FacturaImpuesto.objects.filter(id=impuesto.get('id')).delete()
+        # Estado
+        Factura.objects.filter(pk=instance.pk).update_status()
 
-        # Contrato
-        if self.instance.contrato:
-            monto_facturas_contrato = 0
-            for factura in self.instance.contrato.facturas.all():
-                monto_facturas_contrato += factura.neto
+        # Cuenta corriente
+        MovimientoCliente.objects.registrar(
+            Factura.objects.filter(pk=instance.pk),
+            concepto='factura' if creada else 'ajuste',
+            fecha=instance.fecha if creada else None,
+        )
 
-            self.instance.contrato.monto -= monto_facturas_contrato
-            if not max(self.instance.contrato.monto, 0):
-                self.instance.contrato.monto = 0
-            self.instance.contrato.save()
+        # Contrato
+        actual = (data.get('contrato').pk, data.get('neto')) if data.get('contrato') else None
+        if anterior != actual:
+            Contrato.objects.registrar_consumo(anterior, actual)
+            contratos = {consumo[0] for consumo in (anterior, actual) if consumo and consumo[0]}
+            invalidate_panel_cache(
+                Contrato.proveedores.through.objects.filter(contrato__in=contratos).values_list('proveedor', flat=True)
+            )
 
         return instance
 
@@ -453,6 +473,14 @@ class ContratoForm(forms.ModelForm):
 
         return cleaned_data
 
+    def save(self, commit=True):
+        """Guarda el contrato e invalida el panel de control de sus proveedores."""
+        proveedores = list(self.instance.proveedores.values_list('pk', flat=True)) if self.instance.pk else []
+        instance = super().save(commit)
+        proveedores += [proveedor.pk for proveedor in self.cleaned_data.get('proveedores') or []]
+        invalidate_panel_cache(proveedores)
+        return instance
+
     class Meta:
         """Configuraciones del formulario."""
 
@@ -12,6 +12,7 @@ from crispy_forms.layout import HTML, Div, Fieldset, Layout, Reset, Submit
 from django import forms
 
 # Models
+from sistemita.accounting.models.cuentacorriente import MovimientoProveedor
 from sistemita.core.models.archivo import Archivo
 from sistemita.core.models.cliente import Factura
 from sistemita.core.models.entidad import Distrito, Localidad
@@ -292,10 +293,15 @@ class FacturaProveedorForm(forms.ModelForm):
         data = self.cleaned_data
         data.pop('archivos')
         instance = self.instance
+        creada = instance.pk is None
 
-        if instance.pk is None:
+        if creada:
             instance = FacturaProveedor.objects.create(**data)
+            anteriores = []
         else:
+            # Facturas de cliente asociadas antes de la edición, la instancia del form ya tiene los datos nuevos
+            anteriores = list(Factura.objects.filter_by_facturas_proveedor([instance.pk]).values_list('pk', flat=True))
+            anteriores.append(FacturaProveedor.objects.values_list('factura', flat=True).get(pk=instance.pk))
             FacturaProveedor.objects.filter(pk=instance.pk).update(**data)
             instance = FacturaProveedor.objects.get(pk=instance.pk)
 
@@ -317,6 +323,17 @@ class FacturaProveedorForm(forms.ModelForm):
                 factura_distribucion_proveedor.factura_proveedor = instance
                 factura_distribucion_proveedor.save()
 
+        # Actualiza el estado de las facturas de cliente distribuidas, antes y después de la edición
+        actuales = Factura.objects.filter_by_facturas_proveedor([instance.pk]).values_list('pk', flat=True)
+        Factura.objects.filter(pk__in={*anteriores, *actuales, instance.factura_id}).update_status()
+
+        # Cuenta corriente
+        MovimientoProveedor.objects.registrar(
+            [instance],
+            concepto='factura' if creada else 'ajuste',
+            fecha=instance.fecha if creada else None,
+        )
+
         return instance
 
 
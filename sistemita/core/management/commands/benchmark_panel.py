@@ -0,0 +1,82 @@
+"""Comando para comparar los algoritmos de agrupación del panel de control."""
+
+# Utils
+import random
+from time import perf_counter
+from types import SimpleNamespace
+
+# Django
+from django.core.management.base import BaseCommand, CommandError
+
+# Sistemita
+from sistemita.utils.commons import get_groups_to_panel
+
+
+def get_groups_to_panel_legacy(facturas):
+    """Algoritmo anterior de agrupación, se conserva como referencia."""
+    status = [1, 2, 3, 4]
+
+    for _ in facturas:
+        sub_group = []
+        for st in status:
+            match = None
+            for index, item in enumerate(facturas):
+                if item.status == st:
+                    match = (index, item)
+                    break
+
+            if match is not None:
+                sub_group.append(match[1])
+                del facturas[match[0]]
+            else:
+                sub_group.append(0)
+
+            # Verifica si el el subgrupo se completó
+            if len(sub_group) == 4:
+                return facturas, sub_group
+
+    return facturas, sub_group
+
+
+def get_all_groups_to_panel_legacy(facturas):
+    """Arma todas las filas del panel con el algoritmo anterior."""
+    facturas = list(facturas)
+    groups = []
+    while len(facturas):
+        facturas, sub_group = get_groups_to_panel_legacy(facturas)
+        if sub_group:
+            groups.append(sub_group)
+    return groups
+
+
+class Command(BaseCommand):
+    """Mide el tiempo de agrupación de facturas del panel con ambos algoritmos."""
+
+    def add_arguments(self, parser):
+        """Argumentos del comando."""
+        parser.add_argument('--sizes', nargs='+', type=int, default=[100, 1000, 10000])
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        """Controlador."""
+        rand = random.Random(options['seed'])
+
+        for size in options['sizes']:
+            # Ordenadas por estado como las entrega el panel
+            facturas = [SimpleNamespace(pk=pk, status=rand.randint(1, 4)) for pk in range(size)]
+            facturas.sort(key=lambda factura: factura.status)
+
+            time_start = perf_counter()
+            legacy = get_all_groups_to_panel_legacy(facturas)
+            time_legacy = (perf_counter() - time_start) * 1000
+
+            time_start = perf_counter()
+            groups = get_groups_to_panel(facturas)
+            time_groups = (perf_counter() - time_start) * 1000
+
+            if groups != legacy:
+                raise CommandError(f'Los algoritmos difieren para {size} facturas')
+
+            self.stdout.write(f'{size} facturas: anterior {time_legacy:.2f} ms, actual {time_groups:.2f} ms')
+
+        self.stdout.write(self.style.SUCCESS('Done'))
@@ -0,0 +1,123 @@
+"""Comando para detectar escaneos secuenciales en las consultas de los listados."""
+
+# Django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+
+# Sistemita
+from sistemita.accounting.models.cobranza import Cobranza
+from sistemita.accounting.models.pago import Pago
+from sistemita.authorization.models import User
+from sistemita.core.models.cliente import Factura
+from sistemita.core.models.proveedor import FacturaProveedor
+from sistemita.expense.models import Fondo
+from sistemita.utils.explain import explain_analyze, get_seq_scans
+
+# Consultas de los listados con los filtros que usan habitualmente
+QUERY_SHAPES = [
+    ('core:factura-list', {}),
+    ('core:facturaproveedor-list', {}),
+    ('accounting:pago-list', {}),
+    ('accounting:pago-list', {'desde': '01/01/2021', 'hasta': '31/12/2021'}),
+    ('accounting:cobranza-list', {}),
+    ('expense:fondo-list', {}),
+]
+
+HOT_MODELS = [Factura, FacturaProveedor, Pago, Cobranza, Fondo]
+
+
+def get_hot_tables():
+    """Retorna las tablas consultadas por los listados."""
+    return {model._meta.db_table for model in HOT_MODELS}
+
+
+def capture_view_queries(user, shapes=QUERY_SHAPES):
+    """
+    Ejecuta los listados como el usuario indicado y retorna las consultas sobre las tablas de los listados.
+    Retorna una lista de tuplas (vista, sql) sin consultas repetidas.
+    """
+    factory = RequestFactory()
+    tables = [f'"{table}"' for table in get_hot_tables()]
+    queries = []
+    seen = set()
+
+    for name, params in shapes:
+        request = factory.get(reverse(name), params)
+        request.user = user
+        with CaptureQueriesContext(connection) as context:
+            response = resolve(request.path_info).func(request)
+            if hasattr(response, 'render'):
+                response.render()
+
+        for query in context.captured_queries:
+            sql = query['sql']
+            if sql in seen or not sql.lstrip().upper().startswith('SELECT'):
+                continue
+            if any(table in sql for table in tables):
+                seen.add(sql)
+                queries.append((name, sql))
+    return queries
+
+
+class Command(BaseCommand):
+    """Reproduce las consultas de los listados con EXPLAIN ANALYZE e informa los escaneos secuenciales."""
+
+    def add_arguments(self, parser):
+        """Argumentos del comando."""
+        parser.add_argument('--user', help='Usuario con el que se ejecutan los listados, por defecto un superusuario')
+        parser.add_argument(
+            '--no-seqscan',
+            action='store_true',
+            help='Desalienta los escaneos secuenciales para verificar que existan índices útiles con pocos datos',
+        )
+        parser.add_argument('--fail', action='store_true', help='Termina con error si hay escaneos secuenciales')
+
+    def handle(self, *args, **options):
+        """Controlador."""
+        if connection.vendor != 'postgresql':
+            raise CommandError('El comando requiere PostgreSQL')
+
+        if options['user']:
+            user = User.objects.filter(username=options['user']).first()
+        else:
+            user = User.objects.filter(is_superuser=True).first()
+        if user is None:
+            raise CommandError('No se encontró un usuario para ejecutar los listados')
+
+        tables = get_hot_tables()
+        queries = capture_view_queries(user)
+
+        with connection.cursor() as cursor:
+            if options['no_seqscan']:
+                cursor.execute('SET enable_seqscan = off')
+            try:
+                seq_scans = 0
+                for name, sql in queries:
+                    plan = explain_analyze(sql)
+                    nodes = get_seq_scans(plan, tables)
+                    if not nodes:
+                        continue
+
+                    seq_scans += len(nodes)
+                    self.stdout.write(self.style.WARNING(f'[{name}] {sql[:200]}'))
+                    for node in nodes:
+                        self.stdout.write(
+                            f"  Seq Scan on {node.get('Relation Name')}: "
+                            f"filas {node.get('Actual Rows')}, "
+                            f"descartadas {node.get('Rows Removed by Filter', 0)}, "
+                            f"buffers hit {node.get('Shared Hit Blocks', 0)} read {node.get('Shared Read Blocks', 0)}, "
+                            f"{node.get('Actual Total Time')} ms, "
+                            f"filtro {node.get('Filter', '-')}"
+                        )
+            finally:
+                if options['no_seqscan']:
+                    cursor.execute('RESET enable_seqscan')
+
+        self.stdout.write(f'{len(queries)} consultas analizadas, {seq_scans} escaneos secuenciales')
+        if seq_scans and options['fail']:
+            raise CommandError('Hay consultas de los listados que escanean tablas completas')
+
+        self.stdout.write(self.style.SUCCESS('Done'))
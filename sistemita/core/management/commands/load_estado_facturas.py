@@ -0,0 +1,17 @@
+"""Comando para calcular el estado de las facturas de cliente."""
+
+# Django
+from django.core.management.base import BaseCommand
+
+# Sistemita
+from sistemita.core.models.cliente import Factura
+
+
+class Command(BaseCommand):
+    """Recalcula el estado guardado de todas las facturas de cliente."""
+
+    def handle(self, *args, **options):
+        """Controlador."""
+        count = Factura.objects.all().update_status()
+
+        self.stdout.write(self.style.SUCCESS(f'Done ({count} facturas)'))
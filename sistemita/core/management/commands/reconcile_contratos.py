@@ -0,0 +1,23 @@
+"""Comando para recalcular el monto consumido y restante de los contratos."""
+
+# Django
+from django.core.management.base import BaseCommand
+
+# Sistemita
+from sistemita.core.models.cliente import Contrato
+from sistemita.utils.cache import invalidate_panel_cache
+
+
+class Command(BaseCommand):
+    """
+    Recalcula el monto consumido y restante de todos los contratos a partir del neto de sus facturas.
+    Corrige los desvíos de las actualizaciones incrementales en una sola consulta.
+    """
+
+    def handle(self, *args, **options):
+        """Controlador."""
+        count = Contrato.objects.reconcile()
+        invalidate_panel_cache(Contrato.proveedores.through.objects.values_list('proveedor', flat=True).distinct())
+        self.stdout.write(f'{count} contratos actualizados')
+
+        self.stdout.write(self.style.SUCCESS('Done'))
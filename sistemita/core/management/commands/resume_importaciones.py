@@ -0,0 +1,52 @@
+"""Comando para retomar las importaciones pendientes o interrumpidas."""
+
+# Utils
+from datetime import timedelta
+
+# Django
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+# Sistemita
+from sistemita.api.clientes.serializers import FacturaImportSerializer
+from sistemita.api.proveedores.serializers import (
+    FacturaProveedorImportSerializer,
+)
+from sistemita.core.models import Importacion
+from sistemita.utils.importacion import importar_por_partes
+
+SERIALIZERS = {
+    'cliente': FacturaImportSerializer,
+    'proveedor': FacturaProveedorImportSerializer,
+}
+
+
+class Command(BaseCommand):
+    """
+    Retoma las importaciones pendientes o en proceso que no avanzan hace más de `--minutos`, por ejemplo
+    porque se reinició el proceso que ejecutaba su thread. Se continúa desde las filas ya procesadas.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--minutos', type=int, default=30, help='Minutos sin avance para considerar interrumpida una importación.'
+        )
+
+    def handle(self, *args, **options):
+        """Controlador."""
+        limite = timezone.now() - timedelta(minutes=options['minutos'])
+        importaciones = Importacion.objects.filter(
+            estado__in=[Importacion.PENDIENTE, Importacion.PROCESANDO], modificado__lt=limite
+        ).order_by('pk')
+        for importacion in importaciones:
+            # Se toma con una actualización condicional para no procesarla dos veces
+            tomada = Importacion.objects.filter(
+                pk=importacion.pk, estado=importacion.estado, modificado=importacion.modificado
+            ).update(estado=Importacion.PROCESANDO, modificado=timezone.now())
+            if not tomada:
+                continue
+            importar_por_partes(importacion, SERIALIZERS[importacion.tipo](many=True))
+            importacion.refresh_from_db()
+            self.stdout.write(f'Importación {importacion.pk}: {importacion.get_estado_display()}')
+
+        self.stdout.write(self.style.SUCCESS('Done'))
@@ -0,0 +1,50 @@
+"""Comando para verificar los montos calculados guardados en las facturas de cliente."""
+
+# Django
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Sum
+
+# Sistemita
+from sistemita.core.models.cliente import Factura
+
+CHUNK_SIZE = 1000
+
+
+class Command(BaseCommand):
+    """
+    Compara el neto sin impuestos y el monto a distribuir guardados con los calculados a partir
+    de los impuestos de cada factura.
+    """
+
+    def add_arguments(self, parser):
+        """Argumentos del comando."""
+        parser.add_argument(
+            '--fix', action='store_true', help='Recalcula y guarda los montos de las facturas con diferencias'
+        )
+
+    def handle(self, *args, **options):
+        """Controlador."""
+        diferencias = []
+        queryset = Factura.objects.annotate(total_impuestos=Sum('impuestos__monto')).order_by('pk')
+        for factura in queryset.iterator(chunk_size=CHUNK_SIZE):
+            neto_sin_impuestos, monto_a_distribuir = factura.neto_sin_impuestos, factura.monto_a_distribuir
+            factura.set_montos(factura.total_impuestos or 0)
+            if (neto_sin_impuestos, monto_a_distribuir) != (factura.neto_sin_impuestos, factura.monto_a_distribuir):
+                diferencias.append(factura.pk)
+                self.stdout.write(
+                    self.style.WARNING(
+                        f'Factura {factura.pk}: '
+                        f'neto sin impuestos {neto_sin_impuestos} (calculado {factura.neto_sin_impuestos}), '
+                        f'monto a distribuir {monto_a_distribuir} (calculado {factura.monto_a_distribuir})'
+                    )
+                )
+
+        self.stdout.write(f'{len(diferencias)} facturas con diferencias')
+        if diferencias:
+            if not options['fix']:
+                raise CommandError('Hay facturas con montos desactualizados, ejecutar con --fix para corregirlos')
+            for start in range(0, len(diferencias), CHUNK_SIZE):
+                end = start + CHUNK_SIZE
+                Factura.objects.filter(pk__in=diferencias[start:end]).update_montos()
+
+        self.stdout.write(self.style.SUCCESS('Done'))
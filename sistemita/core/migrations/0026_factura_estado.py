@@ -0,0 +1,18 @@
+# Generated by Django 3.2 on 2026-10-18 06:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0025_alter_factura_contrato'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='factura',
+            name='estado',
+            field=models.PositiveSmallIntegerField(choices=[(1, 'Enviada al cliente'), (2, 'Cobrada'), (3, 'Demorada'), (4, 'Lista')], db_index=True, default=1, editable=False),
+        ),
+    ]
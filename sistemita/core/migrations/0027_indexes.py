@@ -0,0 +1,41 @@
+# Generated by Django 3.2 on 2026-10-18 03:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0026_factura_estado'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='factura',
+            index=models.Index(condition=models.Q(('cobrado', False)), fields=['moneda', 'tipo'], name='factura_impaga_moneda_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='factura',
+            index=models.Index(fields=['tipo'], name='factura_tipo_pattern_idx', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='factura',
+            index=models.Index(fields=['-creado'], name='factura_creado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='facturaproveedor',
+            index=models.Index(condition=models.Q(('cobrado', False)), fields=['moneda', 'tipo'], name='fc_prov_impaga_moneda_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='facturaproveedor',
+            index=models.Index(fields=['tipo'], name='fc_prov_tipo_pattern_idx', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='facturaproveedor',
+            index=models.Index(fields=['-creado'], name='fc_prov_creado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='facturaproveedor',
+            index=models.Index(fields=['proveedor', 'fecha'], name='fc_prov_proveedor_fecha_idx'),
+        ),
+    ]
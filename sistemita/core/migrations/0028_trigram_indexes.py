@@ -0,0 +1,50 @@
+# Generated by Django 3.2 on 2026-10-18 04:30
+
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+# Columnas usadas en las búsquedas de los listados. Los índices son sobre UPPER(columna)
+# porque es la expresión que genera `icontains` en PostgreSQL.
+TRIGRAM_INDEXES = [
+    ('core_factura', 'numero'),
+    ('core_cliente', 'razon_social'),
+    ('core_cliente', 'cuit'),
+    ('core_cliente', 'correo'),
+    ('core_proveedor', 'razon_social'),
+    ('core_proveedor', 'cuit'),
+    ('core_proveedor', 'correo'),
+]
+
+
+def create_trigram_indexes(apps, schema_editor):
+    """Crea los índices GIN de trigramas, solo en PostgreSQL."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table, column in TRIGRAM_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {table}_{column}_trgm ON {table} USING gin (UPPER({column}) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    """Elimina los índices GIN de trigramas."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table, column in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {table}_{column}_trgm')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0027_indexes'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+        migrations.AddIndex(
+            model_name='facturaproveedor',
+            index=models.Index(fields=['numero'], name='fc_prov_numero_idx'),
+        ),
+    ]
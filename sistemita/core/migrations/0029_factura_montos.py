@@ -0,0 +1,62 @@
+# Generated by Django 3.2 on 2026-10-18 12:05
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Sum
+
+from sistemita.utils.commons import get_porcentaje
+
+
+def init_montos(apps, schema_editor):
+    """
+    Calcula el neto sin impuestos y el monto a distribuir de las facturas existentes, como `Factura.set_montos`.
+    Los impuestos se suman en una subconsulta y las facturas se recorren y guardan de a partes.
+    """
+    Factura = apps.get_model('core', 'Factura')
+    FacturaImpuesto = apps.get_model('core', 'FacturaImpuesto')
+    impuestos = (
+        FacturaImpuesto.objects.filter(factura=OuterRef('pk'))
+        .order_by()
+        .values('factura')
+        .annotate(total=Sum('monto'))
+        .values('total')
+    )
+    facturas = (
+        Factura.objects.only('neto', 'porcentaje_fondo', 'porcentaje_socio_alan', 'porcentaje_socio_ariel')
+        .annotate(total_impuestos=Subquery(impuestos))
+        .order_by('pk')
+    )
+    actualizadas = []
+    for factura in facturas.iterator(chunk_size=2000):
+        neto = Decimal(factura.neto) - Decimal(factura.total_impuestos or 0)
+        porcentaje_socios = factura.porcentaje_socio_alan + factura.porcentaje_socio_ariel
+        porcentajes = get_porcentaje(neto, factura.porcentaje_fondo) + get_porcentaje(neto, porcentaje_socios)
+        factura.neto_sin_impuestos = neto
+        factura.monto_a_distribuir = round(neto - Decimal(porcentajes), 2)
+        actualizadas.append(factura)
+        if len(actualizadas) == 500:
+            Factura.objects.bulk_update(actualizadas, ['neto_sin_impuestos', 'monto_a_distribuir'])
+            actualizadas = []
+    Factura.objects.bulk_update(actualizadas, ['neto_sin_impuestos', 'monto_a_distribuir'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0028_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='factura',
+            name='monto_a_distribuir',
+            field=models.DecimalField(decimal_places=2, default=0.0, editable=False, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='factura',
+            name='neto_sin_impuestos',
+            field=models.DecimalField(decimal_places=2, default=0.0, editable=False, max_digits=12),
+        ),
+        migrations.RunPython(init_montos, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 3.2 on 2026-10-18 12:40
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def init_monto_consumido(apps, schema_editor):
+    """
+    El monto de los contratos existentes ya tiene descontado el neto de sus facturas: se lo restituye
+    y ese neto pasa a ser el consumido, así el restante, `reconcile` y `save` parten del mismo monto.
+    """
+    Contrato = apps.get_model('core', 'Contrato')
+    Factura = apps.get_model('core', 'Factura')
+    consumido = Coalesce(
+        Subquery(
+            Factura.objects.filter(contrato=OuterRef('pk'))
+            .order_by()
+            .values('contrato')
+            .annotate(total=Sum('neto'))
+            .values('total')
+        ),
+        Value(Decimal(0)),
+        output_field=models.DecimalField(max_digits=12, decimal_places=2),
+    )
+    Contrato.objects.update(monto_consumido=consumido, monto_restante=F('monto'))
+    Contrato.objects.update(monto=F('monto') + F('monto_consumido'))
+
+
+def restore_monto(apps, schema_editor):
+    """Vuelve a descontar el consumido del monto de los contratos."""
+    Contrato = apps.get_model('core', 'Contrato')
+    Contrato.objects.update(monto=F('monto_restante'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0029_factura_montos'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contrato',
+            name='monto_consumido',
+            field=models.DecimalField(decimal_places=2, default=0.0, editable=False, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='contrato',
+            name='monto_restante',
+            field=models.DecimalField(decimal_places=2, default=0.0, editable=False, max_digits=12),
+        ),
+        migrations.RunPython(init_monto_consumido, restore_monto),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 3.2 on 2026-10-18 13:10
+
+import django.core.serializers.json
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0030_contrato_consumo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Importacion',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('creado', models.DateTimeField(auto_now_add=True, verbose_name='creado')),
+                ('modificado', models.DateTimeField(auto_now=True, verbose_name='modificado')),
+                ('tipo', models.CharField(choices=[('cliente', 'Facturas de clientes'), ('proveedor', 'Facturas de proveedores')], max_length=10)),
+                ('estado', models.PositiveSmallIntegerField(choices=[(1, 'Pendiente'), (2, 'Procesando'), (3, 'Terminada'), (4, 'Fallida')], default=1)),
+                ('archivo', models.FileField(upload_to='importaciones/')),
+                ('filas_total', models.PositiveIntegerField(default=0)),
+                ('filas_procesadas', models.PositiveIntegerField(default=0)),
+                ('filas_importadas', models.PositiveIntegerField(default=0)),
+                ('filas_con_errores', models.PositiveIntegerField(default=0)),
+                ('mensaje', models.TextField(blank=True)),
+            ],
+            options={
+                'verbose_name': 'importación',
+                'verbose_name_plural': 'importaciones',
+                'ordering': ('-creado',),
+            },
+        ),
+        migrations.CreateModel(
+            name='ImportacionError',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fila', models.PositiveIntegerField()),
+                ('datos', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('errores', models.JSONField()),
+                ('importacion', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='errores', to='core.importacion')),
+            ],
+            options={
+                'verbose_name': 'error de importación',
+                'verbose_name_plural': 'errores de importación',
+                'ordering': ('importacion', 'fila'),
+            },
+        ),
+    ]
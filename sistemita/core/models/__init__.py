@@ -1,3 +1,4 @@
 from .cliente import *  # noqa
+from .importacion import *  # noqa
 from .mediopago import *  # noqa
 from .proveedor import *  # noqa
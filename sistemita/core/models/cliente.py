@@ -1,17 +1,32 @@
 """Modelo de cliente."""
 
 # Utils
+from collections import defaultdict
 from decimal import Decimal
 
 # Django
 from django.core.validators import MaxValueValidator
-from django.db import models
+from django.db import models, transaction
+from django.db.models import (
+    BooleanField,
+    Case,
+    Exists,
+    F,
+    OuterRef,
+    Q,
+    Subquery,
+    Sum,
+    Value,
+    When,
+)
+from django.db.models.functions import Coalesce, Greatest
 
 # Models
-from sistemita.core.constants import MONEDAS
+from sistemita.core.constants import ESTADOS_FACTURA, MONEDAS
 from sistemita.core.models.archivo import Archivo
 from sistemita.core.models.entidad import Distrito, Localidad, Provincia
 from sistemita.core.models.utils import FacturaAbstract, TimeStampedModel
+from sistemita.utils.cache import invalidate_panel_cache
 from sistemita.utils.commons import get_porcentaje
 
 
@@ -65,6 +80,110 @@ class FacturaCategoria(TimeStampedModel):
         return f'{self.nombre}'
 
 
+class FacturaQuerySet(models.QuerySet):
+    """QuerySet de facturas de cliente."""
+
+    @staticmethod
+    def status_conditions():
+        """
+        Condiciones SQL equivalentes a las propiedades de estado de `Factura`.
+        Evalúa la distribución y las facturas de los proveedores con subconsultas
+        en lugar de consultar cada factura por separado.
+        """
+        # Import local para evitar importación circular
+        from sistemita.core.models.proveedor import FacturaDistribuidaProveedor
+
+        distribuida = Exists(FacturaDistribuida.objects.filter(factura=OuterRef('pk'), distribuida=True))
+        fc_proveedores = FacturaDistribuidaProveedor.objects.filter(factura_distribucion__factura=OuterRef('pk'))
+        con_proveedores = Exists(fc_proveedores)
+        sin_factura_proveedor = Exists(fc_proveedores.filter(factura_proveedor__isnull=True))
+        sin_pago_proveedor = Exists(
+            fc_proveedores.filter(Q(factura_proveedor__isnull=True) | Q(factura_proveedor__cobrado=False))
+        )
+        realizadas = Q(con_proveedores) & ~Q(sin_factura_proveedor)
+        pagadas = Q(con_proveedores) & ~Q(sin_pago_proveedor)
+
+        return Q(distribuida), realizadas, pagadas
+
+    @classmethod
+    def status_expression(cls):
+        """Expresión SQL equivalente a la propiedad `Factura.status`."""
+        distribuida, realizadas, pagadas = cls.status_conditions()
+
+        return Case(
+            When(distribuida & Q(cobrado=True) & realizadas & pagadas, then=Value(4)),
+            When(distribuida & Q(cobrado=False) & realizadas, then=Value(3)),
+            When(cobrado=True, then=Value(2)),
+            default=Value(1),
+            output_field=models.PositiveSmallIntegerField(),
+        )
+
+    def with_status(self, guardado=False):
+        """
+        Anota el estado y la situación de las facturas de proveedores.
+        Las propiedades del modelo usan estos valores si están presentes.
+        Si `guardado` es verdadero, el estado es la columna `estado` en lugar de calcularse.
+        """
+        _, realizadas, pagadas = self.status_conditions()
+
+        return self.annotate(
+            status_sql=F('estado') if guardado else self.status_expression(),
+            realizadas_sql=Case(When(realizadas, then=Value(True)), default=Value(False), output_field=BooleanField()),
+            pagadas_sql=Case(When(pagadas, then=Value(True)), default=Value(False), output_field=BooleanField()),
+        )
+
+    def panel(self, proveedor_id, desde=None):
+        """
+        Facturas del panel de control de un proveedor, ordenadas por el estado guardado.
+        Si se indica `desde`, excluye las facturas finalizadas anteriores a esa fecha.
+        """
+        queryset = (
+            self.filter(proveedores__in=[proveedor_id])
+            .select_related('cliente', 'factura_distribuida')
+            .with_status(guardado=True)
+        )
+        if desde:
+            queryset = queryset.exclude(fecha__lt=desde, estado=4)
+        return queryset.order_by('estado', 'fecha', 'pk')
+
+    def filter_by_facturas_proveedor(self, facturas_proveedor):
+        """Filtra las facturas distribuidas a las facturas de proveedores recibidas."""
+        return self.filter(
+            factura_distribuida__factura_distribuida_proveedores__factura_proveedor__in=facturas_proveedor
+        )
+
+    def update_status(self):
+        """
+        Recalcula y guarda el estado de las facturas del queryset en una sola consulta.
+        Invalida el panel de control de los proveedores de esas facturas.
+        """
+        count = self.update(estado=self.status_expression())
+        invalidate_panel_cache(self.values_list('proveedores', flat=True))
+        return count
+
+    def update_montos(self):
+        """
+        Recalcula y guarda el neto sin impuestos y el monto a distribuir de las facturas del queryset.
+        Suma los impuestos en una subconsulta y guarda todas las facturas en una sola actualización.
+        """
+        impuestos = (
+            FacturaImpuesto.objects.filter(factura=OuterRef('pk'))
+            .order_by()
+            .values('factura')
+            .annotate(total=Sum('monto'))
+            .values('total')
+        )
+        facturas = list(
+            Factura.objects.filter(pk__in=self.values('pk'))
+            .only('neto', 'porcentaje_fondo', 'porcentaje_socio_alan', 'porcentaje_socio_ariel')
+            .annotate(total_impuestos=Subquery(impuestos))
+        )
+        for factura in facturas:
+            factura.set_montos(factura.total_impuestos or 0)
+        Factura.objects.bulk_update(facturas, ['neto_sin_impuestos', 'monto_a_distribuir'], batch_size=500)
+        return len(facturas)
+
+
 class Factura(FacturaAbstract):
     """Modelo factura de cliente."""
 
@@ -81,24 +200,38 @@ class Factura(FacturaAbstract):
     porcentaje_socio_ariel = models.DecimalField(
         blank=False, decimal_places=2, max_digits=5, default=2.5, validators=[MaxValueValidator(100)]
     )
+    estado = models.PositiveSmallIntegerField(choices=ESTADOS_FACTURA, default=1, db_index=True, editable=False)
+    neto_sin_impuestos = models.DecimalField(decimal_places=2, max_digits=12, default=0.0, editable=False)
+    monto_a_distribuir = models.DecimalField(decimal_places=2, max_digits=12, default=0.0, editable=False)
+
+    objects = FacturaQuerySet.as_manager()
 
     def __str__(self):
         """Devuelve una represetación legible del modelo."""
         return f'{self.fecha} - {self.numero} - {self.cliente.razon_social} - {self.moneda_monto}'
 
-    @property
-    def neto_sin_impuestos(self):
-        """Devuelve el monto neto sin impuestos"""
-        impuestos = 0
-        for impuesto in self.impuestos.all():
-            impuestos += impuesto.monto
+    def save(self, *args, **kwargs):
+        """Guarda la factura con el neto sin impuestos y el monto a distribuir actualizados."""
+        impuestos = self.impuestos.aggregate(total=Sum('monto'))['total'] if self.pk else None
+        self.set_montos(impuestos or 0)
+        super().save(*args, **kwargs)
+
+    def set_montos(self, impuestos):
+        """Calcula el neto sin impuestos y el monto a distribuir a partir del total de impuestos."""
+        self.neto_sin_impuestos = Decimal(self.neto) - Decimal(impuestos)
+        self.monto_a_distribuir = round(
+            self.neto_sin_impuestos - Decimal(self.porcentaje_fondo_monto + self.porcentaje_socios_monto), 2
+        )
 
-        return self.neto - impuestos
+    @property
+    def neto_base(self):
+        """Neto sin impuestos guardado, o el neto si la factura no se guardó y todavía no tiene impuestos."""
+        return self.neto_sin_impuestos if self.pk else self.neto
 
     @property
     def porcentaje_fondo_monto(self):
         """Retorno el monto del porcentaje de fondo sobre el neto sin impuestos."""
-        return get_porcentaje(self.neto_sin_impuestos, self.porcentaje_fondo)
+        return get_porcentaje(self.neto_base, self.porcentaje_fondo)
 
     @property
     def porcentaje_socios_monto(self):
@@ -106,12 +239,7 @@ class Factura(FacturaAbstract):
         Retorno el monto del porcentaje de socios sobre el neto sin impuestos
         """
         porcentaje_socios = self.porcentaje_socio_alan + self.porcentaje_socio_ariel
-        return get_porcentaje(self.neto_sin_impuestos, porcentaje_socios)
-
-    @property
-    def monto_a_distribuir(self):
-        """Retorna el monto a distribuir: neto - (impuestos + porcentaje_fondo + porcentaje_alan + porcentaje_ariel)."""
-        return round(self.neto_sin_impuestos - Decimal(self.porcentaje_fondo_monto + self.porcentaje_socios_monto), 2)
+        return get_porcentaje(self.neto_base, porcentaje_socios)
 
     @property
     def moneda_monto_a_distribuir(self):
@@ -121,6 +249,9 @@ class Factura(FacturaAbstract):
     @property
     def facturas_proveedores_realizadas(self):
         """Retorna si en caso de tener factura distribuida a proveedores, los proveedores hayan cargado las facturas."""
+        if hasattr(self, 'realizadas_sql'):
+            return self.realizadas_sql
+
         fc_proveedores = self.factura_distribuida.factura_distribuida_proveedores.all().values('factura_proveedor')
         recepcion_fc_proveedores = False
         if fc_proveedores:
@@ -138,6 +269,9 @@ class Factura(FacturaAbstract):
     @property
     def facturas_proveedores_pagadas(self):
         """Retorna si en caso de tener factura distribuida a proveedores, los proveedores recibido el pago."""
+        if hasattr(self, 'pagadas_sql'):
+            return self.pagadas_sql
+
         fc_proveedores = self.factura_distribuida.factura_distribuida_proveedores.all().values(
             'factura_proveedor', 'factura_proveedor__cobrado'
         )
@@ -163,6 +297,8 @@ class Factura(FacturaAbstract):
         # paid: 2
         # delayed: 3
         # done: 4
+        if hasattr(self, 'status_sql'):
+            return self.status_sql
 
         factura_distribuida_distribuida = self.factura_distribuida.distribuida
         cobrado = self.cobrado
@@ -192,6 +328,11 @@ class Factura(FacturaAbstract):
         ordering = ('fecha',)
         verbose_name = 'factura'
         verbose_name_plural = 'facturas'
+        indexes = [
+            models.Index(fields=['moneda', 'tipo'], condition=Q(cobrado=False), name='factura_impaga_moneda_idx'),
+            models.Index(fields=['tipo'], opclasses=['varchar_pattern_ops'], name='factura_tipo_pattern_idx'),
+            models.Index(fields=['-creado'], name='factura_creado_idx'),
+        ]
 
 
 class FacturaImpuesto(models.Model):
@@ -206,6 +347,17 @@ class FacturaImpuesto(models.Model):
         """Retorno el monto del contrato."""
         return f'{self.factura.get_moneda_display()} {self.monto}'
 
+    def save(self, *args, **kwargs):
+        """Guarda el impuesto y actualiza los montos de la factura."""
+        super().save(*args, **kwargs)
+        Factura.objects.filter(pk=self.factura_id).update_montos()
+
+    def delete(self, *args, **kwargs):
+        """Elimina el impuesto y actualiza los montos de la factura."""
+        result = super().delete(*args, **kwargs)
+        Factura.objects.filter(pk=self.factura_id).update_montos()
+        return result
+
     def __str__(self):
         return f'Factura #{self.factura.numero} | {self.detalle} | {self.moneda_monto}'
 
@@ -216,6 +368,57 @@ class FacturaImpuesto(models.Model):
         verbose_name_plural = 'impuestos'
 
 
+class ContratoQuerySet(models.QuerySet):
+    """QuerySet de contratos."""
+
+    def registrar_consumo(self, anterior=None, actual=None):
+        """
+        Actualiza el monto consumido y restante de los contratos afectados por una factura.
+
+        `anterior` y `actual` son tuplas (contrato_id, neto) de la factura antes y después del cambio,
+        None si la factura no existía o se elimina. Aplica solo la diferencia con F() sobre las filas
+        bloqueadas, así el costo no depende de la cantidad de facturas del contrato.
+        """
+        deltas = defaultdict(Decimal)
+        if anterior and anterior[0]:
+            deltas[anterior[0]] -= Decimal(anterior[1])
+        if actual and actual[0]:
+            deltas[actual[0]] += Decimal(actual[1])
+        deltas = {pk: delta for pk, delta in deltas.items() if delta}
+        if not deltas:
+            return
+
+        with transaction.atomic():
+            list(Contrato.objects.select_for_update().filter(pk__in=deltas).order_by('pk').values_list('pk'))
+            for pk, delta in sorted(deltas.items()):
+                Contrato.objects.filter(pk=pk).update(
+                    monto_consumido=F('monto_consumido') + delta,
+                    monto_restante=Greatest(F('monto') - F('monto_consumido') - delta, 0),
+                )
+
+    def reconcile(self):
+        """
+        Recalcula el monto consumido y restante de los contratos del queryset en una sola actualización.
+        El consumido es la suma del neto de las facturas de cada contrato.
+        """
+        consumido = Coalesce(
+            Subquery(
+                Factura.objects.filter(contrato=OuterRef('pk'))
+                .order_by()
+                .values('contrato')
+                .annotate(total=Sum('neto'))
+                .values('total')
+            ),
+            Value(Decimal(0)),
+            output_field=models.DecimalField(max_digits=12, decimal_places=2),
+        )
+        return self.update(monto_consumido=consumido, monto_restante=Greatest(F('monto') - consumido, 0))
+
+    def update_restante(self):
+        """Recalcula el monto restante de los contratos del queryset luego de cambiar su monto."""
+        return self.update(monto_restante=Greatest(F('monto') - F('monto_consumido'), 0))
+
+
 class Contrato(TimeStampedModel, models.Model):
     """Modelo contrato de cliente."""
 
@@ -229,12 +432,40 @@ class Contrato(TimeStampedModel, models.Model):
     detalle = models.TextField(blank=True, max_length=255)
     moneda = models.CharField(blank=False, max_length=1, choices=MONEDAS, default='P')
     monto = models.DecimalField(blank=False, decimal_places=2, max_digits=12, default=0.0)
+    monto_consumido = models.DecimalField(decimal_places=2, max_digits=12, default=0.0, editable=False)
+    monto_restante = models.DecimalField(decimal_places=2, max_digits=12, default=0.0, editable=False)
+
+    objects = ContratoQuerySet.as_manager()
 
     @property
     def moneda_monto(self):
         """Retorno el monto del contrato."""
         return f'{self.get_moneda_display()} {self.monto}'
 
+    @property
+    def moneda_monto_restante(self):
+        """Retorno el monto restante del contrato."""
+        return f'{self.get_moneda_display()} {self.monto_restante}'
+
+    def save(self, *args, **kwargs):
+        """
+        Guarda el contrato y recalcula el monto restante.
+        El consumido lo actualizan las facturas, no se pisa al editar un contrato existente.
+        """
+        if self.pk is None or kwargs.get('force_insert'):
+            self.monto_restante = max(Decimal(self.monto) - Decimal(self.monto_consumido), 0)
+            return super().save(*args, **kwargs)
+
+        if kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in ('monto_consumido', 'monto_restante')
+            ]
+        super().save(*args, **kwargs)
+        Contrato.objects.filter(pk=self.pk).update_restante()
+        self.refresh_from_db(fields=['monto_consumido', 'monto_restante'])
+
     def __str__(self):
         return f'{self.fecha_desde} | {self.cliente} | {self.moneda_monto}'
 
@@ -0,0 +1,58 @@
+"""Modelos de importaciones de planillas de comprobantes de AFIP."""
+
+# Django
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+
+# Sistemita
+from sistemita.core.constants import ESTADOS_IMPORTACION, TIPOS_IMPORTACION
+from sistemita.core.models.utils import TimeStampedModel
+
+
+class Importacion(TimeStampedModel):
+    """
+    Importación de una planilla que se valida y guarda por partes fuera de la petición.
+    Los contadores de filas se actualizan al terminar cada parte para consultar el progreso.
+    """
+
+    PENDIENTE, PROCESANDO, TERMINADA, FALLIDA = 1, 2, 3, 4
+
+    tipo = models.CharField(max_length=10, choices=TIPOS_IMPORTACION)
+    estado = models.PositiveSmallIntegerField(choices=ESTADOS_IMPORTACION, default=PENDIENTE)
+    archivo = models.FileField(upload_to='importaciones/')
+    filas_total = models.PositiveIntegerField(default=0)
+    filas_procesadas = models.PositiveIntegerField(default=0)
+    filas_importadas = models.PositiveIntegerField(default=0)
+    filas_con_errores = models.PositiveIntegerField(default=0)
+    mensaje = models.TextField(blank=True)
+
+    class Meta:
+        """Configuraciones del modelo."""
+
+        ordering = ('-creado',)
+        verbose_name = 'importación'
+        verbose_name_plural = 'importaciones'
+
+    def __str__(self):
+        """Representación del modelo."""
+        return f'{self.get_tipo_display()} | {self.archivo.name} | {self.get_estado_display()}'
+
+
+class ImportacionError(models.Model):
+    """Fila de la planilla de una importación que no se guardó, con sus valores y errores."""
+
+    importacion = models.ForeignKey(Importacion, on_delete=models.CASCADE, related_name='errores')
+    fila = models.PositiveIntegerField()
+    datos = models.JSONField(encoder=DjangoJSONEncoder)
+    errores = models.JSONField()
+
+    class Meta:
+        """Configuraciones del modelo."""
+
+        ordering = ('importacion', 'fila')
+        verbose_name = 'error de importación'
+        verbose_name_plural = 'errores de importación'
+
+    def __str__(self):
+        """Representación del modelo."""
+        return f'{self.importacion} | fila {self.fila}'
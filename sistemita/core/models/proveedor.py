@@ -90,6 +90,15 @@ class FacturaProveedor(FacturaAbstract):
         ordering = ('fecha',)
         verbose_name = 'factura proveedor'
         verbose_name_plural = 'facturas proveedores'
+        indexes = [
+            models.Index(
+                fields=['moneda', 'tipo'], condition=models.Q(cobrado=False), name='fc_prov_impaga_moneda_idx'
+            ),
+            models.Index(fields=['tipo'], opclasses=['varchar_pattern_ops'], name='fc_prov_tipo_pattern_idx'),
+            models.Index(fields=['-creado'], name='fc_prov_creado_idx'),
+            models.Index(fields=['proveedor', 'fecha'], name='fc_prov_proveedor_fecha_idx'),
+            models.Index(fields=['numero'], name='fc_prov_numero_idx'),
+        ]
 
 
 class FacturaProveedorImputada(TimeStampedModel, models.Model):
@@ -2,15 +2,25 @@
 
 # Utils
 from datetime import datetime, timedelta
+from decimal import Decimal
+from importlib import import_module
+from io import StringIO
 
 # Django
+from django.apps import apps
 from django.core.management import call_command
 from faker import Faker
 
 # Sistemita
 from sistemita.core.forms import ContratoForm
-from sistemita.core.models import Contrato
-from sistemita.core.tests.factories import ContratoFactory, ContratoFactoryData
+from sistemita.core.forms.clientes import FacturaForm
+from sistemita.core.models import Contrato, Factura
+from sistemita.core.tests.factories import (
+    ContratoFactory,
+    ContratoFactoryData,
+    FacturaClienteFactory,
+    FacturaClienteFactoryData,
+)
 from sistemita.utils.tests import (
     BaseTestCase,
     prevent_request_warnings,
@@ -37,6 +47,97 @@ class ContratoModelTest(BaseTestCase):
         self.assertEqual(str(contrato), f'{contrato.fecha_desde} | {contrato.cliente} | {contrato.moneda_monto}')
 
 
+class ContratoConsumoTest(BaseTestCase):
+    """Test sobre el monto consumido y restante de los contratos."""
+
+    def setUp(self):
+        """Genera un contrato de 1000."""
+        super().setUp()
+        self.contrato = ContratoFactory.create(monto=Decimal('1000.00'))
+
+    def assertConsumo(self, contrato, consumido, restante):
+        """Verifica el monto consumido y restante guardado del contrato."""
+        contrato.refresh_from_db()
+        self.assertEqual(contrato.monto_consumido, Decimal(consumido))
+        self.assertEqual(contrato.monto_restante, Decimal(restante))
+
+    def test_registrar_consumo(self):
+        """Verifica que el alta, edición, cambio de contrato y baja de una factura apliquen solo la diferencia."""
+        otro = ContratoFactory.create(monto=Decimal('500.00'))
+        Contrato.objects.registrar_consumo(actual=(self.contrato.pk, Decimal('300.00')))
+        self.assertConsumo(self.contrato, '300.00', '700.00')
+
+        Contrato.objects.registrar_consumo((self.contrato.pk, Decimal('300.00')), (self.contrato.pk, Decimal('450.00')))
+        self.assertConsumo(self.contrato, '450.00', '550.00')
+
+        Contrato.objects.registrar_consumo((self.contrato.pk, Decimal('450.00')), (otro.pk, Decimal('450.00')))
+        self.assertConsumo(self.contrato, '0.00', '1000.00')
+        self.assertConsumo(otro, '450.00', '50.00')
+
+        Contrato.objects.registrar_consumo(anterior=(otro.pk, Decimal('450.00')))
+        self.assertConsumo(otro, '0.00', '500.00')
+
+    def test_restante_no_negativo(self):
+        """Verifica que el monto restante no sea negativo si se consume más que el monto del contrato."""
+        Contrato.objects.registrar_consumo(actual=(self.contrato.pk, Decimal('1200.00')))
+        self.assertConsumo(self.contrato, '1200.00', '0.00')
+
+    def test_factura_form(self):
+        """Verifica que guardar una factura varias veces no vuelva a descontar su neto del contrato."""
+        user = self.create_superuser()
+        data = FacturaClienteFactoryData().build()
+        data.update({'contrato': self.contrato.pk})
+        form = FacturaForm(data=data, user=user)
+        self.assertTrue(form.is_valid())
+        factura = form.save()
+        factura.refresh_from_db()
+        self.assertConsumo(self.contrato, factura.neto, max(Decimal('1000.00') - factura.neto, 0))
+
+        form = FacturaForm(data=data, instance=Factura.objects.get(pk=factura.pk), user=user)
+        self.assertTrue(form.is_valid())
+        form.save()
+        self.assertConsumo(self.contrato, factura.neto, max(Decimal('1000.00') - factura.neto, 0))
+
+    def test_update_monto(self):
+        """Verifica que al cambiar el monto del contrato se recalcule el restante."""
+        Contrato.objects.registrar_consumo(actual=(self.contrato.pk, Decimal('300.00')))
+        data = ContratoFactoryData().build()
+        data.update({'monto': '2000.00'})
+        form = ContratoForm(data=data, instance=Contrato.objects.get(pk=self.contrato.pk))
+        self.assertTrue(form.is_valid())
+        form.save()
+        self.assertConsumo(self.contrato, '300.00', '1700.00')
+
+    def test_reconcile_contratos(self):
+        """Verifica que el comando recalcule el consumo de todos los contratos a partir de sus facturas."""
+        FacturaClienteFactory.create(contrato=self.contrato, neto=Decimal('100.00'))
+        FacturaClienteFactory.create(contrato=self.contrato, neto=Decimal('150.00'))
+        sin_facturas = ContratoFactory.create(monto=Decimal('80.00'))
+        Contrato.objects.filter(pk=sin_facturas.pk).update(monto_consumido=Decimal('10.00'))
+
+        out = StringIO()
+        call_command('reconcile_contratos', stdout=out)
+        self.assertIn('Done', out.getvalue())
+        self.assertConsumo(self.contrato, '250.00', '750.00')
+        self.assertConsumo(sin_facturas, '0.00', '80.00')
+
+    def test_migracion_consumo(self):
+        """Verifica que la migración restituya el neto ya descontado del monto de los contratos existentes."""
+        FacturaClienteFactory.create(contrato=self.contrato, neto=Decimal('100.00'))
+        FacturaClienteFactory.create(contrato=self.contrato, neto=Decimal('150.00'))
+        Contrato.objects.filter(pk=self.contrato.pk).update(
+            monto=Decimal('750.00'), monto_consumido=Decimal('0.00'), monto_restante=Decimal('0.00')
+        )
+
+        migracion = import_module('sistemita.core.migrations.0030_contrato_consumo')
+        migracion.init_monto_consumido(apps, None)
+        self.assertConsumo(self.contrato, '250.00', '750.00')
+        self.assertEqual(self.contrato.monto, Decimal('1000.00'))
+
+        Contrato.objects.reconcile()
+        self.assertConsumo(self.contrato, '250.00', '750.00')
+
+
 class ContratoListViewTest(BaseTestCase):
     """Test sobre vista de listado."""
 
@@ -1,21 +1,31 @@
 """Factura de Cliente tests."""
 
 # Utils
+from datetime import timedelta
 from decimal import Decimal
+from importlib import import_module
+from io import BytesIO, StringIO
+
+import openpyxl
 
 # Django
+from django.apps import apps
 from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from faker import Faker
 
 # Sistemita
 from sistemita.core.forms.clientes import FacturaForm
-from sistemita.core.models import Factura, FacturaDistribuida
+from sistemita.core.models import Factura, FacturaDistribuida, FacturaImpuesto
 from sistemita.core.tests.factories import (
     FacturaClienteFactory,
     FacturaClienteFactoryData,
 )
 from sistemita.expense.models import Fondo
 from sistemita.utils.commons import round_decimals_up
+from sistemita.utils.export import export_csv
 from sistemita.utils.tests import BaseTestCase, prevent_request_warnings
 
 fake = Faker('es_ES')
@@ -46,6 +56,48 @@ class FacturaClienteModelTest(BaseTestCase):
         monto = round_decimals_up(float(factura.neto) * factura.porcentaje_fondo / 100, 2)
         self.assertEqual(self.instance.porcentaje_fondo_monto, monto)
 
+    def test_montos_con_impuestos(self):
+        """Valida que el neto sin impuestos y el monto a distribuir guardados sigan a los impuestos."""
+        factura = FacturaClienteFactory.create(
+            neto=Decimal('1000.00'), porcentaje_fondo=10, porcentaje_socio_alan=2, porcentaje_socio_ariel=3
+        )
+        self.assertEqual(factura.neto_sin_impuestos, Decimal('1000.00'))
+        self.assertEqual(factura.monto_a_distribuir, Decimal('850.00'))
+
+        impuesto = FacturaImpuesto.objects.create(factura=factura, detalle='IIBB', monto=Decimal('100.00'))
+        factura.refresh_from_db()
+        self.assertEqual(factura.neto_sin_impuestos, Decimal('900.00'))
+        self.assertEqual(factura.monto_a_distribuir, Decimal('765.00'))
+
+        impuesto.delete()
+        factura.refresh_from_db()
+        self.assertEqual(factura.monto_a_distribuir, Decimal('850.00'))
+
+    def test_verify_montos_facturas(self):
+        """Valida que el comando detecte y corrija los montos desactualizados."""
+        factura = FacturaClienteFactory.create(neto=Decimal('1000.00'))
+        Factura.objects.filter(pk=factura.pk).update(neto_sin_impuestos=0, monto_a_distribuir=0)
+        with self.assertRaises(CommandError):
+            call_command('verify_montos_facturas', stdout=StringIO())
+
+        call_command('verify_montos_facturas', fix=True, stdout=StringIO())
+        factura.refresh_from_db()
+        self.assertEqual(factura.neto_sin_impuestos, Decimal('1000.00'))
+        call_command('verify_montos_facturas', stdout=StringIO())
+
+    def test_migracion_montos(self):
+        """Valida que la migración calcule los montos de las facturas existentes con sus impuestos."""
+        factura = FacturaClienteFactory.create(
+            neto=Decimal('1000.00'), porcentaje_fondo=10, porcentaje_socio_alan=2, porcentaje_socio_ariel=3
+        )
+        FacturaImpuesto.objects.create(factura=factura, detalle='IIBB', monto=Decimal('100.00'))
+        Factura.objects.filter(pk=factura.pk).update(neto_sin_impuestos=0, monto_a_distribuir=0)
+
+        import_module('sistemita.core.migrations.0029_factura_montos').init_montos(apps, None)
+        factura.refresh_from_db()
+        self.assertEqual(factura.neto_sin_impuestos, Decimal('900.00'))
+        self.assertEqual(factura.monto_a_distribuir, Decimal('765.00'))
+
 
 class FacturaClienteListViewTest(BaseTestCase):
     """Test sobre vista de listado."""
@@ -96,6 +148,68 @@ class FacturaClienteListViewTest(BaseTestCase):
         response = self.client.get('/factura/')
         self.assertEqual(response.context['last_created'], Factura.objects.count())
 
+    def test_debt_summary_in_template(self):
+        """Verifica las tarjetas de deuda y los creados en la semana."""
+        FacturaClienteFactory.create(tipo='A', moneda='P', total=Decimal('100.00'), cobrado=False)
+        FacturaClienteFactory.create(tipo='NCA', moneda='P', total=Decimal('30.00'), cobrado=False)
+        FacturaClienteFactory.create(tipo='A', moneda='P', total=Decimal('50.00'), cobrado=True)
+        antigua = FacturaClienteFactory.create(tipo='B', moneda='D', total=Decimal('20.00'), cobrado=False)
+        Factura.objects.filter(pk=antigua.pk).update(creado=antigua.creado - timedelta(days=365))
+        self.create_superuser()
+        self.client.login(username='admin', password='admin123')  # login super user
+        response = self.client.get('/factura/')
+        self.assertEqual(response.context['last_created'], 3)
+        self.assertEqual(response.context['debt_in_peso'], {'total__sum': Decimal('70.00'), 'id__count': 1})
+        self.assertEqual(response.context['debt_in_dollar'], {'total__sum': Decimal('20.00'), 'id__count': 1})
+
+    def test_list_search(self):
+        """Verifica que la búsqueda devuelva las facturas que coinciden por número, razón social o cuit."""
+        instance = FacturaClienteFactory.create(numero='00012345')
+        FacturaClienteFactory.create(numero='00099999')
+        self.create_superuser()
+        self.client.login(username='admin', password='admin123')  # login super user
+
+        response = self.client.get('/factura/?search=1234')
+        self.assertQuerysetEqual(response.context['object_list'], [instance], transform=lambda x: x)
+
+        response = self.client.get(f'/factura/?search= {instance.cliente.razon_social.lower()} ')
+        self.assertIn(instance, response.context['object_list'])
+
+        response = self.client.get(f'/factura/?search={instance.cliente.cuit}')
+        self.assertQuerysetEqual(response.context['object_list'], [instance], transform=lambda x: x)
+
+    def test_list_keyset_pagination(self):
+        """Verifica que la paginación por cursor recorra todas las facturas sin repetir."""
+        FacturaClienteFactory.create_batch(25)
+        self.create_superuser()
+        self.client.login(username='admin', password='admin123')  # login super user
+
+        pages = []
+        response = self.client.get('/factura/')
+        self.assertFalse(response.context['page_obj'].has_previous())
+        pages.append(list(response.context['object_list']))
+        while response.context['page_obj'].has_next():
+            response = self.client.get(f"/factura/?{response.context['page_obj'].next_querystring}")
+            pages.append(list(response.context['object_list']))
+
+        self.assertEqual([len(page) for page in pages], [10, 10, 5])
+        facturas = [factura for page in pages for factura in page]
+        self.assertEqual(facturas, list(Factura.objects.order_by('-creado', '-pk')))
+        self.assertGreater(response.context['page_obj'].paginator.count, 0)  # puede ser una estimación
+
+        # Página anterior
+        response = self.client.get(f"/factura/?{response.context['page_obj'].previous_querystring}")
+        self.assertEqual(list(response.context['object_list']), pages[1])
+        self.assertTrue(response.context['page_obj'].has_next())
+
+    @prevent_request_warnings
+    def test_list_keyset_pagination_invalid_cursor(self):
+        """Verifica que un cursor inválido devuelva 404."""
+        self.create_superuser()
+        self.client.login(username='admin', password='admin123')  # login super user
+        response = self.client.get('/factura/?cursor=invalido')
+        self.assertEqual(response.status_code, 404)
+
     def test_list_empty(self):
         """Verifica un listado vacío cuando no hay instancias."""
         self.create_superuser()
@@ -149,6 +263,41 @@ class FacturaClienteListViewTest(BaseTestCase):
         )
         self.assertEqual(response.status_code, 200)
 
+    def test_list_export_data(self):
+        """Verifica que el excel se genere mientras se descarga, con una fila por factura y el total adeudado."""
+        facturas = FacturaClienteFactory.create_batch(3)
+        self.create_user(['list_factura'])
+        self.client.login(username='user', password='user12345')
+        response = self.client.get('/factura/?formato=xls')
+        self.assertTrue(response.streaming)
+        worksheet = openpyxl.load_workbook(BytesIO(b''.join(response.streaming_content))).active
+        rows = list(worksheet.values)
+        self.assertEqual(rows[0][:2], ('fecha', 'numero'))
+        self.assertEqual(sorted(row[1] for row in rows[1:4]), sorted(str(factura.numero) for factura in facturas))
+        self.assertEqual(rows[5][0], 'Total adeudado')
+
+    def test_list_export_queries(self):
+        """Verifica que la cantidad de consultas del excel no dependa de la cantidad de facturas."""
+        self.create_user(['list_factura'])
+        self.client.login(username='user', password='user12345')
+
+        def count_queries(limit):
+            FacturaClienteFactory.create_batch(limit)
+            with CaptureQueriesContext(connection) as context:
+                b''.join(self.client.get('/factura/?formato=xls').streaming_content)
+            return len(context.captured_queries)
+
+        self.assertEqual(count_queries(2), count_queries(10))
+
+    def test_export_csv(self):
+        """Verifica que el csv se genere fila por fila, con los encabezados primero."""
+        FacturaClienteFactory.create_batch(2)
+        response = export_csv(Factura.objects.all())
+        self.assertTrue(response.streaming)
+        rows = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(rows[0], 'fecha,numero,tipo,cliente,neto,iva,total,cobrado')
+        self.assertEqual(len(rows), 3)
+
 
 class FacturaClienteCreateViewTest(BaseTestCase):
     """Tests sobre la vista de crear."""
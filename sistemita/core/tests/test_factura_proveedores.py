@@ -8,6 +8,7 @@ from faker import Faker
 from sistemita.core.forms.proveedores import FacturaProveedorForm
 from sistemita.core.models import FacturaProveedor
 from sistemita.core.tests.factories import (
+    FacturaClienteFactory,
     FacturaDistribuidaProveedorFactory,
     FacturaProveedorFactory,
     FacturaProveedorFactoryData,
@@ -262,6 +263,18 @@ class FacturaProveedorCreateViewTest(BaseTestCase):
         form.save()
         self.assertEqual(form.instance.proveedor, factura_distribuida_proveedor.proveedor)
 
+    def test_form_update_estado_factura_anterior(self):
+        """Valida que al cambiar la factura de cliente se actualice el estado de la factura anterior."""
+        user = self.create_superuser()
+        anterior = FacturaClienteFactory.create(cobrado=True)
+        instance = FacturaProveedorFactory.create(factura=anterior)
+        self.data['factura'] = FacturaClienteFactory.create().pk
+        form = FacturaProveedorForm(data=self.data, instance=instance, user=user)
+        self.assertTrue(form.is_valid())
+        form.save()
+        anterior.refresh_from_db()
+        self.assertEqual(anterior.estado, 2)
+
 
 class FacturaProveedorDetailViewTest(BaseTestCase):
     """Test sobre la vista de detalle."""
@@ -0,0 +1,88 @@
+"""Test del análisis de índices de los listados."""
+
+from io import StringIO
+from unittest import skipIf, skipUnless
+
+# Django
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+
+# Sistemita
+from sistemita.accounting.tests.factories import CobranzaFactory, PagoFactory
+from sistemita.core.management.commands.index_advisor import (
+    capture_view_queries,
+)
+from sistemita.core.models.cliente import Factura
+from sistemita.core.tests.factories import (
+    ClienteFactory,
+    FacturaClienteFactory,
+    FacturaProveedorFactory,
+    ProveedorFactory,
+)
+from sistemita.expense.tests.factories import FondoFactory
+from sistemita.utils.explain import explain_analyze, get_seq_scans
+from sistemita.utils.search import search_queryset
+from sistemita.utils.tests import BaseTestCase
+
+POSTGRESQL = connection.vendor == 'postgresql'
+
+
+def setUpModule():
+    """Agrega permisos a utilizar por los test."""
+    call_command('add_permissions', verbosity=0)
+
+
+class IndexAdvisorTest(BaseTestCase):
+    """Test sobre el comando index_advisor."""
+
+    def setUp(self):
+        """Genera datos en las tablas de los listados."""
+        super().setUp()
+        self.user = self.create_superuser()
+        # Se comparten cliente y proveedor para no repetir correos únicos generados al azar
+        cliente = ClienteFactory.create()
+        proveedor = ProveedorFactory.create()
+        facturas = FacturaClienteFactory.create_batch(20, cliente=cliente)
+        FacturaProveedorFactory.create_batch(20, proveedor=proveedor, factura=facturas[0])
+        for factura in facturas[:10]:
+            FondoFactory.create(factura=factura)
+        PagoFactory.create_batch(10, proveedor=proveedor)
+        CobranzaFactory.create_batch(10, cliente=cliente)
+
+    def test_capture_view_queries(self):
+        """Verifica que se capturen las consultas de los listados."""
+        queries = capture_view_queries(self.user)
+        views = {name for name, _ in queries}
+        self.assertIn('core:factura-list', views)
+        self.assertIn('accounting:pago-list', views)
+        self.assertTrue(all(sql.lstrip().upper().startswith('SELECT') for _, sql in queries))
+
+    @skipIf(POSTGRESQL, 'Solo aplica a bases distintas de PostgreSQL')
+    def test_requires_postgresql(self):
+        """Verifica que el comando requiera PostgreSQL."""
+        with self.assertRaises(CommandError):
+            call_command('index_advisor', stdout=StringIO())
+
+    @skipUnless(POSTGRESQL, 'Requiere PostgreSQL')
+    def test_hot_queries_without_seq_scan(self):
+        """Verifica que las consultas de los listados no escaneen tablas completas."""
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        out = StringIO()
+        call_command('index_advisor', no_seqscan=True, fail=True, stdout=out)
+        self.assertIn('0 escaneos secuenciales', out.getvalue())
+
+    @skipUnless(POSTGRESQL, 'Requiere PostgreSQL')
+    def test_search_uses_trigram_indexes(self):
+        """Verifica que la búsqueda de los listados use los índices de trigramas."""
+        queryset = search_queryset(Factura.objects.all(), 'abc', ['numero', 'cliente__razon_social', 'cliente__cuit'])
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+            cursor.execute('SET enable_seqscan = off')
+            try:
+                plan = explain_analyze(sql, params)
+            finally:
+                cursor.execute('RESET enable_seqscan')
+        self.assertEqual(get_seq_scans(plan, {'core_factura', 'core_cliente'}), [])
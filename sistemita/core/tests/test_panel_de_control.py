@@ -1,10 +1,20 @@
 """Test panel de control."""
 
+from io import StringIO
+from types import SimpleNamespace
+
 # Django
+from django.core.cache import cache
 from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from faker import Faker
 
 # Sistemita
+from sistemita.core.management.commands.benchmark_panel import (
+    get_all_groups_to_panel_legacy,
+)
+from sistemita.core.models.cliente import Factura
 from sistemita.core.tests.factories import (
     ContratoFactory,
     FacturaClienteFactory,
@@ -13,6 +23,7 @@ from sistemita.core.tests.factories import (
     FacturaProveedorFactory,
     ProveedorFactory,
 )
+from sistemita.utils.commons import get_groups_to_panel
 from sistemita.utils.tests import (
     BaseTestCase,
     prevent_request_warnings,
@@ -89,8 +100,8 @@ class PanelDeControlTemplateViewTest(BaseTestCase):
         FacturaDistribuidaProveedorFactory.create(
             factura_distribucion=factura_distribuida, proveedor=proveedor, factura_proveedor=factura_proveedor
         )
+        Factura.objects.filter(pk=factura.pk).update_status()
         response = self.client.get('/paneldecontrol/')
-        factura.refresh_from_db()
         self.assertEqual(response.context['groups'][0][1].status, 2)
         self.assertEqual(response.status_code, 200)
         self.assertTemplateUsed(response, template_name='core/panel_de_control.html')
@@ -107,7 +118,7 @@ class PanelDeControlTemplateViewTest(BaseTestCase):
         FacturaDistribuidaProveedorFactory.create(
             factura_distribucion=factura_distribuida, proveedor=proveedor, factura_proveedor=factura_proveedor
         )
-        factura.refresh_from_db()
+        Factura.objects.filter(pk=factura.pk).update_status()
         response = self.client.get('/paneldecontrol/')
         self.assertEqual(response.context['groups'][0][2].status, 3)
         self.assertEqual(response.status_code, 200)
@@ -125,8 +136,141 @@ class PanelDeControlTemplateViewTest(BaseTestCase):
         FacturaDistribuidaProveedorFactory.create(
             factura_distribucion=factura_distribuida, proveedor=proveedor, factura_proveedor=factura_proveedor
         )
-        factura.refresh_from_db()
+        Factura.objects.filter(pk=factura.pk).update_status()
         response = self.client.get('/paneldecontrol/')
         self.assertEqual(response.context['groups'][0][3].status, 4)
         self.assertEqual(response.status_code, 200)
         self.assertTemplateUsed(response, template_name='core/panel_de_control.html')
+
+    def test_list_cards_fixed_queries(self):
+        """Verifica que la cantidad de consultas del panel no dependa de la cantidad de facturas."""
+        email = 'user@sistem.io'
+        self.create_user(['view_paneldecontrol'], email=email)
+        self.client.login(username='user', password='user12345', email=email)
+        proveedor = ProveedorFactory.create(correo=email)
+
+        def create_factura():
+            factura = FacturaClienteFactory.create(proveedores=[proveedor], cobrado=False)
+            factura_distribuida = FacturaDistribuidaFactory.create(factura=factura, distribuida=True)
+            factura_proveedor = FacturaProveedorFactory(proveedor=proveedor, factura=factura)
+            FacturaDistribuidaProveedorFactory.create(
+                factura_distribucion=factura_distribuida, proveedor=proveedor, factura_proveedor=factura_proveedor
+            )
+
+        create_factura()
+        with CaptureQueriesContext(connection) as context:
+            self.client.get('/paneldecontrol/')
+        queries = len(context)
+
+        for _ in range(0, rand_range(3, 6)):
+            create_factura()
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get('/paneldecontrol/')
+        self.assertEqual(len(context), queries)
+        self.assertEqual(response.status_code, 200)
+
+    def test_list_cards_cache(self):
+        """Verifica que el panel se guarde en caché y se invalide al modificar las facturas."""
+        email = 'user@sistem.io'
+        self.create_user(['view_paneldecontrol'], email=email)
+        self.client.login(username='user', password='user12345', email=email)
+        proveedor = ProveedorFactory.create(correo=email)
+        factura = FacturaClienteFactory.create(proveedores=[proveedor], cobrado=False)
+        FacturaDistribuidaFactory.create(factura=factura)
+        response = self.client.get('/paneldecontrol/')
+        self.assertEqual(response.context['groups'][0][0].status, 1)
+
+        # Sin invalidar se usa el panel guardado
+        Factura.objects.filter(pk=factura.pk).update(cobrado=True)
+        response = self.client.get('/paneldecontrol/')
+        self.assertEqual(response.context['groups'][0][0].status, 1)
+
+        Factura.objects.filter(pk=factura.pk).update_status()
+        response = self.client.get('/paneldecontrol/')
+        self.assertEqual(response.context['groups'][0][1].status, 2)
+        self.assertEqual(response.status_code, 200)
+
+    def test_list_contratos_cache(self):
+        """Verifica que al modificar un contrato se invalide el panel de sus proveedores."""
+        email = 'user@sistem.io'
+        self.create_user(['view_paneldecontrol'], email=email)
+        self.client.login(username='user', password='user12345', email=email)
+        proveedor = ProveedorFactory.create(correo=email)
+        contrato = ContratoFactory.create(proveedores=[proveedor])
+        response = self.client.get('/paneldecontrol/')
+        self.assertEqual(len(response.context['contratos']), 1)
+
+        self.client.logout()
+        self.create_superuser()
+        self.client.login(username='admin', password='admin123')
+        self.client.post(f'/contrato/{contrato.pk}/eliminar/')
+
+        self.client.login(username='user', password='user12345', email=email)
+        response = self.client.get('/paneldecontrol/')
+        self.assertEqual(len(response.context['contratos']), 0)
+
+
+class EstadoFacturaTest(BaseTestCase):
+    """Test sobre el estado guardado de las facturas de cliente."""
+
+    def test_load_estado_facturas(self):
+        """Verifica que el comando calcule el mismo estado que la propiedad status."""
+        proveedor = ProveedorFactory.create()
+        enviada = FacturaClienteFactory.create(cobrado=False)
+        FacturaDistribuidaFactory.create(factura=enviada)
+        cobrada = FacturaClienteFactory.create(cobrado=True)
+        FacturaDistribuidaFactory.create(factura=cobrada)
+        for cobrado in (False, True):
+            factura = FacturaClienteFactory.create(cobrado=cobrado)
+            factura_distribuida = FacturaDistribuidaFactory.create(factura=factura, distribuida=True)
+            factura_proveedor = FacturaProveedorFactory(proveedor=proveedor, factura=factura, cobrado=cobrado)
+            FacturaDistribuidaProveedorFactory.create(
+                factura_distribucion=factura_distribuida, proveedor=proveedor, factura_proveedor=factura_proveedor
+            )
+
+        call_command('load_estado_facturas', stdout=StringIO())
+        estados = []
+        for factura in Factura.objects.order_by('pk'):
+            self.assertEqual(factura.estado, factura.status)
+            estados.append(factura.estado)
+        self.assertEqual(estados, [1, 2, 3, 4])
+
+    def test_panel_estado_guardado(self):
+        """Verifica que el panel use el estado guardado de las facturas."""
+        proveedor = ProveedorFactory.create()
+        factura = FacturaClienteFactory.create(proveedores=[proveedor], cobrado=True)
+        FacturaDistribuidaFactory.create(factura=factura)
+        self.assertEqual([factura.status for factura in Factura.objects.panel(proveedor.pk)], [1])
+
+        Factura.objects.filter(pk=factura.pk).update_status()
+        self.assertEqual([factura.status for factura in Factura.objects.panel(proveedor.pk)], [2])
+
+
+class GroupsToPanelTest(BaseTestCase):
+    """Test sobre la agrupación de facturas del panel."""
+
+    def test_groups_to_panel(self):
+        """Verifica que cada fila tome la siguiente factura de cada estado."""
+        facturas = [SimpleNamespace(pk=pk, status=status) for pk, status in enumerate([1, 1, 2, 4, 1, 4])]
+        groups = get_groups_to_panel(facturas)
+        self.assertEqual(
+            groups,
+            [
+                [facturas[0], facturas[2], 0, facturas[3]],
+                [facturas[1], 0, 0, facturas[5]],
+                [facturas[4], 0, 0, 0],
+            ],
+        )
+        self.assertEqual(get_groups_to_panel([]), [])
+
+    def test_groups_to_panel_legacy(self):
+        """Verifica que la agrupación coincida con el algoritmo anterior."""
+        facturas = [SimpleNamespace(pk=pk, status=fake.random_int(1, 4)) for pk in range(rand_range(50, 200))]
+        self.assertEqual(get_groups_to_panel(facturas), get_all_groups_to_panel_legacy(facturas))
+
+    def test_benchmark_panel(self):
+        """Verifica el comando de comparación de algoritmos."""
+        out = StringIO()
+        call_command('benchmark_panel', sizes=[10, 100], stdout=out)
+        self.assertIn('Done', out.getvalue())
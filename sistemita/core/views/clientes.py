@@ -1,8 +1,5 @@
 """Vistas del modelo Cliente."""
 
-# Datetime
-from datetime import date
-
 # Django
 from django.contrib import messages
 from django.contrib.auth.mixins import PermissionRequiredMixin
@@ -25,6 +22,7 @@ from sistemita.utils.strings import (
     MESSAGE_SUCCESS_DELETE,
     MESSAGE_SUCCESS_UPDATE,
 )
+from sistemita.utils.summary import created_this_week
 
 
 class ClienteListView(PermissionRequiredMixin, SuccessMessageMixin, ListView):
@@ -56,9 +54,7 @@ class ClienteListView(PermissionRequiredMixin, SuccessMessageMixin, ListView):
         """Obtiene datos para incluir en los reportes."""
         context = super().get_context_data(**kwargs)
         queryset = self.get_queryset()
-        current_week = date.today().isocalendar()[1]
-
-        context['last_created'] = queryset.filter(creado__week=current_week).count()
+        context['last_created'] = queryset.filter(created_this_week()).count()
 
         return context
 
@@ -1,8 +1,5 @@
 """Vistas del modelo Contrato."""
 
-# Datetime
-from datetime import date
-
 # Django
 from django.contrib import messages
 from django.contrib.auth.mixins import PermissionRequiredMixin
@@ -20,6 +17,7 @@ from sistemita.core.filters import ContratoFilterSet
 from sistemita.core.forms.clientes import ContratoForm
 from sistemita.core.models.cliente import Contrato
 from sistemita.core.views.home import error_403
+from sistemita.utils.cache import invalidate_panel_cache
 from sistemita.utils.commons import get_deleted_objects
 from sistemita.utils.strings import (
     MESSAGE_403,
@@ -27,6 +25,7 @@ from sistemita.utils.strings import (
     MESSAGE_SUCCESS_DELETE,
     MESSAGE_SUCCESS_UPDATE,
 )
+from sistemita.utils.summary import created_this_week
 
 
 class ContratoListView(PermissionRequiredMixin, SuccessMessageMixin, FilterView):
@@ -61,9 +60,7 @@ class ContratoListView(PermissionRequiredMixin, SuccessMessageMixin, FilterView)
         """Obtiene datos para incluir en los reportes."""
         context = super().get_context_data(**kwargs)
         queryset = self.get_queryset()
-        current_week = date.today().isocalendar()[1]
-
-        context['last_created'] = queryset.filter(creado__week=current_week).count()
+        context['last_created'] = queryset.filter(created_this_week()).count()
 
         return context
 
@@ -155,6 +152,7 @@ class ContratoDeleteView(PermissionRequiredMixin, DeleteView):
 
     def delete(self, request, *args, **kwargs):
         """Muestra un mensaje sobre el resultado de la acción."""
+        invalidate_panel_cache(self.get_object().proveedores.values_list('pk', flat=True))
         messages.success(request, self.success_message)
         return super().delete(request, *args, **kwargs)
 
@@ -1,14 +1,10 @@
 """Vistas del modelo FacturaDistribuida de clientes."""
 
-# Datetime
-from datetime import date
-
 # Django
 from django.contrib import messages
 from django.contrib.auth.mixins import PermissionRequiredMixin
 from django.contrib.messages.views import SuccessMessageMixin
 from django.core.exceptions import FieldError
-from django.db.models import Q
 from django.http import HttpResponseRedirect
 from django.shortcuts import redirect
 from django.urls import reverse_lazy
@@ -17,11 +13,13 @@ from django.views.generic.edit import DeleteView
 from django_filters.views import FilterView
 
 # Sistemita
-from sistemita.core.models.cliente import FacturaDistribuida
+from sistemita.core.models.cliente import Factura, FacturaDistribuida
 from sistemita.core.models.proveedor import Proveedor
 from sistemita.core.views.home import error_403
 from sistemita.utils.commons import get_deleted_objects
+from sistemita.utils.search import search_queryset
 from sistemita.utils.strings import _MESSAGE_SUCCESS_DELETE, MESSAGE_403
+from sistemita.utils.summary import created_this_week
 
 
 class FacturaDistribuidaListView(PermissionRequiredMixin, SuccessMessageMixin, FilterView):
@@ -31,6 +29,7 @@ class FacturaDistribuidaListView(PermissionRequiredMixin, SuccessMessageMixin, F
     paginate_by = 10
     permission_required = 'core.list_facturadistribuida'
     raise_exception = True
+    search_fields = ['factura__numero', 'factura__cliente__razon_social', 'factura__cliente__cuit']
     template_name = 'core/facturadistribuida_list.html'
 
     def get_queryset(self):
@@ -49,12 +48,7 @@ class FacturaDistribuidaListView(PermissionRequiredMixin, SuccessMessageMixin, F
         order_by = self.request.GET.get('order_by', None)
         try:
             if search:
-                search = search.strip()
-                queryset = queryset.filter(
-                    Q(factura__numero__icontains=search)
-                    | Q(factura__cliente__razon_social__icontains=search)
-                    | Q(factura__cliente__cuit__icontains=search)
-                )
+                queryset = search_queryset(queryset, search, self.search_fields)
             if order_by:
                 queryset = queryset.order_by(order_by)
         except FieldError:
@@ -65,8 +59,7 @@ class FacturaDistribuidaListView(PermissionRequiredMixin, SuccessMessageMixin, F
         """Obtiene datos para incluir en los reportes."""
         context = super().get_context_data(**kwargs)
         queryset = self.get_queryset()
-        current_week = date.today().isocalendar()[1]
-        context['last_created'] = queryset.filter(creado__week=current_week).count()
+        context['last_created'] = queryset.filter(created_this_week()).count()
 
         return context
 
@@ -147,6 +140,7 @@ class FacturaDistribuidaDeleteView(PermissionRequiredMixin, DeleteView):
         self.object.monto_distribuido = 0
         self.object.save()
         self.object.factura_distribuida_proveedores.all().delete()
+        Factura.objects.filter(pk=self.object.factura_id).update_status()
 
         success_url = self.get_success_url()
         messages.success(request, self.success_message)
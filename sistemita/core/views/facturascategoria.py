@@ -1,8 +1,5 @@
 """Vistas del modelo FacturaCategoria."""
 
-# Datetime
-from datetime import date
-
 # Django
 from django.contrib import messages
 from django.contrib.auth.mixins import PermissionRequiredMixin
@@ -24,6 +21,7 @@ from sistemita.utils.strings import (
     _MESSAGE_SUCCESS_UPDATE,
     MESSAGE_403,
 )
+from sistemita.utils.summary import created_this_week
 
 
 class FacturaCategoriaListView(PermissionRequiredMixin, SuccessMessageMixin, ListView):
@@ -54,9 +52,7 @@ class FacturaCategoriaListView(PermissionRequiredMixin, SuccessMessageMixin, Lis
         """Obtiene datos para incluir en los reportes."""
         context = super().get_context_data(**kwargs)
         queryset = self.get_queryset()
-        current_week = date.today().isocalendar()[1]
-
-        context['last_created'] = queryset.filter(creado__week=current_week).count()
+        context['last_created'] = queryset.filter(created_this_week()).count()
 
         return context
 
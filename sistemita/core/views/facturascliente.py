@@ -2,15 +2,11 @@
 
 El modelo Factura está asociado al modelo cliente.
 """
-# Datetime
-from datetime import date
-
 # Django
 from django.contrib import messages
 from django.contrib.auth.mixins import PermissionRequiredMixin
 from django.contrib.messages.views import SuccessMessageMixin
 from django.core.exceptions import FieldError
-from django.db.models import Count, Q, Sum
 from django.http import HttpResponseRedirect
 from django.shortcuts import redirect
 from django.urls import reverse, reverse_lazy
@@ -20,28 +16,34 @@ from django_filters.views import FilterView
 
 # Sistemita
 from sistemita.accounting.models.cobranza import Cobranza, CobranzaFactura
+from sistemita.accounting.models.cuentacorriente import MovimientoCliente
 from sistemita.core.constants import TIPOS_FACTURA_IMPORT
 from sistemita.core.filters import FacturaFilterSet
 from sistemita.core.forms.clientes import FacturaForm
-from sistemita.core.models.cliente import Factura
+from sistemita.core.models.cliente import Contrato, Factura
 from sistemita.core.views.home import error_403
+from sistemita.utils.cache import invalidate_panel_cache
 from sistemita.utils.commons import get_deleted_objects
 from sistemita.utils.export import export_excel
+from sistemita.utils.pagination import KeysetPaginationMixin
+from sistemita.utils.search import search_queryset
 from sistemita.utils.strings import (
     _MESSAGE_SUCCESS_CREATED,
     _MESSAGE_SUCCESS_DELETE,
     _MESSAGE_SUCCESS_UPDATE,
     MESSAGE_403,
 )
+from sistemita.utils.summary import get_debt_summary
 
 
-class FacturaListView(PermissionRequiredMixin, SuccessMessageMixin, FilterView):
+class FacturaListView(PermissionRequiredMixin, SuccessMessageMixin, KeysetPaginationMixin, FilterView):
     """Vista que muestra un listado de facturas."""
 
     filterset_class = FacturaFilterSet
     paginate_by = 10
     permission_required = 'core.list_factura'
     raise_exception = True
+    search_fields = ['numero', 'cliente__razon_social', 'cliente__cuit']
     template_name = 'core/facturacliente_list.html'
 
     def get(self, request, *args, **kwargs):
@@ -62,11 +64,7 @@ class FacturaListView(PermissionRequiredMixin, SuccessMessageMixin, FilterView):
         order_by = self.request.GET.get('order_by', None)
         try:
             if search:
-                queryset = queryset.filter(
-                    Q(numero__icontains=search)
-                    | Q(cliente__razon_social__icontains=search)
-                    | Q(cliente__cuit__icontains=search)
-                )
+                queryset = search_queryset(queryset, search, self.search_fields)
             if order_by:
                 queryset = queryset.order_by(order_by)
         except FieldError:
@@ -77,36 +75,7 @@ class FacturaListView(PermissionRequiredMixin, SuccessMessageMixin, FilterView):
         """Obtiene datos para incluir en los reportes."""
         context = super().get_context_data(**kwargs)
         queryset = self.get_queryset()
-        current_week = date.today().isocalendar()[1]
-
-        # dollar
-        nc_dollar = queryset.filter(cobrado=False, moneda='D', tipo__startswith='NC').aggregate(Sum('total'))
-        nc_dollar_total = nc_dollar.get('total__sum') if nc_dollar.get('total__sum') else 0
-        factura_dollar = (
-            queryset.filter(cobrado=False, moneda='D')
-            .exclude(tipo__startswith='NC')
-            .aggregate(Sum('total'), Count('id'))
-        )
-        factura_dollar_total = factura_dollar.get('total__sum') if factura_dollar.get('total__sum') else 0
-        context['debt_in_dollar'] = {
-            'total__sum': factura_dollar_total - nc_dollar_total,
-            'id__count': factura_dollar.get('id__count'),
-        }
-
-        # peso
-        nc_peso = queryset.filter(cobrado=False, moneda='P', tipo__startswith='NC').aggregate(Sum('total'))
-        nc_peso_total = nc_peso.get('total__sum') if nc_peso.get('total__sum') else 0
-        factura_peso = (
-            queryset.filter(cobrado=False, moneda='P')
-            .exclude(tipo__startswith='NC')
-            .aggregate(Sum('total'), Count('id'))
-        )
-        factura_peso_total = factura_peso.get('total__sum') if factura_peso.get('total__sum') else 0
-        context['debt_in_peso'] = {
-            'total__sum': factura_peso_total - nc_peso_total,
-            'id__count': factura_peso.get('id__count'),
-        }
-        context['last_created'] = queryset.filter(creado__week=current_week).count()
+        context.update(get_debt_summary(queryset, 'cobrado'))
 
         return context
 
@@ -225,6 +194,16 @@ class FacturaDeleteView(PermissionRequiredMixin, DeleteView):
             if count == 1:
                 Cobranza.objects.get(pk=cobranza_factura.cobranza.pk).delete()
 
+        invalidate_panel_cache(self.object.proveedores.values_list('pk', flat=True))
+
+        # La factura deja de aportar saldo a la cuenta corriente
+        MovimientoCliente.objects.registrar([self.object], concepto='anulacion', anular=True)
+
+        # La factura deja de consumir el monto del contrato
+        if self.object.contrato_id:
+            Contrato.objects.registrar_consumo(anterior=(self.object.contrato_id, self.object.neto))
+            invalidate_panel_cache(self.object.contrato.proveedores.values_list('pk', flat=True))
+
         # Elimino los archivos asociados
         self.object.archivos.all().delete()
         self.object.delete()
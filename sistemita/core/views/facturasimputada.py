@@ -12,8 +12,9 @@ from django.views.generic.edit import DeleteView
 from django_filters.views import FilterView
 
 # Sistemita
+from sistemita.accounting.models.cuentacorriente import MovimientoCliente
 from sistemita.core.filters import FacturaImputadaFilterSet
-from sistemita.core.models.cliente import FacturaImputada
+from sistemita.core.models.cliente import Factura, FacturaImputada
 from sistemita.core.views.home import error_403
 from sistemita.utils.commons import get_deleted_objects
 from sistemita.utils.strings import _MESSAGE_SUCCESS_DELETE, MESSAGE_403
@@ -115,6 +116,8 @@ class FacturaImputadaDeleteView(PermissionRequiredMixin, DeleteView):
             factura.monto_imputado = 0
             factura.cobrado = False
             factura.save()
+        Factura.objects.filter(pk__in=[factura.pk for factura in facturas]).update_status()
+        MovimientoCliente.objects.registrar([*facturas, nota_de_credito], concepto='imputacion')
 
         self.object.delete()
         success_url = self.get_success_url()
@@ -4,14 +4,14 @@
 import os
 
 # Datetime
-from datetime import date, datetime
+from datetime import datetime
 
 # Django
 from django.contrib import messages
 from django.contrib.auth.mixins import PermissionRequiredMixin
 from django.contrib.messages.views import SuccessMessageMixin
 from django.core.exceptions import FieldError
-from django.db.models import Count, Q, Sum
+from django.db.models import Q
 from django.http import HttpResponseRedirect
 from django.shortcuts import get_object_or_404, redirect
 from django.urls import reverse, reverse_lazy
@@ -20,6 +20,7 @@ from django.views.generic.edit import CreateView, UpdateView
 from django_filters.views import FilterView
 
 # Sistemita
+from sistemita.accounting.models.cuentacorriente import MovimientoProveedor
 from sistemita.core.constants import TIPOS_FACTURA_IMPORT
 from sistemita.core.filters import FacturaProveedorFilterSet
 from sistemita.core.forms.proveedores import FacturaProveedorForm
@@ -31,21 +32,25 @@ from sistemita.core.models.proveedor import (
 from sistemita.core.views.home import error_403
 from sistemita.utils.commons import get_deleted_objects
 from sistemita.utils.export import export_excel, export_retenciones_to_zip
+from sistemita.utils.pagination import KeysetPaginationMixin
+from sistemita.utils.search import search_queryset
 from sistemita.utils.strings import (
     _MESSAGE_SUCCESS_CREATED,
     _MESSAGE_SUCCESS_DELETE,
     _MESSAGE_SUCCESS_UPDATE,
     MESSAGE_403,
 )
+from sistemita.utils.summary import get_debt_summary
 
 
-class FacturaProveedorListView(PermissionRequiredMixin, SuccessMessageMixin, FilterView):
+class FacturaProveedorListView(PermissionRequiredMixin, SuccessMessageMixin, KeysetPaginationMixin, FilterView):
     """Vista que retorna un lista de facturas a proveedores."""
 
     filterset_class = FacturaProveedorFilterSet
     paginate_by = 10
     permission_required = 'core.list_facturaproveedor'
     raise_exception = True
+    search_fields = ['=numero', 'proveedor__razon_social', 'proveedor__cuit']
     template_name = 'core/facturaproveedor_list.html'
 
     def get(self, request, *args, **kwargs):
@@ -67,11 +72,7 @@ class FacturaProveedorListView(PermissionRequiredMixin, SuccessMessageMixin, Fil
         order_by = self.request.GET.get('order_by', None)
         try:
             if search:
-                queryset = queryset.filter(
-                    Q(numero=search)
-                    | Q(proveedor__razon_social__icontains=search)
-                    | Q(proveedor__cuit__icontains=search)
-                )
+                queryset = search_queryset(queryset, search, self.search_fields)
             if order_by:
                 queryset = queryset.order_by(order_by)
         except FieldError:
@@ -82,36 +83,7 @@ class FacturaProveedorListView(PermissionRequiredMixin, SuccessMessageMixin, Fil
         """Obtiene datos para incluir en los reportes."""
         context = super().get_context_data(**kwargs)
         queryset = self.get_queryset()
-        current_week = date.today().isocalendar()[1]
-
-        # dollar
-        nc_dollar = queryset.filter(cobrado=False, moneda='D', tipo__startswith='NC').aggregate(Sum('total'))
-        nc_dollar_total = nc_dollar.get('total__sum') if nc_dollar.get('total__sum') else 0
-        factura_dollar = (
-            queryset.filter(cobrado=False, moneda='D')
-            .exclude(tipo__startswith='NC')
-            .aggregate(Sum('total'), Count('id'))
-        )
-        factura_dollar_total = factura_dollar.get('total__sum') if factura_dollar.get('total__sum') else 0
-        context['debt_in_dollar'] = {
-            'total__sum': factura_dollar_total - nc_dollar_total,
-            'id__count': factura_dollar.get('id__count'),
-        }
-
-        # peso
-        nc_peso = queryset.filter(cobrado=False, moneda='P', tipo__startswith='NC').aggregate(Sum('total'))
-        nc_peso_total = nc_peso.get('total__sum') if nc_peso.get('total__sum') else 0
-        factura_peso = (
-            queryset.filter(cobrado=False, moneda='P')
-            .exclude(tipo__startswith='NC')
-            .aggregate(Sum('total'), Count('id'))
-        )
-        factura_peso_total = factura_peso.get('total__sum') if factura_peso.get('total__sum') else 0
-        context['debt_in_peso'] = {
-            'total__sum': factura_peso_total - nc_peso_total,
-            'id__count': factura_peso.get('id__count'),
-        }
-        context['last_created'] = queryset.filter(creado__week=current_week).count()
+        context.update(get_debt_summary(queryset, 'cobrado'))
         return context
 
     def handle_no_permission(self):
@@ -215,6 +187,8 @@ class FacturaProveedorDeleteView(PermissionRequiredMixin, DeleteView):
     def delete(self, request, *args, **kwargs):
         """Método que elimina los archivos relacionados."""
         self.object = self.get_object()
+        # La factura deja de aportar saldo a la cuenta corriente
+        MovimientoProveedor.objects.registrar([self.object], concepto='anulacion', anular=True)
         self.object.archivos.all().delete()
         self.object.delete()
         messages.success(request, self.success_message)
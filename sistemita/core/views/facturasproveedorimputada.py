@@ -12,7 +12,9 @@ from django.views.generic.edit import DeleteView
 from django_filters.views import FilterView
 
 # Sistemita
+from sistemita.accounting.models.cuentacorriente import MovimientoProveedor
 from sistemita.core.filters import FacturaProveedorImputadaFilterSet
+from sistemita.core.models.cliente import Factura
 from sistemita.core.models.proveedor import FacturaProveedorImputada
 from sistemita.core.views.home import error_403
 from sistemita.utils.commons import get_deleted_objects
@@ -115,6 +117,8 @@ class FacturaProveedorImputadaDeleteView(PermissionRequiredMixin, DeleteView):
             factura.monto_imputado = 0
             factura.cobrado = False
             factura.save()
+        Factura.objects.filter_by_facturas_proveedor([factura.pk for factura in facturas]).update_status()
+        MovimientoProveedor.objects.registrar([*facturas, nota_de_credito], concepto='imputacion')
 
         self.object.delete()
         success_url = self.get_success_url()
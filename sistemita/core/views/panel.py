@@ -8,6 +8,7 @@ from django.contrib.auth.mixins import (
     PermissionRequiredMixin,
 )
 from django.contrib.messages.views import SuccessMessageMixin
+from django.core.cache import cache
 from django.shortcuts import redirect
 from django.views.generic import TemplateView
 
@@ -15,6 +16,7 @@ from django.views.generic import TemplateView
 from sistemita.core.models.cliente import Contrato, Factura
 from sistemita.core.models.proveedor import Proveedor
 from sistemita.core.views.home import error_403
+from sistemita.utils.cache import PANEL_CACHE_TIMEOUT, get_panel_cache_key
 from sistemita.utils.commons import get_groups_to_panel
 from sistemita.utils.strings import MESSAGE_403
 
@@ -32,6 +34,30 @@ class PanelDeControlTemplateView(LoginRequiredMixin, PermissionRequiredMixin, Su
             return error_403(self.request, MESSAGE_403)
         return redirect('login')
 
+    def get_panel_data(self, proveedor_id, filter_days):
+        """
+        Retorna los contratos y las tarjetas del panel de un proveedor.
+        Se guardan en caché por proveedor y fecha de corte hasta que se modifiquen sus datos.
+        """
+        key = get_panel_cache_key(proveedor_id, filter_days)
+        data = cache.get(key)
+        if data is None:
+            data = {
+                'contratos': list(
+                    Contrato.objects.filter(proveedores__in=[proveedor_id], monto_restante__gt=0).values(
+                        'cliente__razon_social', 'detalle', 'moneda', 'monto_restante'
+                    )
+                )
+            }
+
+            # Define cards para el panel
+            groups = get_groups_to_panel(Factura.objects.panel(proveedor_id, desde=filter_days))
+            if groups:
+                data['groups'] = groups
+
+            cache.set(key, data, PANEL_CACHE_TIMEOUT)
+        return data
+
     def render_to_response(self, context, **response_kwargs):
         """
         Return a response, using the `response_class` for this view, with a
@@ -43,13 +69,6 @@ class PanelDeControlTemplateView(LoginRequiredMixin, PermissionRequiredMixin, Su
 
         if proveedor:
             proveedor_id = proveedor.first().get('id')
-            context['contratos'] = Contrato.objects.filter(proveedores__in=[proveedor_id], monto__gt=0).values(
-                'cliente__razon_social', 'detalle', 'moneda', 'monto'
-            )
-            filtered_facturas = []
-
-            # Define cards para el panel
-            facturas = sorted(Factura.objects.filter(proveedores__in=[proveedor_id]), key=lambda f: f.status)
 
             filter_days = None
             if not self.request.GET.get('hasta'):
@@ -64,19 +83,7 @@ class PanelDeControlTemplateView(LoginRequiredMixin, PermissionRequiredMixin, Su
                 except ValueError:
                     filter_days = date.today() - timedelta(days=90)
 
-            for factura in facturas:
-                if filter_days:
-                    if factura.fecha < filter_days and factura.status == 4:
-                        continue
-                filtered_facturas.append(factura)
-
-            groups = []
-            while len(filtered_facturas):
-                filtered_facturas, sub_group = get_groups_to_panel(filtered_facturas)
-                if sub_group:
-                    groups.append(sub_group)
-
-                context['groups'] = groups
+            context.update(self.get_panel_data(proveedor_id, filter_days))
 
         response_kwargs.setdefault('content_type', self.content_type)
         return self.response_class(
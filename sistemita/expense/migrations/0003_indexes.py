@@ -0,0 +1,21 @@
+# Generated by Django 3.2 on 2026-10-18 03:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expense', '0002_change_meta_options'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='fondo',
+            index=models.Index(condition=models.Q(('disponible', True)), fields=['moneda'], name='fondo_disponible_moneda_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fondo',
+            index=models.Index(fields=['-creado'], name='fondo_creado_idx'),
+        ),
+    ]
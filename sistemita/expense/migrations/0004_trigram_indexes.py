@@ -0,0 +1,32 @@
+# Generated by Django 3.2 on 2026-10-18 04:30
+
+from django.db import migrations
+
+
+def create_trigram_indexes(apps, schema_editor):
+    """Crea el índice GIN de trigramas de la descripción de costos, solo en PostgreSQL."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS expense_costos_descripcion_trgm '
+        'ON expense_costos USING gin (UPPER(descripcion) gin_trgm_ops)'
+    )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    """Elimina el índice GIN de trigramas."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS expense_costos_descripcion_trgm')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0028_trigram_indexes'),
+        ('expense', '0003_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
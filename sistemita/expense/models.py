@@ -39,6 +39,10 @@ class Fondo(TimeStampedModel):
 
         db_table = 'expense_fondos'
         ordering = ('-factura__fecha',)
+        indexes = [
+            models.Index(fields=['moneda'], condition=models.Q(disponible=True), name='fondo_disponible_moneda_idx'),
+            models.Index(fields=['-creado'], name='fondo_creado_idx'),
+        ]
         verbose_name = 'fondo'
         verbose_name_plural = 'fondos'
 
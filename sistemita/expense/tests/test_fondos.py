@@ -1,11 +1,18 @@
 """Fondos test."""
 
+# Utils
+from decimal import Decimal
+
 # Django
 from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from faker import Faker
 
 # Sistemita
+from sistemita.core.tests.factories import FacturaClienteFactory
 from sistemita.expense.tests.factories import FondoFactory
+from sistemita.utils.commons import get_porcentaje
 from sistemita.utils.tests import BaseTestCase, prevent_request_warnings
 
 fake = Faker('es_ES')
@@ -74,6 +81,41 @@ class FondoListViewTest(BaseTestCase):
         response = self.client.get('/fondo/')
         self.assertQuerysetEqual(response.context['object_list'], [instance], transform=lambda x: x)
 
+    def test_fondos_in_template(self):
+        """Verifica los totales de fondos disponibles por moneda."""
+        facturas = [
+            FacturaClienteFactory.create(moneda='P', neto=Decimal('1000.10'), porcentaje_fondo=15),
+            FacturaClienteFactory.create(moneda='P', neto=Decimal('333.33'), porcentaje_fondo=10),
+            FacturaClienteFactory.create(moneda='D', neto=Decimal('200.00'), porcentaje_fondo=15),
+        ]
+        for factura in facturas:
+            FondoFactory.create(factura=factura, disponible=True)
+        FondoFactory.create(factura__moneda='P', disponible=False)
+        self.create_superuser()
+        self.client.login(username='admin', password='admin123')  # login super user
+        response = self.client.get('/fondo/')
+        self.assertAlmostEqual(
+            float(response.context['fondo_peso']),
+            sum(get_porcentaje(factura.neto_sin_impuestos, factura.porcentaje_fondo) for factura in facturas[:2]),
+            places=2,
+        )
+        self.assertEqual(response.context['fondo_peso'], Decimal('183.36'))
+        self.assertEqual(response.context['fondo_dollar'], Decimal('30.00'))
+
+    def test_list_queries(self):
+        """Verifica que la cantidad de consultas del listado no dependa de la cantidad de fondos."""
+        self.create_superuser()
+        self.client.login(username='admin', password='admin123')  # login super user
+        FondoFactory.create_batch(2, disponible=True)
+        with CaptureQueriesContext(connection) as context:
+            self.client.get('/fondo/')
+        queries = len(context.captured_queries)
+
+        FondoFactory.create_batch(10, disponible=True)
+        with CaptureQueriesContext(connection) as context:
+            self.client.get('/fondo/')
+        self.assertEqual(len(context.captured_queries), queries)
+
     def test_list_empty(self):
         """Verifica un listado vacío cuando no hay instancias."""
         self.create_superuser()
@@ -4,14 +4,10 @@ El modelo Fondo está asociado al modelo de factura de cliente.
 El modelo Costo está asociado al modelo Fondo.
 """
 
-# Datetime
-from datetime import date
-
 # Django
 from django.contrib.auth.mixins import PermissionRequiredMixin
 from django.contrib.messages.views import SuccessMessageMixin
 from django.core.exceptions import FieldError
-from django.db.models import Q
 from django.http import HttpResponseRedirect
 from django.shortcuts import redirect
 from django.urls import reverse, reverse_lazy
@@ -27,12 +23,14 @@ from sistemita.expense.forms import CostoForm
 from sistemita.expense.models import Costo, Fondo
 from sistemita.utils.commons import get_deleted_objects
 from sistemita.utils.export import export_excel
+from sistemita.utils.search import search_queryset
 from sistemita.utils.strings import (
     MESSAGE_403,
     MESSAGE_SUCCESS_CREATED,
     MESSAGE_SUCCESS_DELETE,
     MESSAGE_SUCCESS_UPDATE,
 )
+from sistemita.utils.summary import created_this_week, get_fondo_summary
 
 
 class FondoListView(PermissionRequiredMixin, SuccessMessageMixin, FilterView):
@@ -42,6 +40,7 @@ class FondoListView(PermissionRequiredMixin, SuccessMessageMixin, FilterView):
     paginate_by = 10
     permission_required = 'expense.list_fondo'
     raise_exception = True
+    search_fields = ['factura__numero', 'factura__cliente__razon_social']
     template_name = 'expense/fondo_list.html'
 
     def get(self, request, *args, **kwargs):
@@ -57,14 +56,12 @@ class FondoListView(PermissionRequiredMixin, SuccessMessageMixin, FilterView):
         Sobreescribe queryset.
         Devuelve un conjunto de resultados si el usuario realiza un búsqueda.
         """
-        queryset = Fondo.objects.order_by('-creado')
+        queryset = Fondo.objects.select_related('factura__cliente').order_by('-creado')
         search = self.request.GET.get('search', None)
         order_by = self.request.GET.get('order_by', None)
         try:
             if search:
-                queryset = queryset.filter(
-                    Q(factura__numero__icontains=search) | Q(factura__cliente__razon_social__icontains=search)
-                )
+                queryset = search_queryset(queryset, search, self.search_fields)
             if order_by:
                 queryset = queryset.order_by(order_by)
         except FieldError:
@@ -74,20 +71,7 @@ class FondoListView(PermissionRequiredMixin, SuccessMessageMixin, FilterView):
     def get_context_data(self, **kwargs):
         """Obtiene datos para incluir en los reportes."""
         context = super().get_context_data(**kwargs)
-        queryset = self.get_queryset()
-        current_week = date.today().isocalendar()[1]
-
-        fondo_peso = 0
-        for row in queryset.filter(factura__moneda='P', disponible=True):
-            fondo_peso += row.factura.porcentaje_fondo_monto
-
-        fondo_dollar = 0
-        for row in queryset.filter(factura__moneda='D', disponible=True):
-            fondo_dollar += row.factura.porcentaje_fondo_monto
-
-        context['fondo_dollar'] = round(fondo_dollar, 2)
-        context['fondo_peso'] = round(fondo_peso, 2)
-        context['last_created'] = queryset.filter(creado__week=current_week).count()
+        context.update(get_fondo_summary(self.get_queryset()))
 
         return context
 
@@ -120,6 +104,7 @@ class CostoListView(PermissionRequiredMixin, SuccessMessageMixin, FilterView):
     paginate_by = 10
     permission_required = 'expense.list_costo'
     raise_exception = True
+    search_fields = ['fondo__factura__numero', 'fondo__factura__cliente__razon_social', 'descripcion']
     template_name = 'expense/costo_list.html'
 
     def get_queryset(self):
@@ -132,11 +117,7 @@ class CostoListView(PermissionRequiredMixin, SuccessMessageMixin, FilterView):
         order_by = self.request.GET.get('order_by', None)
         try:
             if search:
-                queryset = queryset.filter(
-                    Q(fondo__factura__numero__icontains=search)
-                    | Q(fondo__factura__cliente__razon_social__icontains=search)
-                    | Q(descripcion__icontains=search)
-                )
+                queryset = search_queryset(queryset, search, self.search_fields)
             if order_by:
                 queryset = queryset.order_by(order_by)
         except FieldError:
@@ -147,8 +128,6 @@ class CostoListView(PermissionRequiredMixin, SuccessMessageMixin, FilterView):
         """Obtiene datos para incluir en los reportes."""
         context = super().get_context_data(**kwargs)
         queryset = self.get_queryset()
-        current_week = date.today().isocalendar()[1]
-
         costo_peso = 0
         for row in queryset.filter(moneda='P'):
             costo_peso += row.monto
@@ -159,7 +138,7 @@ class CostoListView(PermissionRequiredMixin, SuccessMessageMixin, FilterView):
 
         context['costo_dollar'] = round(costo_dollar, 2)
         context['costo_peso'] = round(costo_peso, 2)
-        context['last_created'] = queryset.filter(creado__week=current_week).count()
+        context['last_created'] = queryset.filter(created_this_week()).count()
 
         return context
 
@@ -0,0 +1,51 @@
+"""Funciones de caché."""
+
+# Utilities
+from time import time
+
+# Django
+from django.core.cache import cache
+from django.db import transaction
+
+PANEL_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def get_panel_version_key(proveedor_id):
+    """Retorna la clave de la versión del panel de un proveedor."""
+    return f'panel:{proveedor_id}:version'
+
+
+def get_panel_cache_key(proveedor_id, desde):
+    """
+    Retorna la clave del panel de control de un proveedor para una fecha de corte.
+    La clave incluye la versión vigente del proveedor, al invalidar se cambia de versión
+    y las entradas anteriores expiran solas.
+    """
+    version = cache.get(get_panel_version_key(proveedor_id))
+    if version is None:
+        # Versión inicial basada en el tiempo, evita reutilizar versiones si la clave expiró
+        version = int(time() * 1000)
+        cache.set(get_panel_version_key(proveedor_id), version, timeout=None)
+    desde = desde.isoformat() if desde else 'all'
+    return f'panel:{proveedor_id}:{version}:{desde}'
+
+
+def _bump_panel_versions(proveedores_ids):
+    """Incrementa la versión del panel de los proveedores."""
+    for proveedor_id in proveedores_ids:
+        try:
+            cache.incr(get_panel_version_key(proveedor_id))
+        except ValueError:
+            cache.set(get_panel_version_key(proveedor_id), int(time() * 1000), timeout=None)
+
+
+def invalidate_panel_cache(proveedores_ids):
+    """
+    Invalida el panel de control de los proveedores.
+    Se invalida en el momento y nuevamente al confirmar la transacción, para no
+    conservar un panel calculado con datos aún no confirmados.
+    """
+    proveedores_ids = {proveedor_id for proveedor_id in proveedores_ids if proveedor_id is not None}
+    if proveedores_ids:
+        _bump_panel_versions(proveedores_ids)
+        transaction.on_commit(lambda: _bump_panel_versions(proveedores_ids))
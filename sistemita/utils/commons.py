@@ -62,6 +62,57 @@ def get_total_factura(monto_facturas, monto_nota_de_credito):
     return max(Decimal(monto_facturas) - Decimal(monto_nota_de_credito), ZERO_DECIMAL)
 
 
+def get_imputaciones(totales, monto_nota_de_credito):
+    """
+    Distribuye el monto de una nota de crédito entre los totales de las facturas, en orden.
+    Cada factura recibe lo que quede de la nota de crédito hasta cubrir su total.
+    Retorna el monto imputado a cada factura y lo que queda sin imputar de la nota de crédito.
+    """
+    restante = Decimal(monto_nota_de_credito)
+    imputaciones = []
+    for total in totales:
+        imputacion = max(min(Decimal(total), restante), ZERO_DECIMAL)
+        imputaciones.append(imputacion)
+        restante -= imputacion
+    return imputaciones, restante
+
+
+def imputar_nota_de_credito(model, nota_de_credito, agregar=(), liberar=()):
+    """
+    Imputa una nota de crédito a facturas.
+
+    Primero devuelve a la nota de crédito lo imputado a las facturas de `liberar` y luego lo
+    distribuye entre las facturas de `agregar`. Bloquea la nota de crédito y las facturas con una
+    sola consulta y guarda los cambios con un `bulk_update`. Retorna las facturas por pk.
+    """
+    facturas = model.objects.select_for_update().in_bulk([*liberar, *agregar, nota_de_credito.pk])
+    nota_de_credito = facturas[nota_de_credito.pk]
+    total_nc = nota_de_credito.total
+
+    for pk in liberar:
+        factura = facturas[pk]
+        total_nc += factura.monto_imputado
+        factura.total += factura.monto_imputado
+        factura.monto_imputado = ZERO_DECIMAL
+        factura.cobrado = False
+
+    imputaciones, total_nc = get_imputaciones([facturas[pk].total for pk in agregar], total_nc)
+    for pk, imputacion in zip(agregar, imputaciones):
+        # Las facturas que no reciben imputación quedan como estaban
+        if imputacion:
+            factura = facturas[pk]
+            factura.monto_imputado = imputacion
+            factura.total -= imputacion
+            factura.cobrado = not bool(factura.total)
+
+    nota_de_credito.monto_imputado = (nota_de_credito.total + nota_de_credito.monto_imputado) - total_nc
+    nota_de_credito.total = total_nc
+    nota_de_credito.cobrado = not bool(nota_de_credito.total)
+
+    model.objects.bulk_update(facturas.values(), ['total', 'monto_imputado', 'cobrado'])
+    return facturas
+
+
 def get_deleted_objects(objs):
     """Obtiene la cantidad de instancias relacionadas a eliminar."""
 
@@ -81,31 +132,20 @@ def get_deleted_objects(objs):
 
 
 def get_groups_to_panel(facturas):
-    """Ordena las facturas para el panel de control."""
-
+    """
+    Agrupa las facturas para el panel de control en filas de cuatro columnas, una por estado.
+    Cada fila toma la siguiente factura de cada estado respetando el orden recibido,
+    las columnas sin facturas quedan en 0.
+    """
     status = [1, 2, 3, 4]
-    # groups = []
-
-    for _ in facturas:
-        sub_group = []
-        for st in status:
-            match = None
-            for index, item in enumerate(facturas):
-                if item.status == st:
-                    match = (index, item)
-                    break
-
-            if match is not None:
-                sub_group.append(match[1])
-                del facturas[match[0]]
-            else:
-                sub_group.append(0)
-
-            # Verifica si el el subgrupo se completó
-            if len(sub_group) == 4:
-                return facturas, sub_group
-
-    return facturas, sub_group
+    queues = {st: [] for st in status}
+
+    # Una sola pasada por las facturas
+    for factura in facturas:
+        queues[factura.status].append(factura)
+
+    rows = max((len(queue) for queue in queues.values()), default=0)
+    return [[queues[st][row] if row < len(queues[st]) else 0 for st in status] for row in range(rows)]
 
 
 def get_time_duration_log(time_start, message):
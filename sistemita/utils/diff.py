@@ -0,0 +1,116 @@
+"""Aplicación en lote de los cambios add/update/delete de las filas anidadas de un formulario o serializador."""
+
+# Django REST Framework
+from rest_framework import serializers
+
+
+class NestedDiff:
+    """
+    Acumula las altas, ediciones y bajas de las filas de un modelo y las aplica en pocas consultas.
+
+    Las filas a editar o eliminar se buscan juntas con `in_bulk` dentro de `queryset`, se guardan con
+    un `bulk_update` de `fields`, se eliminan con un `delete` y las nuevas se insertan con un
+    `bulk_create`. Sin importar la cantidad de filas, son a lo sumo cuatro consultas por modelo.
+    """
+
+    def __init__(self, model, fields, queryset=None):
+        self.model = model
+        self.fields = list(fields)
+        self.queryset = queryset if queryset is not None else model.objects.all()
+        self.added = []
+        self.updated = {}
+        self.deleted = []
+        self._instances = None
+
+    def add(self, **values):
+        """Agrega una fila nueva."""
+        self.added.append(self.model(**values))
+
+    def update(self, pk, **values):
+        """Edita los valores de una fila existente."""
+        self.updated.setdefault(int(pk), {}).update(values)
+        self._instances = None
+
+    def delete(self, pk):
+        """Elimina una fila existente."""
+        self.deleted.append(int(pk))
+        self._instances = None
+
+    def push(self, action, pk=None, **values):
+        """Registra la fila según su acción `add`, `update` o `delete`, ignora las demás."""
+        if action == 'add':
+            self.add(**values)
+        elif action == 'update':
+            self.update(pk, **values)
+        elif action == 'delete':
+            self.delete(pk)
+
+    @property
+    def instances(self):
+        """Filas a editar o eliminar con sus valores anteriores, buscadas en una sola consulta."""
+        if self._instances is None:
+            self._instances = self.queryset.in_bulk([*self.updated, *self.deleted])
+        return self._instances
+
+    def missing(self):
+        """Pks a editar o eliminar que no existen en el queryset."""
+        return sorted(set(self.updated).union(self.deleted).difference(self.instances))
+
+    def apply(self, strict=False):
+        """
+        Aplica los cambios: primero las ediciones, luego las bajas y por último las altas.
+        Con `strict` lanza `DoesNotExist` si alguna fila a editar o eliminar no existe,
+        si no se ignoran como con `filter().update()`.
+        """
+        if strict and self.missing():
+            raise self.model.DoesNotExist(
+                f'{self.model._meta.verbose_name} {", ".join(str(pk) for pk in self.missing())} no existe.'
+            )
+
+        instances = []
+        for pk, values in self.updated.items():
+            instance = self.instances.get(pk)
+            if instance is None or pk in self.deleted:
+                continue
+            for field, value in values.items():
+                setattr(instance, field, value)
+            instances.append(instance)
+        if instances:
+            self.model.objects.bulk_update(instances, self.fields)
+
+        deleted = [pk for pk in self.deleted if pk in self.instances]
+        if deleted:
+            self.model.objects.filter(pk__in=deleted).delete()
+
+        if self.added:
+            self.model.objects.bulk_create(self.added)
+
+        return self
+
+
+class InBulkPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    Relación por pk que busca la instancia entre las obtenidas de antemano con `prefetch_pks`.
+    Si la pk no está entre ellas se resuelve como siempre, así los errores de cada fila no cambian.
+    """
+
+    def to_internal_value(self, data):
+        """Retorna la instancia ya obtenida o la busca."""
+        instances = self.context.get('in_bulk', {}).get(self.get_queryset().model)
+        if instances is not None:
+            try:
+                return instances[int(data)]
+            except (KeyError, TypeError, ValueError):
+                pass
+        return super().to_internal_value(data)
+
+
+def prefetch_pks(context, model, pks):
+    """Obtiene en una sola consulta las instancias de `model` que resuelve `InBulkPrimaryKeyRelatedField`."""
+    valid_pks = set()
+    for pk in pks:
+        try:
+            valid_pks.add(int(pk))
+        except (TypeError, ValueError):
+            continue
+    context.setdefault('in_bulk', {})[model] = model.objects.in_bulk(valid_pks)
@@ -5,7 +5,7 @@ from email.mime.image import MIMEImage
 
 # Django
 from django.conf import settings
-from django.core.mail import EmailMultiAlternatives
+from django.core.mail import EmailMultiAlternatives, get_connection
 from django.template.loader import render_to_string
 
 
@@ -41,6 +41,20 @@ class EmailThread(threading.Thread):
         msg.send(self.fail_silently)
 
 
+class EmailBatchThread(threading.Thread):
+    """
+    Class para enviar varios emails con una sola conexión en un thread.
+    """
+
+    def __init__(self, messages, fail_silently):
+        self.messages = messages
+        self.fail_silently = fail_silently
+        threading.Thread.__init__(self)
+
+    def run(self):
+        get_connection(fail_silently=self.fail_silently).send_messages(self.messages)
+
+
 def send_mail(
     subject, body, from_email, recipient_list, fail_silently=False, html=None, attach=None, file=None, *args, **kwargs
 ):
@@ -70,3 +84,48 @@ def send_notification_factura_distribuida(proveedor, facturadistribuida):
             [proveedor.correo],
             html=html_content,
         )
+
+
+def send_notification_pago_cargado(proveedor, factura_numero, cliente_razon_social):
+    """Envia notificación a proveedor de pago cargado."""
+
+    html_content = render_to_string(
+        'emails/pago_cargado.html',
+        {
+            'factura_numero': factura_numero,
+            'cliente_razon_social': cliente_razon_social,
+        },
+    )
+
+    if proveedor.correo:
+        send_mail(
+            'Liqueed - Pago cargado',
+            '',
+            settings.EMAIL_FROM,
+            [proveedor.correo],
+            html=html_content,
+        )
+
+
+def send_notifications_pago_cargado(notificaciones, fail_silently=False):
+    """
+    Envia juntas las notificaciones de pago cargado, una por cada tupla (proveedor, factura_numero,
+    cliente_razon_social). Los proveedores sin correo no se notifican.
+    """
+    messages = []
+    for proveedor, factura_numero, cliente_razon_social in notificaciones:
+        if not proveedor.correo:
+            continue
+        html_content = render_to_string(
+            'emails/pago_cargado.html',
+            {
+                'factura_numero': factura_numero,
+                'cliente_razon_social': cliente_razon_social,
+            },
+        )
+        msg = EmailMultiAlternatives('Liqueed - Pago cargado', '', settings.EMAIL_FROM, [proveedor.correo])
+        msg.attach_alternative(html_content, "text/html")
+        messages.append(msg)
+
+    if messages:
+        EmailBatchThread(messages, fail_silently).start()
@@ -0,0 +1,30 @@
+"""Funciones para analizar planes de ejecución de consultas."""
+
+# Utilities
+import json
+
+# Django
+from django.db import connection
+
+
+def explain_analyze(sql, params=None):
+    """Ejecuta la consulta con EXPLAIN (ANALYZE, BUFFERS) y retorna el nodo raíz del plan."""
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]['Plan']
+
+
+def get_seq_scans(plan, tables=None):
+    """Retorna los nodos de escaneo secuencial del plan, opcionalmente solo de las tablas indicadas."""
+    nodes = []
+    if plan.get('Node Type') == 'Seq Scan':
+        if tables is None or plan.get('Relation Name') in tables:
+            nodes.append(plan)
+
+    for child in plan.get('Plans', []):
+        nodes += get_seq_scans(child, tables)
+    return nodes
@@ -2,26 +2,61 @@
 
 # Imports
 import csv
-import io
 import os
+import tempfile
 import zipfile
 
 # Utils
 from datetime import datetime
+from itertools import chain, islice
 
 import xlsxwriter
 
 # Django
 from django.conf import settings
-from django.db.models import Sum
-from django.http import HttpResponse
+from django.db.models import (
+    OuterRef,
+    Prefetch,
+    Subquery,
+    Sum,
+    prefetch_related_objects,
+)
+from django.http import HttpResponse, StreamingHttpResponse
 from django.template.loader import render_to_string
 from weasyprint import HTML
 
 # Sistemita
+from sistemita.accounting.models.pago import PagoFactura, PagoFacturaPago
 from sistemita.core.constants import MONEDAS
 from sistemita.core.models.mediopago import MedioPago
 
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_FILE_CHUNK_SIZE = 64 * 1024
+
+
+def iterar_queryset(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """Recorre el queryset de a partes con `iterator`, resolviendo los `prefetch_related` de cada parte.
+
+    `iterator` no resuelve los `prefetch_related` del queryset, por eso se aplican sobre cada parte
+    y en memoria solo hay `chunk_size` instancias con sus relaciones a la vez.
+
+    Args:
+        queryset (django.queryset): QuerySet de Django.
+        chunk_size (int): Cantidad de instancias por parte.
+
+    Yields:
+        django.db.models.Model: Instancias del queryset.
+    """
+    lookups = queryset._prefetch_related_lookups
+    iterator = queryset.iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        if lookups:
+            prefetch_related_objects(chunk, *lookups)
+        yield from chunk
+
 
 class FacturaExport:
     """Clase para exportar facturas.
@@ -63,33 +98,28 @@ class FacturaClienteExport(FacturaExport):
 
     def __init__(self, queryset):
         """Inicialización de variables."""
-        FacturaExport.__init__(self, queryset.order_by('fecha'))
+        FacturaExport.__init__(self, queryset.select_related('cliente').order_by('fecha'))
         self.headers = ['fecha', 'numero', 'tipo', 'cliente', 'neto', 'iva', 'total', 'cobrado']
 
     def get_data(self):
-        """Devuelve una lista de facturas de clientes.
+        """Genera las filas de facturas de clientes.
 
-        Returns:
-           list: Obtiene el queryset y genera un lista.
+        Yields:
+           list: Una fila por factura, recorriendo el queryset de a partes.
         """
-        data = []
-
-        for item in self.queryset:
+        for item in iterar_queryset(self.queryset):
             cobrado = 'Si' if item.cobrado else 'No'
             moneda_neto = '{} {}'.format(item.get_moneda_display(), str(item.neto))
-            data.append(
-                [
-                    item.fecha.strftime('%d/%m/%Y'),
-                    item.numero,
-                    item.get_tipo(),
-                    item.cliente.razon_social,
-                    moneda_neto,
-                    item.iva,
-                    item.moneda_monto,
-                    cobrado,
-                ]
-            )
-        return data
+            yield [
+                item.fecha.strftime('%d/%m/%Y'),
+                item.numero,
+                item.get_tipo(),
+                item.cliente.razon_social,
+                moneda_neto,
+                item.iva,
+                item.moneda_monto,
+                cobrado,
+            ]
 
 
 class FacturaProveedorExport(FacturaExport):
@@ -101,7 +131,7 @@ class FacturaProveedorExport(FacturaExport):
 
     def __init__(self, queryset):
         """Inicialización de variables."""
-        FacturaExport.__init__(self, queryset.order_by('fecha'))
+        FacturaExport.__init__(self, queryset.select_related('proveedor', 'factura__cliente').order_by('fecha'))
         self.headers = [
             'fecha',
             'numero',
@@ -122,17 +152,26 @@ class FacturaProveedorExport(FacturaExport):
         ]
 
     def get_data(self):
-        """Devuelve una lista de facturas de proveedor.
+        """Genera las filas de facturas de proveedor.
 
-        Returns:
-           list: Obtiene el queryset y genera un lista.
+        Yields:
+           list: Una fila por factura y otra con su factura de cliente, recorriendo el queryset de a partes.
         """
-        data = []
-
-        for item in self.queryset:
+        for item in iterar_queryset(self.queryset):
             cobrado = 'Si' if item.cobrado else 'No'
-            data.append(
-                [
+            yield [
+                item.fecha.strftime('%d/%m/%Y'),
+                item.numero,
+                item.get_tipo(),
+                item.proveedor.razon_social,
+                item.neto,
+                item.iva,
+                item.total,
+                cobrado,
+            ]
+            if item.factura:
+                cobrado_cliente = 'Si' if item.factura.cobrado else 'No'
+                yield [
                     item.fecha.strftime('%d/%m/%Y'),
                     item.numero,
                     item.get_tipo(),
@@ -141,32 +180,20 @@ class FacturaProveedorExport(FacturaExport):
                     item.iva,
                     item.total,
                     cobrado,
+                    item.factura.fecha.strftime('%d/%m/%Y'),
+                    item.factura.cliente.razon_social,
+                    item.factura.numero,
+                    item.factura.get_tipo(),
+                    item.factura.moneda_monto,
+                    item.factura.iva,
+                    item.factura.total,
+                    cobrado_cliente,
                 ]
-            )
-            if item.factura:
-                cobrado_cliente = 'Si' if item.factura.cobrado else 'No'
-                data.append(
-                    [
-                        item.fecha.strftime('%d/%m/%Y'),
-                        item.numero,
-                        item.get_tipo(),
-                        item.proveedor.razon_social,
-                        item.neto,
-                        item.iva,
-                        item.total,
-                        cobrado,
-                        item.factura.fecha.strftime('%d/%m/%Y'),
-                        item.factura.cliente.razon_social,
-                        item.factura.numero,
-                        item.factura.get_tipo(),
-                        item.factura.moneda_monto,
-                        item.factura.iva,
-                        item.factura.total,
-                        cobrado_cliente,
-                    ]
-                )
-
-        return data
+
+
+def get_pago_facturas_prefetch():
+    """Prefetch de las facturas de cada pago con su factura de proveedor, en el orden en que se cargaron."""
+    return Prefetch('pago_facturas', queryset=PagoFactura.objects.select_related('factura').order_by('pk'))
 
 
 class PagoExport:
@@ -178,7 +205,9 @@ class PagoExport:
 
     def __init__(self, queryset):
         """Inicialización de variables."""
-        self.queryset = queryset.order_by('fecha')
+        self.queryset = (
+            queryset.select_related('proveedor').prefetch_related(get_pago_facturas_prefetch()).order_by('fecha')
+        )
         self.headers = [
             'id',
             'fecha',
@@ -197,58 +226,58 @@ class PagoExport:
         ]
 
     def get_data(self):
-        """Devuelve una lista de pagos a proveedores.
+        """Genera las filas de pagos a proveedores.
 
-        Returns:
-           list: Obtiene el queryset y genera un lista.
+        Yields:
+           list: Una fila por factura pagada, recorriendo el queryset de a partes.
         """
-        data = []
-
+        queryset = self.queryset
         banco = MedioPago.objects.filter(nombre__icontains='banco').first()
+        if banco:
+            # Total pagado por banco de cada pago, sumado en una subconsulta
+            total_banco = (
+                PagoFacturaPago.objects.filter(pago_factura__pago=OuterRef('pk'), metodo=banco)
+                .order_by()
+                .values('pago_factura__pago')
+                .annotate(total=Sum('monto'))
+                .values('total')
+            )
+            queryset = queryset.annotate(total_banco=Subquery(total_banco))
 
-        for item in self.queryset:
+        for item in iterar_queryset(queryset):
             pagado = 'Si' if item.pagado else 'No'
-            banco_pk = banco.pk if banco else None
-
-            data.append(
-                [
-                    item.pk,
-                    item.fecha.strftime('%d/%m/%Y'),
-                    item.proveedor.razon_social,
-                    item.proveedor.cbu,
-                    item.pago_facturas.all()[0].factura.numero,
-                    item.pago_facturas.all()[0].factura.neto,
-                    item.pago_facturas.all()[0].factura.iva,
-                    item.pago_facturas.all()[0].factura.total,
-                    item.pago_facturas.all()[0].ganancias,
-                    item.pago_facturas.all()[0].ingresos_brutos,
-                    item.pago_facturas.all()[0].iva,
-                    item.pago_facturas.all()
-                    .filter(pago_factura_pagos__metodo_id=banco_pk)
-                    .aggregate(banco=Sum('pago_factura_pagos__monto'))
-                    .get('banco'),
-                    item.total,
-                    pagado,
+            pago_facturas = item.pago_facturas.all()
+
+            yield [
+                item.pk,
+                item.fecha.strftime('%d/%m/%Y'),
+                item.proveedor.razon_social,
+                item.proveedor.cbu,
+                pago_facturas[0].factura.numero,
+                pago_facturas[0].factura.neto,
+                pago_facturas[0].factura.iva,
+                pago_facturas[0].factura.total,
+                pago_facturas[0].ganancias,
+                pago_facturas[0].ingresos_brutos,
+                pago_facturas[0].iva,
+                getattr(item, 'total_banco', None),
+                item.total,
+                pagado,
+            ]
+            for f in pago_facturas[1:]:
+                yield [
+                    '',
+                    '',
+                    '',
+                    '',
+                    f.factura.numero,
+                    f.factura.neto,
+                    f.factura.iva,
+                    f.factura.total,
+                    f.ganancias,
+                    f.ingresos_brutos,
+                    f.iva,
                 ]
-            )
-            for f in item.pago_facturas.all()[1:]:
-                data.append(
-                    [
-                        '',
-                        '',
-                        '',
-                        '',
-                        f.factura.numero,
-                        f.factura.neto,
-                        f.factura.iva,
-                        f.factura.total,
-                        f.ganancias,
-                        f.ingresos_brutos,
-                        f.iva,
-                    ]
-                )
-
-        return data
 
     def get_debt_by_moneda(self, moneda):
         """Devuelve un total con la suma de las facturas adeudadas por moneda.
@@ -275,7 +304,9 @@ class PagoRetencionExport:
 
     def __init__(self, queryset):
         """Inicialización de variables."""
-        self.queryset = queryset.order_by('fecha')
+        self.queryset = (
+            queryset.select_related('proveedor').prefetch_related(get_pago_facturas_prefetch()).order_by('fecha')
+        )
         self.headers = [
             'pago_nro',
             'fecha',
@@ -286,27 +317,23 @@ class PagoRetencionExport:
         ]
 
     def get_data(self):
-        """Devuelve una lista de pagos a proveedores.
+        """Genera las filas de retenciones de pagos a proveedores.
 
-        Returns:
-           list: Obtiene el queryset y genera un lista.
+        Yields:
+           list: Una fila por factura pagada, recorriendo el queryset de a partes.
         """
-        data = []
-
-        for item in self.queryset:
-            data.append(
-                [
-                    item.pk,
-                    item.fecha.strftime('%d/%m/%Y'),
-                    item.proveedor.razon_social,
-                    item.pago_facturas.all()[0].ganancias,
-                    item.pago_facturas.all()[0].ingresos_brutos,
-                    item.pago_facturas.all()[0].iva,
-                ]
-            )
-            for factura in item.pago_facturas.all()[1:]:
-                data.append(['', '', '', factura.ganancias, factura.ingresos_brutos, factura.iva])
-        return data
+        for item in iterar_queryset(self.queryset):
+            pago_facturas = item.pago_facturas.all()
+            yield [
+                item.pk,
+                item.fecha.strftime('%d/%m/%Y'),
+                item.proveedor.razon_social,
+                pago_facturas[0].ganancias,
+                pago_facturas[0].ingresos_brutos,
+                pago_facturas[0].iva,
+            ]
+            for factura in pago_facturas[1:]:
+                yield ['', '', '', factura.ganancias, factura.ingresos_brutos, factura.iva]
 
 
 class ReporteVentaExport:
@@ -318,18 +345,16 @@ class ReporteVentaExport:
 
     def __init__(self, queryset):
         """Inicialización de variables."""
-        self.queryset = queryset
+        self.queryset = queryset.select_related('cliente').prefetch_related('facturas_proveedor__proveedor')
         self.headers = ['factura_venta', 'factura_compra', 'monto_venta', 'monto_compra']
 
     def get_data(self):
-        """Devuelve una lista facturas y sus facturas de proveedores asociadas.
+        """Genera las filas de facturas y sus facturas de proveedores asociadas.
 
-        Returns:
-           list: Obtiene el queryset y genera un lista.
+        Yields:
+           list: Una fila por factura de proveedor, recorriendo el queryset de a partes.
         """
-        data = []
-
-        for item in self.queryset:
+        for item in iterar_queryset(self.queryset):
             row = []
             factura_venta = '{} - {}'.format(item.fecha, item.cliente.razon_social)
             row.append(factura_venta)
@@ -339,10 +364,9 @@ class ReporteVentaExport:
                     row.append(factura_compra)
                     row.append(item.moneda_monto)
                     row.append(factura_proveedor.moneda_monto)
-                    data.append(row)
+                    yield row
                 else:
-                    data.append(['', factura_compra, '', factura_proveedor.moneda_monto])
-        return data
+                    yield ['', factura_compra, '', factura_proveedor.moneda_monto]
 
 
 class FondoExport:
@@ -354,7 +378,7 @@ class FondoExport:
 
     def __init__(self, queryset):
         """Inicialización de variables."""
-        self.queryset = queryset
+        self.queryset = queryset.select_related('factura__cliente').prefetch_related('costos')
 
         self.headers = [
             'numero_factura',
@@ -371,145 +395,162 @@ class FondoExport:
         ]
 
     def get_data(self):
-        """Devuelve una lista fondos.
+        """Genera las filas de fondos.
 
-        Returns:
-           list: Obtiene el queryset y genera un lista.
+        Yields:
+           list: Una fila por costo del fondo, o una sola si no tiene, recorriendo el queryset de a partes.
         """
-        data = []
-
-        for item in self.queryset:
+        for item in iterar_queryset(self.queryset):
             disponible = 'Si' if item.disponible else 'No'
-            if len(item.costos.all()):
-                data.append(
-                    [
-                        item.factura.numero,
-                        item.factura.fecha.strftime('%d/%m/%Y'),
-                        item.factura.cliente.razon_social,
-                        item.factura.moneda_monto,
-                        item.factura.porcentaje_fondo,
-                        item.moneda_monto,
-                        item.moneda_monto_disponible,
-                        disponible,
-                        item.costos.all()[0].fecha.strftime('%d/%m/%Y'),
-                        item.costos.all()[0].descripcion,
-                        item.costos.all()[0].moneda_monto,
-                    ]
-                )
-                for costo in item.costos.all()[1:]:
-                    data.append(
-                        [
-                            '',
-                            '',
-                            '',
-                            '',
-                            '',
-                            '',
-                            '',
-                            '',
-                            costo.fecha.strftime('%d/%m/%Y'),
-                            costo.descripcion,
-                            costo.moneda_monto,
-                        ]
-                    )
-            else:
-                data.append(
-                    [
-                        item.factura.numero,
-                        item.factura.fecha.strftime('%d/%m/%Y'),
-                        item.factura.cliente.razon_social,
-                        item.factura.moneda_monto,
-                        item.factura.porcentaje_fondo,
-                        item.moneda_monto,
-                        item.moneda_monto_disponible,
-                        disponible,
-                    ]
-                )
-
-        return data
+            costos = item.costos.all()
+            row = [
+                item.factura.numero,
+                item.factura.fecha.strftime('%d/%m/%Y'),
+                item.factura.cliente.razon_social,
+                item.factura.moneda_monto,
+                item.factura.porcentaje_fondo,
+                item.moneda_monto,
+                item.moneda_monto_disponible,
+                disponible,
+            ]
+            if not costos:
+                yield row
+            for idx, costo in enumerate(costos):
+                yield (row if idx == 0 else [''] * len(row)) + [
+                    costo.fecha.strftime('%d/%m/%Y'),
+                    costo.descripcion,
+                    costo.moneda_monto,
+                ]
 
 
-def export_excel(request, queryset):
-    """Devuelve un archivo en formato excel.
+class Echo:
+    """Buffer que devuelve lo que se escribe, para generar las filas de un csv sin acumularlas."""
+
+    def write(self, value):
+        """Devuelve el valor escrito."""
+        return value
+
+
+def get_app_export(request, queryset):
+    """Devuelve el nombre de la exportación, la clase que genera sus filas y si muestra la deuda.
 
     Args:
        request (django.request): Request GET de Django.
        queryset (django.queryset): QuerySet de Django.
 
     Returns:
-       response (HttpResponse): Un archivo en formato excel.
+       tuple: Nombre, instancia de exportación y si se agrega el total adeudado.
     """
-    output = io.BytesIO()
-    workbook = xlsxwriter.Workbook(output)
-    worksheet = workbook.add_worksheet()
-    display_dept = False
-    bold = workbook.add_format({'bold': True})
-
     app = queryset.model.__name__.lower()
 
     if 'reporte-venta' in request.path:
-        app = 'reporte_ventas'
-        app_export = ReporteVentaExport(queryset)
-        display_dept = False
-    elif app == 'factura':
-        app_export = FacturaClienteExport(queryset)
-        display_dept = True
-    elif app == 'facturaproveedor':
-        app_export = FacturaProveedorExport(queryset)
-        display_dept = True
-    elif app == 'pago' and request.GET.get('tipo') == 'retenciones':
-        app = 'retenciones'
-        app_export = PagoRetencionExport(queryset)
-        display_dept = False
-    elif app == 'pago':
-        app_export = PagoExport(queryset)
-        display_dept = True
-    elif app == 'fondo':
-        app_export = FondoExport(queryset)
-        display_dept = False
-
-    # Encabezados
-    for col_num, data in enumerate(app_export.headers):
-        worksheet.write(0, col_num, data, bold)
-
-    # Datos
-    data = app_export.get_data()
-    for row_num, columns in enumerate(data):
-        for col_num, cell_data in enumerate(columns):
-            worksheet.write(row_num + 1, col_num, cell_data)
-
-    # Deuda
-    if display_dept:
-        worksheet.write(len(data) + 2, 0, 'Total adeudado', bold)
-        worksheet.write(len(data) + 2, 1, '{}'.format(app_export.get_debt_by_moneda(MONEDAS[0][1])), bold)
-        worksheet.write(len(data) + 2, 2, '{}'.format(app_export.get_debt_by_moneda(MONEDAS[1][1])), bold)
-
-    workbook.close()
-    output.seek(0)
-
-    response = HttpResponse(output, content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+        return 'reporte_ventas', ReporteVentaExport(queryset), False
+    if app == 'factura':
+        return app, FacturaClienteExport(queryset), True
+    if app == 'facturaproveedor':
+        return app, FacturaProveedorExport(queryset), True
+    if app == 'pago' and request.GET.get('tipo') == 'retenciones':
+        return 'retenciones', PagoRetencionExport(queryset), False
+    if app == 'pago':
+        return app, PagoExport(queryset), True
+    return app, FondoExport(queryset), False
+
+
+def generate_excel(app_export, display_dept):
+    """Genera el archivo excel de a partes.
+
+    El libro se escribe en modo `constant_memory`, que guarda cada fila en disco al pasar a la
+    siguiente, sobre un archivo temporal que luego se lee de a partes.
+
+    Args:
+       app_export (object): Instancia de exportación con `headers` y `get_data`.
+       display_dept (bool): Si se agrega el total adeudado al final.
+
+    Yields:
+       bytes: Partes del archivo excel.
+    """
+    with tempfile.TemporaryFile() as output:
+        workbook = xlsxwriter.Workbook(output, {'constant_memory': True})
+        worksheet = workbook.add_worksheet()
+        bold = workbook.add_format({'bold': True})
+
+        # Encabezados
+        worksheet.write_row(0, 0, app_export.headers, bold)
+
+        # Datos
+        row_num = 0
+        for row_num, columns in enumerate(app_export.get_data(), start=1):
+            worksheet.write_row(row_num, 0, columns)
+
+        # Deuda
+        if display_dept:
+            worksheet.write(row_num + 2, 0, 'Total adeudado', bold)
+            worksheet.write(row_num + 2, 1, '{}'.format(app_export.get_debt_by_moneda(MONEDAS[0][1])), bold)
+            worksheet.write(row_num + 2, 2, '{}'.format(app_export.get_debt_by_moneda(MONEDAS[1][1])), bold)
+
+        workbook.close()
+        output.seek(0)
+        yield from iter(lambda: output.read(EXPORT_FILE_CHUNK_SIZE), b'')
+
+
+def export_excel(request, queryset):
+    """Devuelve un archivo en formato excel.
+
+    Args:
+       request (django.request): Request GET de Django.
+       queryset (django.queryset): QuerySet de Django.
+
+    Returns:
+       response (StreamingHttpResponse): Un archivo en formato excel que se genera mientras se descarga.
+    """
+    app, app_export, display_dept = get_app_export(request, queryset)
+
+    response = StreamingHttpResponse(
+        generate_excel(app_export, display_dept),
+        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    )
     response['Content-Disposition'] = 'attachment; filename={}_{}.xlsx'.format(app, datetime.now().strftime('%d%m%Y'))
 
     return response
 
 
 def export_csv(queryset):
-    """Devuelve un archivo en formato CSV."""
+    """Devuelve un archivo en formato CSV que se genera fila por fila mientras se descarga."""
     app = queryset.model.__name__.lower()
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="{}.csv"'.format(app)
 
     if app == 'factura':
         app_export = FacturaClienteExport(queryset)
     else:
         app_export = FacturaProveedorExport(queryset)
 
-    writer = csv.writer(response)
-    writer.writerow(app_export.headers)  # primer fila con los encabezados
-    data = app_export.get_data()
+    writer = csv.writer(Echo())
+    rows = chain([app_export.headers], app_export.get_data())  # primer fila con los encabezados
+    response = StreamingHttpResponse((writer.writerow(row) for row in rows), content_type='text/csv')
+    response['Content-Disposition'] = 'attachment; filename="{}.csv"'.format(app)
+
+    return response
 
-    for item in data:
-        writer.writerow(item)
+
+def export_transferencias(pagos):
+    """Devuelve el archivo de transferencias bancarias de los pagos en formato CSV, una fila por pago."""
+    response = HttpResponse(content_type='text/csv')
+    response['Content-Disposition'] = 'attachment; filename="transferencias_{}.csv"'.format(
+        datetime.now().strftime('%d%m%Y')
+    )
+
+    writer = csv.writer(response)
+    writer.writerow(['CBU', 'CUIT', 'Razón social', 'Moneda', 'Monto', 'Referencia'])
+    for pago in pagos:
+        writer.writerow(
+            [
+                pago.proveedor.cbu,
+                pago.proveedor.cuit,
+                pago.proveedor.razon_social,
+                pago.moneda,
+                '{:.2f}'.format(pago.total),
+                f'Pago {pago.pk}',
+            ]
+        )
 
     return response
 
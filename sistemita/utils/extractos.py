@@ -0,0 +1,88 @@
+"""Lectura de los extractos bancarios de movimientos de cuenta corriente."""
+
+# Utils
+import io
+import re
+from collections import namedtuple
+from datetime import datetime
+from decimal import Decimal
+
+from unidecode import unidecode
+
+MovimientoBancario = namedtuple(
+    'MovimientoBancario',
+    ['cuenta', 'moneda', 'fecha', 'sucursal', 'codigo', 'referencia', 'concepto', 'importe', 'saldo'],
+)
+
+RE_CUENTA = re.compile(r'^Cuenta .* en (?P<moneda>\w+) Nro\. (?P<cuenta>\S+)')
+RE_FECHA = re.compile(r'^\d{2}/\d{2}/\d{4}$')
+RE_CUIT = re.compile(r'(?<!\d)\d{11}(?!\d)')
+RE_CBU = re.compile(r'(?<!\d)\d{22}(?!\d)')
+MONEDAS_EXTRACTO = {'pesos': 'P', 'dolares': 'D'}
+
+
+def parse_importe(valor):
+    """Importe del extracto con separador de miles y coma decimal, entre paréntesis si es negativo."""
+    valor = valor.strip()
+    negativo = valor.startswith('(') and valor.endswith(')')
+    importe = Decimal(valor.strip('()').replace('.', '').replace(',', '.'))
+    return -importe if negativo else importe
+
+
+def leer_extracto(file, encoding='latin-1'):
+    """
+    Recorre línea por línea el archivo binario del extracto "Movimientos del Día" exportado del banco,
+    separado por tabulaciones y con el título, la cuenta, los saldos y la fecha de exportación entre las
+    tablas de movimientos. Genera un `MovimientoBancario` por fila con la moneda de la cuenta de su tabla,
+    los movimientos repetidos en más de una tabla se generan una sola vez.
+    """
+    texto = io.TextIOWrapper(file, encoding=encoding, newline='')
+    cuenta = moneda = columnas = None
+    leidos = set()
+    try:
+        for linea in texto:
+            campos = [campo.strip() for campo in linea.rstrip('\r\n').split('\t')]
+
+            match = RE_CUENTA.match(campos[0])
+            if match:
+                cuenta = match.group('cuenta')
+                moneda = MONEDAS_EXTRACTO.get(unidecode(match.group('moneda')).lower())
+                continue
+
+            if campos[0] == 'Fecha':
+                # Encabezados de la tabla: Importe y Saldo llevan la moneda de la cuenta
+                columnas = {unidecode(campo).lower().split(' ')[0]: i for i, campo in enumerate(campos) if campo}
+                continue
+
+            if columnas is None or not RE_FECHA.match(campos[0]) or len(campos) <= columnas['importe']:
+                # Saldos, fecha de exportación o líneas vacías terminan la tabla
+                columnas = None if campos[0] else columnas
+                continue
+
+            movimiento = MovimientoBancario(
+                cuenta=cuenta,
+                moneda=moneda,
+                fecha=datetime.strptime(campos[0], '%d/%m/%Y').date(),
+                sucursal=campos[columnas['suc.']],
+                codigo=campos[columnas['cod.']],
+                referencia=campos[columnas['referencia']],
+                concepto=campos[columnas['concepto']],
+                importe=parse_importe(campos[columnas['importe']]),
+                saldo=parse_importe(campos[columnas['saldo']]),
+            )
+            clave = movimiento[:-1]
+            if clave not in leidos:
+                leidos.add(clave)
+                yield movimiento
+    finally:
+        texto.detach()
+
+
+def get_cuits(movimiento):
+    """Números de once dígitos de la referencia y el concepto, candidatos a CUIT de la contraparte."""
+    return set(RE_CUIT.findall(f'{movimiento.referencia} {movimiento.concepto}'))
+
+
+def get_cbus(movimiento):
+    """Números de veintidós dígitos del concepto, candidatos a CBU de la cuenta destino."""
+    return set(RE_CBU.findall(movimiento.concepto))
@@ -0,0 +1,549 @@
+"""Validación e importación de las planillas de comprobantes exportadas de AFIP."""
+
+# Utils
+import io
+import threading
+from collections import Counter
+from datetime import datetime
+from decimal import Decimal
+from itertools import islice
+from uuid import uuid4
+
+# Pandas
+import openpyxl
+import pandas as pd
+
+# Django
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.utils.humanize_datetime import datetime_formats
+from unidecode import unidecode
+
+# Sistemita
+from sistemita.core.constants import (
+    MONEDAS,
+    TIPOS_DOC_IMPORT,
+    TIPOS_FACTURA,
+    TIPOS_FACTURA_IMPORT,
+)
+from sistemita.core.models.importacion import Importacion, ImportacionError
+from sistemita.utils.strings import (
+    MESSAGE_CUIT_INVALID,
+    MESSAGE_IMPORTACION_EXPIRED,
+    MESSAGE_MONEDA_INVALID,
+    MESSAGE_NUMERO_EXISTS,
+    MESSAGE_ONLY_NUMBERS,
+    MESSAGE_TIPO_DOC_IMPORT_INVALID,
+    MESSAGE_TIPO_FACTURA_INVALID,
+)
+
+FORMATOS_FECHA = ['%d/%m/%Y', '%Y-%m-%dT%H:%M:%S']
+# Texto que acepta cada formato, pandas no exige el formato exacto en las fechas ISO
+PATRONES_FECHA = {
+    '%d/%m/%Y': r'\d{1,2}/\d{1,2}/\d{4}',
+    '%Y-%m-%dT%H:%M:%S': r'\d{4}-\d{1,2}-\d{1,2}T\d{1,2}:\d{1,2}:\d{1,2}',
+}
+BATCH_SIZE = 500
+CHUNK_SIZE = 2000
+IMPORTACION_TIMEOUT = 60 * 30
+
+
+def normalizar_encabezados(df):
+    """Encabezados de la planilla en minúsculas, sin acentos, espacios ni puntos."""
+    df.columns = map(lambda header: unidecode(str(header).replace(" ", "_").replace(".", "").lower()), df.columns)
+    return df
+
+
+def leer_planilla(file):
+    """Lee la planilla completa con los encabezados normalizados."""
+    df = pd.read_excel(file)
+    df = df.fillna('')
+    return normalizar_encabezados(df)
+
+
+def es_csv(file):
+    """Indica si el archivo es un csv por su extensión, si no se lee como xlsx."""
+    return file.name.lower().endswith('.csv')
+
+
+def contar_filas(file):
+    """
+    Cantidad de filas de datos de la planilla sin leerla completa en memoria. En un xlsx es la
+    dimensión de la hoja, en un csv se cuentan los saltos de línea de a bloques.
+    """
+    file.seek(0)
+    if es_csv(file):
+        lineas = sum(bloque.count(b'\n') for bloque in iter(lambda: file.read(1024 * 1024), b''))
+        file.seek(0)
+        return max(lineas - 1, 0)
+    workbook = openpyxl.load_workbook(file, read_only=True, data_only=True)
+    try:
+        return max((workbook.active.max_row or 1) - 1, 0)
+    finally:
+        workbook.close()
+        file.seek(0)
+
+
+def leer_planilla_por_partes(file, chunk_size=CHUNK_SIZE):
+    """
+    Lee la planilla de a `chunk_size` filas con los encabezados normalizados, así la memoria no
+    depende del tamaño del archivo. El xlsx se recorre con openpyxl en modo de solo lectura y el
+    csv con el lector por partes de pandas. El índice de cada parte es la posición de sus filas.
+    """
+    file.seek(0)
+    if es_csv(file):
+        # El separador se detecta de la primera línea, para eso se lee como texto
+        texto = io.TextIOWrapper(file, encoding='utf-8-sig', newline='')
+        try:
+            for df in pd.read_csv(texto, sep=None, engine='python', dtype=object, chunksize=chunk_size):
+                yield normalizar_encabezados(df.fillna(''))
+        finally:
+            texto.detach()
+        return
+
+    workbook = openpyxl.load_workbook(file, read_only=True, data_only=True)
+    try:
+        filas = workbook.active.iter_rows(values_only=True)
+        encabezados = next(filas, None)
+        if encabezados is None:
+            return
+        inicio = 0
+        while True:
+            parte = list(islice(filas, chunk_size))
+            if not parte:
+                break
+            df = pd.DataFrame.from_records(parte, columns=encabezados)
+            df.index = range(inicio, inicio + len(parte))
+            inicio += len(parte)
+            # Como `read_excel`, las filas vacías no se leen
+            df = df.dropna(how='all')
+            if len(df):
+                yield normalizar_encabezados(df.fillna(''))
+    finally:
+        workbook.close()
+
+
+def get_mensaje(field_class, code, **kwargs):
+    """Mensaje de error de un campo de DRF, así los errores son los mismos que los de un serializador."""
+    return str(field_class.default_error_messages[code]).format(**kwargs)
+
+
+class ValidacionImportacion:
+    """
+    Valida las facturas de una planilla de AFIP con operaciones sobre columnas enteras.
+
+    `contraparte` es el sufijo de las columnas del documento (receptor o emisor), `model` el modelo de
+    la entidad que se busca por CUIT y `factura_model` el de las facturas cuyo número no se puede repetir
+    para la misma entidad. Las entidades se buscan en una consulta y los números existentes en otra.
+    Los errores y la representación de cada fila son los del serializador que validaba fila por fila.
+    """
+
+    def __init__(self, df, contraparte, model, factura_model):
+        # Número de fila en la planilla, después de la fila de encabezados
+        self.filas = [posicion + 2 for posicion in df.index]
+        self.df = df.reset_index(drop=True)
+        self.contraparte = contraparte
+        self.model = model
+        self.factura_model = factura_model
+        self.entidad = model._meta.model_name
+        self.campos = [
+            'fecha',
+            'tipo',
+            'punto_de_venta',
+            'numero_desde',
+            f'tipo_doc_{contraparte}',
+            f'nro_doc_{contraparte}',
+            f'denominacion_{contraparte}',
+            'moneda',
+            'imp_neto_gravado',
+            'imp_total',
+        ]
+        self.errors = {campo: pd.Series(None, index=self.df.index, dtype=object) for campo in self.campos}
+
+    def add_error(self, campo, mask, mensaje):
+        """Agrega el error del campo a las filas de `mask` que todavía no tienen uno, como DRF."""
+        mask = mask.fillna(False).astype(bool)
+        self.errors[campo] = self.errors[campo].mask(mask & self.errors[campo].isna(), mensaje)
+
+    def get_columna(self, campo, required=True):
+        """Columna de la planilla, si no existe todas sus filas tienen el error de campo requerido."""
+        if campo in self.df:
+            return self.df[campo]
+        if required:
+            self.add_error(campo, pd.Series(True, index=self.df.index), get_mensaje(serializers.Field, 'required'))
+        return pd.Series('', index=self.df.index, dtype=object)
+
+    def get_texto(self, campo):
+        """Valores de la columna como texto sin espacios al inicio ni al final, valida que no estén vacíos."""
+        texto = self.get_columna(campo).astype(str).str.strip()
+        self.add_error(campo, texto == '', get_mensaje(serializers.CharField, 'blank'))
+        return texto
+
+    def get_fecha(self):
+        """Fechas de la planilla, las celdas de fecha de Excel o texto en alguno de los formatos."""
+        columna = self.get_columna('fecha')
+        es_fecha = columna.map(lambda valor: isinstance(valor, datetime)).astype(bool)
+        fechas = pd.to_datetime(columna.where(es_fecha), errors='coerce')
+        texto = columna.astype(object).where(~es_fecha, '').astype(str).str.strip()
+        for formato in FORMATOS_FECHA:
+            valido = texto.str.fullmatch(PATRONES_FECHA[formato]).fillna(False).astype(bool)
+            fechas = fechas.fillna(pd.to_datetime(texto.where(valido, ''), format=formato, errors='coerce'))
+        mensaje = get_mensaje(serializers.DateTimeField, 'invalid', format=datetime_formats(FORMATOS_FECHA))
+        self.add_error('fecha', fechas.isna(), mensaje)
+        return fechas
+
+    def get_numero(self, campo):
+        """Texto de la columna que solo puede tener dígitos."""
+        texto = self.get_texto(campo)
+        self.add_error(campo, ~texto.str.isdigit(), MESSAGE_ONLY_NUMBERS)
+        return texto
+
+    def get_cuit(self, campo):
+        """CUIT de la columna, entero de once dígitos. Retorna el CUIT como texto y como entero."""
+        texto = self.get_columna(campo).astype(str).str.replace(r'\.0*\s*$', '', regex=True).str.strip()
+        es_entero = texto.str.fullmatch(r'[+-]?\d+').fillna(False).astype(bool)
+        self.add_error(campo, ~es_entero, get_mensaje(serializers.IntegerField, 'invalid'))
+
+        numeros = pd.to_numeric(texto.where(es_entero), errors='coerce')
+        numeros = numeros.where(numeros.abs() < 10**15)
+        cuits = pd.Series(None, index=self.df.index, dtype=object)
+        cuits[numeros.notna()] = numeros.dropna().astype('int64').astype(str)
+        self.add_error(campo, es_entero & ~cuits.str.fullmatch(r'[0-9]{11}').fillna(False), MESSAGE_CUIT_INVALID)
+        return cuits, numeros
+
+    def get_decimal(self, campo, required=True):
+        """Montos de la columna con hasta diez dígitos enteros y dos decimales."""
+        texto = self.get_columna(campo, required=required).astype(str).str.strip()
+        vacios = texto == ''
+        montos = pd.to_numeric(texto.where(~vacios), errors='coerce')
+        if required:
+            self.add_error(campo, montos.isna(), get_mensaje(serializers.DecimalField, 'invalid'))
+        else:
+            self.add_error(campo, montos.isna() & ~vacios, get_mensaje(serializers.DecimalField, 'invalid'))
+            montos = montos.mask(vacios, 0)
+
+        centavos = montos * 100
+        mensaje = get_mensaje(serializers.DecimalField, 'max_decimal_places', max_decimal_places=2)
+        self.add_error(campo, (centavos - centavos.round()).abs() > 1e-6, mensaje)
+        mensaje = get_mensaje(serializers.DecimalField, 'max_whole_digits', max_whole_digits=10)
+        self.add_error(campo, montos.abs() >= 10**10, mensaje)
+        return montos.map(lambda monto: '{:.2f}'.format(monto) if pd.notna(monto) else None)
+
+    def validate(self):
+        """Valida la planilla. Retorna las filas válidas representadas y las filas con sus errores."""
+        contraparte = self.contraparte
+        fechas = self.get_fecha()
+        texto_tipos = self.get_texto('tipo')
+        tipos = texto_tipos.map(dict(TIPOS_FACTURA_IMPORT))
+        self.add_error('tipo', tipos.isna(), MESSAGE_TIPO_FACTURA_INVALID)
+        numeros = self.get_numero('punto_de_venta').str.zfill(5) + self.get_numero('numero_desde').str.zfill(8)
+
+        tipos_doc = self.get_texto(f'tipo_doc_{contraparte}')
+        self.add_error(f'tipo_doc_{contraparte}', tipos_doc != TIPOS_DOC_IMPORT, MESSAGE_TIPO_DOC_IMPORT_INVALID)
+        cuits, nros_doc = self.get_cuit(f'nro_doc_{contraparte}')
+        denominaciones = self.get_texto(f'denominacion_{contraparte}')
+        monedas = self.get_texto('moneda')
+        self.add_error('moneda', ~monedas.isin([moneda[1] for moneda in MONEDAS]), MESSAGE_MONEDA_INVALID)
+        netos = self.get_decimal('imp_neto_gravado', required=False)
+        totales = self.get_decimal('imp_total')
+
+        # Entidades de todos los CUIT válidos en una consulta
+        entidades = self.model.objects.in_bulk(set(cuits.dropna()), field_name='cuit')
+        ids = cuits.map({cuit: entidad.pk for cuit, entidad in entidades.items()})
+        razones_sociales = cuits.map({cuit: entidad.razon_social for cuit, entidad in entidades.items()})
+
+        # Números ya existentes para la misma entidad, o sin entidad si no existe, en otra consulta
+        validas = pd.concat(self.errors.values(), axis=1).isna().all(axis=1)
+        existentes = self.factura_model.objects.filter(numero__in=set(numeros[validas])).filter(
+            Q(**{f'{self.entidad}__in': set(ids[validas].dropna().astype('int64'))})
+            | Q(**{f'{self.entidad}__isnull': True})
+        )
+        existentes = {(pk or -1, numero) for pk, numero in existentes.values_list(self.entidad, 'numero')}
+        repetidas = pd.MultiIndex.from_arrays([ids.fillna(-1).astype('int64'), numeros]).isin(existentes)
+        # El mismo número más de una vez para la misma entidad en la planilla, vale el primero
+        repetidas |= validas & pd.MultiIndex.from_arrays([cuits.where(validas), numeros]).duplicated()
+        mensajes = numeros.map(lambda numero: MESSAGE_NUMERO_EXISTS.format(numero, contraparte))
+        self.errors['numero_desde'] = self.errors['numero_desde'].mask(validas & repetidas, mensajes)
+        validas &= ~repetidas
+
+        existe = ids.notna()
+        result = pd.DataFrame(
+            {
+                'fecha': fechas.dt.strftime('%d-%m-%Y'),
+                'tipo': tipos,
+                'numero': numeros,
+                f'tipo_doc_{contraparte}': tipos_doc,
+                f'nro_doc_{contraparte}': nros_doc,
+                f'denominacion_{contraparte}': razones_sociales.where(existe, denominaciones),
+                f'exists_{contraparte}': existe,
+                'moneda': monedas,
+                'imp_neto_gravado': netos,
+                'imp_total': totales,
+            }
+        )[validas]
+        result[f'nro_doc_{contraparte}'] = result[f'nro_doc_{contraparte}'].astype('int64')
+
+        # Valores de las filas válidas como los del serializador de importación
+        self.validas = validas
+        self.validated_data = pd.DataFrame(
+            {
+                'fecha': fechas.dt.date,
+                'tipo': tipos.map({display: tipo for tipo, display in TIPOS_FACTURA}),
+                'numero': numeros,
+                f'nro_doc_{contraparte}': cuits,
+                f'denominacion_{contraparte}': denominaciones,
+                'moneda': monedas.map({display: moneda for moneda, display in MONEDAS}),
+                'imp_neto_gravado': netos.map(Decimal, na_action='ignore'),
+                'imp_total': totales.map(Decimal, na_action='ignore'),
+            }
+        )[validas]
+
+        errors = []
+        columnas = self.df.reindex(columns=self.campos).astype(object)
+        columnas = columnas.where(columnas.notna(), None)
+        for index, row in columnas[~validas].iterrows():
+            errores = {campo: self.errors[campo][index] for campo in self.campos}
+            errors.append({**row.to_dict(), 'errors': {campo: [e] for campo, e in errores.items() if pd.notna(e)}})
+
+        return result.to_dict(orient='records'), errors
+
+
+class ImportacionListSerializer(serializers.ListSerializer):
+    """
+    Importa las facturas validadas de una planilla en una transacción.
+
+    Busca las entidades de todos los CUIT en una consulta y crea las que faltan con un `bulk_create`,
+    luego inserta las facturas en masa y registra sus movimientos de cuenta corriente. Las subclases
+    indican la contraparte, los modelos y, con `post_create`, los registros que acompañan a las facturas.
+    """
+
+    contraparte = None
+    entidad_model = None
+    factura_model = None
+    movimiento_model = None
+
+    @property
+    def entidad(self):
+        """Nombre del campo de la factura que referencia a la entidad."""
+        return self.entidad_model._meta.model_name
+
+    def to_internal_value(self, data):
+        """Valida las facturas y sus números."""
+        facturas = super().to_internal_value(data)
+        self.validate_numeros(facturas)
+        return facturas
+
+    def validate_numeros(self, facturas):
+        """Valida que el número de cada factura no exista ni se repita en la planilla para la misma entidad."""
+        contraparte = self.contraparte
+
+        claves = [(factura[f'nro_doc_{contraparte}'], factura['numero']) for factura in facturas]
+        existentes = set(
+            self.factura_model.objects.filter(
+                **{f'{self.entidad}__cuit__in': {cuit for cuit, _ in claves}},
+                numero__in={numero for _, numero in claves},
+            ).values_list(f'{self.entidad}__cuit', 'numero')
+        )
+        repetidas = Counter(claves)
+        errors = [
+            {'numero': [MESSAGE_NUMERO_EXISTS.format(numero, contraparte)]}
+            if (cuit, numero) in existentes or repetidas[(cuit, numero)] > 1
+            else {}
+            for cuit, numero in claves
+        ]
+        if any(errors):
+            raise serializers.ValidationError(errors)
+
+    def get_entidades(self, validated_data):
+        """Entidades por CUIT, las que no existen se crean con la denominación de la planilla."""
+        contraparte = self.contraparte
+        denominaciones = {}
+        for factura in validated_data:
+            denominaciones.setdefault(factura[f'nro_doc_{contraparte}'], factura[f'denominacion_{contraparte}'])
+
+        entidades = self.entidad_model.objects.in_bulk(denominaciones, field_name='cuit')
+        nuevas = [
+            self.entidad_model(cuit=cuit, razon_social=razon_social)
+            for cuit, razon_social in denominaciones.items()
+            if cuit not in entidades
+        ]
+        if nuevas:
+            self.entidad_model.objects.bulk_create(nuevas, batch_size=BATCH_SIZE)
+            # No todas las bases devuelven las pks al insertar en masa, se leen por CUIT
+            entidades.update(
+                self.entidad_model.objects.in_bulk([entidad.cuit for entidad in nuevas], field_name='cuit')
+            )
+        return entidades
+
+    def build_factura(self, entidad, validated_data):
+        """Factura sin guardar de la entidad con los datos de una fila de la planilla."""
+        return self.factura_model(
+            **{self.entidad: entidad},
+            numero=validated_data.get('numero'),
+            fecha=validated_data.get('fecha'),
+            tipo=validated_data.get('tipo'),
+            moneda=validated_data.get('moneda'),
+            neto=validated_data.get('imp_neto_gravado', 0),
+            total=validated_data.get('imp_total'),
+        )
+
+    def post_create(self, facturas):
+        """Crea los registros que acompañan a las facturas importadas."""
+
+    def create(self, validated_data):
+        """Crea las entidades que faltan, las facturas y sus movimientos en una transacción."""
+        contraparte = self.contraparte
+        with transaction.atomic():
+            entidades = self.get_entidades(validated_data)
+            facturas = [
+                self.build_factura(entidades[factura[f'nro_doc_{contraparte}']], factura) for factura in validated_data
+            ]
+            self.factura_model.objects.bulk_create(facturas, batch_size=BATCH_SIZE)
+            if facturas and facturas[0].pk is None:
+                # No todas las bases devuelven las pks al insertar en masa, el número no se repite por entidad
+                pks = {
+                    (entidad_id, numero): pk
+                    for entidad_id, numero, pk in self.factura_model.objects.filter(
+                        **{f'{self.entidad}__in': [entidad.pk for entidad in entidades.values()]},
+                        numero__in={factura.numero for factura in facturas},
+                    ).values_list(self.entidad, 'numero', 'pk')
+                }
+                for factura in facturas:
+                    factura.pk = pks[(getattr(factura, f'{self.entidad}_id'), factura.numero)]
+
+            self.post_create(facturas)
+            self.movimiento_model.objects.registrar(
+                facturas, concepto='factura', por_factura={factura.pk: {'fecha': factura.fecha} for factura in facturas}
+            )
+        return facturas
+
+
+def get_importacion_key(contraparte, token):
+    """Clave de la cache de las facturas validadas de una planilla."""
+    return f'importacion:{contraparte}:{token}'
+
+
+def preparar_importacion(contraparte, facturas):
+    """
+    Guarda en la cache las facturas validadas de una planilla, como las del serializador de importación.
+    Retorna el token con el que se importan sin volver a enviarlas ni validarlas.
+    """
+    token = uuid4().hex
+    cache.set(get_importacion_key(contraparte, token), facturas, IMPORTACION_TIMEOUT)
+    return token
+
+
+class ImportacionPreparadaSerializer(serializers.Serializer):
+    """
+    Importa por su token las facturas guardadas con `preparar_importacion` con el `ImportacionListSerializer`
+    recibido en `importacion`. Solo se vuelve a validar que los números no se hayan cargado mientras tanto.
+    """
+
+    token = serializers.CharField()
+
+    def __init__(self, *args, importacion=None, **kwargs):
+        self.importacion = importacion
+        super().__init__(*args, **kwargs)
+
+    def validate(self, data):
+        """
+        Toma las facturas del token y valida sus números. El token se borra al tomarlo y solo la petición
+        que lo borra importa, así un doble envío o un reintento no importan las facturas dos veces.
+        """
+        key = get_importacion_key(self.importacion.contraparte, data['token'])
+        facturas = cache.get(key)
+        if facturas is None or not cache.delete(key):
+            raise serializers.ValidationError({'token': MESSAGE_IMPORTACION_EXPIRED})
+        try:
+            self.importacion.validate_numeros(facturas)
+        except serializers.ValidationError as error:
+            raise serializers.ValidationError({'facturas': error.detail})
+        return {'facturas': facturas}
+
+    def create(self, validated_data):
+        """Importa las facturas del token."""
+        return self.importacion.create(validated_data['facturas'])
+
+
+def importar_por_partes(importacion, serializer, chunk_size=CHUNK_SIZE):
+    """
+    Valida y guarda la planilla de la importación de a `chunk_size` filas con `serializer`, un
+    `ImportacionListSerializer` sin datos. Cada parte se guarda en su propia transacción junto con los
+    contadores de la importación, así el progreso se puede consultar mientras se procesa. Los números
+    de las partes ya guardadas se validan como existentes en las siguientes.
+
+    Las filas ya procesadas se saltean, así una importación interrumpida se retoma donde quedó, y
+    `modificado` se actualiza con cada parte para detectar las que dejaron de procesarse.
+    """
+    Importacion.objects.filter(pk=importacion.pk).update(estado=Importacion.PROCESANDO, modificado=timezone.now())
+    saltear = Importacion.objects.values_list('filas_procesadas', flat=True).get(pk=importacion.pk)
+    try:
+        with importacion.archivo.open('rb') as file:
+            for df in leer_planilla_por_partes(file, chunk_size):
+                if saltear >= len(df):
+                    saltear -= len(df)
+                    continue
+                df, saltear = df.iloc[saltear:], 0
+                validacion = ValidacionImportacion(
+                    df, serializer.contraparte, serializer.entidad_model, serializer.factura_model
+                )
+                _, errors = validacion.validate()
+                filas = validacion.validated_data.to_dict(orient='records')
+                filas_con_errores = [fila for fila, valida in zip(validacion.filas, validacion.validas) if not valida]
+                with transaction.atomic():
+                    if filas:
+                        serializer.create(filas)
+                    ImportacionError.objects.bulk_create(
+                        [
+                            ImportacionError(
+                                importacion=importacion,
+                                fila=fila,
+                                datos={campo: valor for campo, valor in error.items() if campo != 'errors'},
+                                errores=error['errors'],
+                            )
+                            for fila, error in zip(filas_con_errores, errors)
+                        ],
+                        batch_size=BATCH_SIZE,
+                    )
+                    Importacion.objects.filter(pk=importacion.pk).update(
+                        filas_procesadas=F('filas_procesadas') + len(df),
+                        filas_importadas=F('filas_importadas') + len(filas),
+                        filas_con_errores=F('filas_con_errores') + len(errors),
+                        modificado=timezone.now(),
+                    )
+    except Exception as error:
+        Importacion.objects.filter(pk=importacion.pk).update(estado=Importacion.FALLIDA, mensaje=str(error))
+    else:
+        # Las filas vacías de la hoja no se cuentan como procesadas
+        Importacion.objects.filter(pk=importacion.pk).update(
+            estado=Importacion.TERMINADA, filas_total=F('filas_procesadas')
+        )
+
+
+def iniciar_importacion(tipo, file, serializer):
+    """
+    Guarda la planilla en una importación y la procesa por partes en un thread cuando se confirma
+    la transacción de la petición. Retorna la importación para consultar su progreso.
+    """
+    importacion = Importacion.objects.create(tipo=tipo, archivo=file, filas_total=contar_filas(file))
+    transaction.on_commit(lambda: ImportacionThread(importacion, serializer).start())
+    return importacion
+
+
+class ImportacionThread(threading.Thread):
+    """Procesa una importación por partes en un thread, fuera de la petición que la crea."""
+
+    def __init__(self, importacion, serializer):
+        self.importacion = importacion
+        self.serializer = serializer
+        threading.Thread.__init__(self)
+
+    def run(self):
+        try:
+            importar_por_partes(self.importacion, self.serializer)
+        finally:
+            # El thread usa su propia conexión a la base
+            connection.close()
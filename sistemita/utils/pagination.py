@@ -0,0 +1,204 @@
+"""Paginación por clave (keyset) para los listados."""
+
+# Utilities
+import base64
+import binascii
+import hashlib
+import json
+from functools import reduce
+
+# Django
+from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist
+from django.db import connection
+from django.db.models import Q
+from django.http import Http404
+from django.utils.functional import cached_property
+
+KEYSET_COUNT_TIMEOUT = 60 * 5
+
+
+def encode_cursor(value, pk, previous=False):
+    """Codifica la posición de una fila para usarla en la URL."""
+    # str conserva los microsegundos de las fechas, necesarios para comparar con exactitud
+    data = json.dumps({'v': value, 'pk': pk, 'p': previous}, default=str)
+    return base64.urlsafe_b64encode(data.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Decodifica un cursor de la URL, si es inválido lanza un 404 como el paginador de Django."""
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+        return data['v'], data['pk'], bool(data['p'])
+    except (binascii.Error, UnicodeDecodeError, ValueError, KeyError, TypeError):
+        raise Http404('Página inválida.')
+
+
+def get_order_field(queryset):
+    """
+    Retorna el campo por el que se ordena el queryset si sirve como clave de paginación.
+    Solo se usa el primer criterio y debe ser una columna no nula, si no retorna None.
+    """
+    ordering = queryset.query.order_by or queryset.model._meta.ordering
+    if not ordering or not isinstance(ordering[0], str):
+        return None
+
+    order_field = ordering[0]
+    path = order_field.lstrip('-')
+    if path == 'pk':
+        return order_field
+
+    model = queryset.model
+    try:
+        for name in path.split('__'):
+            field = model._meta.get_field(name)
+            if not field.concrete or field.null:
+                return None
+            model = field.related_model
+    except (AttributeError, FieldDoesNotExist):
+        return None
+
+    if field.is_relation:
+        return None
+    return order_field
+
+
+class KeysetPage:
+    """Página de resultados obtenida con un cursor."""
+
+    cursor_pagination = True
+
+    def __init__(self, object_list, paginator, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.next_querystring = ''
+        self.previous_querystring = ''
+
+    def __repr__(self):
+        return f'<Keyset page ({len(self.object_list)} objects)>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    def set_querystrings(self, params):
+        """Arma los parámetros de las URLs de las páginas siguiente y anterior conservando los filtros."""
+        params = params.copy()
+        params.pop('page', None)
+        if self.has_next():
+            params['cursor'] = self.next_cursor
+            self.next_querystring = params.urlencode()
+        if self.has_previous():
+            params['cursor'] = self.previous_cursor
+            self.previous_querystring = params.urlencode()
+
+
+class KeysetPaginator:
+    """
+    Paginador por clave.
+    Filtra a partir del valor de la columna de orden y el id de la última fila en lugar de usar
+    OFFSET, así cualquier página cuesta lo mismo que la primera.
+    """
+
+    def __init__(self, queryset, per_page, order_field):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.field = order_field.lstrip('-')
+        self.descending = order_field.startswith('-')
+
+    @cached_property
+    def count(self):
+        """
+        Total aproximado de resultados.
+        Sin filtros usa la estimación de PostgreSQL si la tabla ya fue analizada, en otro caso cuenta y
+        guarda el total en caché. Una tabla sin analizar informa cero filas y cero páginas.
+        """
+        if connection.vendor == 'postgresql' and not self.queryset.query.where:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT reltuples::bigint, relpages FROM pg_class WHERE oid = %s::regclass',
+                    [self.queryset.model._meta.db_table],
+                )
+                row = cursor.fetchone()
+            if row and row[0] > 0 and row[1] > 0:
+                return row[0]
+
+        key = 'keyset:count:' + hashlib.md5(str(self.queryset.query).encode()).hexdigest()
+        return cache.get_or_set(key, self.queryset.count, KEYSET_COUNT_TIMEOUT)
+
+    def get_value(self, obj):
+        """Retorna el valor de la columna de orden de una fila."""
+        return reduce(getattr, self.field.split('__'), obj)
+
+    def get_filter(self, value, pk, descending):
+        """Condición de las filas posteriores a la posición indicada."""
+        lookup = 'lt' if descending else 'gt'
+        if self.field == 'pk':
+            return Q(**{f'pk__{lookup}': pk})
+        return Q(**{f'{self.field}__{lookup}': value}) | Q(**{self.field: value, f'pk__{lookup}': pk})
+
+    def get_ordering(self, descending):
+        """Ordenamiento por la columna y el id como desempate."""
+        prefix = '-' if descending else ''
+        if self.field == 'pk':
+            return [f'{prefix}pk']
+        return [f'{prefix}{self.field}', f'{prefix}pk']
+
+    def page(self, cursor=None):
+        """Retorna la página que sigue (o precede) al cursor, sin cursor retorna la primera."""
+        queryset = self.queryset
+        previous = False
+        descending = self.descending
+
+        if cursor:
+            value, pk, previous = decode_cursor(cursor)
+            # Para ir hacia atrás se recorre en sentido inverso y luego se invierte la página
+            descending = self.descending != previous
+            queryset = queryset.filter(self.get_filter(value, pk, descending))
+
+        rows = list(queryset.order_by(*self.get_ordering(descending))[: self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[: self.per_page]
+        if previous:
+            rows.reverse()
+
+        next_cursor = previous_cursor = None
+        if rows:
+            first, last = rows[0], rows[-1]
+            if has_more or previous:
+                next_cursor = encode_cursor(self.get_value(last), last.pk)
+            if cursor and (has_more or not previous):
+                previous_cursor = encode_cursor(self.get_value(first), first.pk, previous=True)
+        return KeysetPage(rows, self, next_cursor, previous_cursor)
+
+
+class KeysetPaginationMixin:
+    """
+    Pagina los listados por clave en lugar de por número de página.
+    Se aplica a vistas `ListView`/`FilterView` con `paginate_by`, la clave es la columna de
+    orden activa más el id. Si el orden no sirve como clave se usa el paginador de Django.
+    """
+
+    def paginate_queryset(self, queryset, page_size):
+        """Pagina el queryset con el cursor recibido en la URL."""
+        order_field = get_order_field(queryset)
+        if order_field is None:
+            return super().paginate_queryset(queryset, page_size)
+
+        paginator = KeysetPaginator(queryset, page_size, order_field)
+        page = paginator.page(self.request.GET.get('cursor'))
+        page.set_querystrings(self.request.GET)
+        return paginator, page, page.object_list, page.has_other_pages()
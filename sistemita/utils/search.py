@@ -0,0 +1,27 @@
+"""Búsqueda de texto en los listados."""
+
+
+def search_queryset(queryset, search, fields):
+    """
+    Filtra el queryset por los registros que contienen el texto buscado en alguno de los campos.
+
+    Los campos usan la sintaxis de lookups de Django (`cliente__razon_social`), con el prefijo `=`
+    la coincidencia es exacta. Cada campo se resuelve en una subconsulta independiente y se unen
+    los resultados, así cada una usa el índice de trigramas de su columna en lugar de recorrer
+    las tablas relacionadas con un OR.
+    """
+    search = search.strip() if search else ''
+    if not search:
+        return queryset
+
+    manager = queryset.model._default_manager
+    subqueries = []
+    for field in fields:
+        if field.startswith('='):
+            lookup = {field[1:]: search}
+        else:
+            lookup = {f'{field}__icontains': search}
+        subqueries.append(manager.filter(**lookup).order_by().values('pk'))
+
+    pks = subqueries[0].union(*subqueries[1:]) if len(subqueries) > 1 else subqueries[0]
+    return queryset.filter(pk__in=pks)
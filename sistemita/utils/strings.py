@@ -32,6 +32,9 @@ MESSAGE_TIPO_DOC_IMPORT_INVALID = 'Tipo de documento inválido.'
 MESSAGE_CUIT_INVALID = 'Número de CUIT inválido.'
 MESSAGE_MONEDA_INVALID = 'Tipo de moneda inválida.'
 MESSAGE_NUMERO_EXISTS = 'El numero de factura {} ya existe para el {}.'
+MESSAGE_PLANILLA_INVALID = 'El archivo debe ser una planilla xlsx o csv.'
+MESSAGE_IMPORTACION_EXPIRED = 'La validación de la planilla expiró, vuelva a validarla.'
+MESSAGE_EXTRACTO_INVALID = 'El archivo no es un extracto de movimientos válido.'
 
 MESSAGE_ONLY_NUMBERS = 'Solo número.'
 
@@ -0,0 +1,121 @@
+"""Resúmenes de los listados (tarjetas de totales)."""
+
+# Utilities
+import hashlib
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+# Django
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.db.models import (
+    Count,
+    DecimalField,
+    ExpressionWrapper,
+    F,
+    Q,
+    Sum,
+    Value,
+)
+from django.db.models.functions import Ceil
+from django.utils import timezone
+
+SUMMARY_CACHE_TIMEOUT = 60
+
+MONEDAS_SUMMARY = (('P', 'peso'), ('D', 'dollar'))
+
+
+def start_of_week():
+    """Inicio de la semana actual, el lunes a medianoche."""
+    today = timezone.localdate()
+    return timezone.make_aware(datetime.combine(today - timedelta(days=today.weekday()), time.min))
+
+
+def created_this_week(field='creado'):
+    """
+    Condición de los registros creados en la semana actual.
+    Usa un rango de fechas en lugar de extraer el número de semana, así puede usar el índice
+    de la columna y no mezcla semanas de distintos años.
+    """
+    start = start_of_week()
+    return Q(**{f'{field}__gte': start, f'{field}__lt': start + timedelta(days=7)})
+
+
+def get_debt_summary(queryset, paid_field, notas_de_credito=True):
+    """
+    Calcula las tarjetas de deuda de un listado en una sola consulta.
+
+    Retorna los creados en la semana y la deuda en pesos y dólares (total y cantidad) de los
+    registros no pagados. Si `notas_de_credito` es verdadero, las notas de crédito impagas se
+    descuentan del total. El resultado se guarda en caché por consulta durante unos segundos.
+
+    Solo se leen los registros no pagados o creados desde el inicio de la semana, así la consulta
+    usa los índices parciales de impagos y los de `creado` en lugar de recorrer la tabla completa.
+    """
+    try:
+        fingerprint = f'{queryset.model._meta.label}:{paid_field}:{notas_de_credito}:{queryset.query}'
+    except EmptyResultSet:
+        fingerprint = None
+
+    if fingerprint:
+        week = created_this_week()
+        key = 'summary:' + hashlib.md5(f'{fingerprint}:{week}'.encode()).hexdigest()
+        summary = cache.get(key)
+        if summary is not None:
+            return summary
+
+    impaga = Q(**{paid_field: False})
+    nc = Q(tipo__startswith='NC')
+    aggregates = {'last_created': Count('id', filter=created_this_week())}
+    for moneda, name in MONEDAS_SUMMARY:
+        condition = impaga & Q(moneda=moneda)
+        if notas_de_credito:
+            aggregates[f'{name}_nc'] = Sum('total', filter=condition & nc)
+            condition &= ~nc
+        aggregates[f'{name}_total'] = Sum('total', filter=condition)
+        aggregates[f'{name}_count'] = Count('id', filter=condition)
+
+    result = queryset.order_by().filter(impaga | Q(creado__gte=start_of_week())).aggregate(**aggregates)
+
+    summary = {'last_created': result['last_created']}
+    for _, name in MONEDAS_SUMMARY:
+        total = result[f'{name}_total']
+        if notas_de_credito:
+            total = (total or 0) - (result[f'{name}_nc'] or 0)
+        summary[f'debt_in_{name}'] = {'total__sum': total, 'id__count': result[f'{name}_count']}
+
+    if fingerprint:
+        cache.set(key, summary, SUMMARY_CACHE_TIMEOUT)
+    return summary
+
+
+def get_porcentaje_expression(total, percentage):
+    """
+    Expresión SQL equivalente a `get_porcentaje`: el porcentaje de un total redondeado hacia arriba
+    a dos decimales. Recibe los nombres de los campos del total y del porcentaje.
+    """
+    return ExpressionWrapper(
+        Ceil(F(total) * F(percentage)) * Value(Decimal('0.01')),
+        output_field=DecimalField(max_digits=14, decimal_places=2),
+    )
+
+
+def get_fondo_summary(queryset):
+    """
+    Calcula las tarjetas del listado de fondos en una sola consulta.
+
+    Retorna los creados en la semana y el fondo disponible en pesos y dólares, que es el porcentaje
+    de fondo sobre el neto sin impuestos guardado en cada factura.
+    """
+    monto = get_porcentaje_expression('factura__neto_sin_impuestos', 'factura__porcentaje_fondo')
+    disponible = Q(disponible=True)
+    result = queryset.order_by().aggregate(
+        last_created=Count('id', filter=created_this_week()),
+        fondo_peso=Sum(monto, filter=disponible & Q(factura__moneda='P')),
+        fondo_dollar=Sum(monto, filter=disponible & Q(factura__moneda='D')),
+    )
+    return {
+        'last_created': result['last_created'],
+        'fondo_peso': result['fondo_peso'] or 0,
+        'fondo_dollar': result['fondo_dollar'] or 0,
+    }
@@ -3,10 +3,16 @@
 import logging
 import random
 from functools import partial
+from io import BytesIO
 from typing import Any, Dict
 
+# Pandas
+import pandas as pd
+
 # Django
 from django.contrib.auth.models import Permission
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import TestCase
 from factory import Factory
 from factory.base import StubObject
@@ -51,6 +57,13 @@ def randN(length):
     return random.randint(_min, _max)
 
 
+def get_planilla(rows, name='comprobantes.xlsx'):
+    """Genera una planilla de Excel con las filas recibidas, como las exportadas de AFIP."""
+    output = BytesIO()
+    pd.DataFrame(rows).to_excel(output, index=False)
+    return SimpleUploadedFile(name, output.getvalue())
+
+
 def prevent_request_error(original_function):
     """Disable loggin ERROR."""
 
@@ -85,6 +98,11 @@ def prevent_request_warnings(original_function):
 class BaseTestCase(TestCase):
     """BaseTestCase."""
 
+    def setUp(self):
+        """Limpia la caché para que no se comparta entre tests."""
+        super().setUp()
+        cache.clear()
+
     def assertHasProp(self, obj, prop):
         """Verifica si el objeto tiene una propiedad."""
         self.assertTrue(True if prop in obj else False)